@@ -1,10 +1,31 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import base64
 from io import BytesIO
+import time
 from datetime import datetime
+from functools import partial
+
+from berechnung import (
+    berechne_mss, kalkuliere_programm_detail, npv_alternative, npv_alternative_series,
+    discounted_payback, annual_costs_series, kapazitaetscheck, break_even_verlauf, break_even_serien,
+    programmdaten, programmstunden
+)
+from diagramme import kostenstruktur_diagramm, break_even_diagramm
+from losgroessen import optimiere_losgroessen
+from katalog import katalog_vorlage, lade_katalog, filtere_katalog, bewerte_katalog
+from rechengraph import knoten, programm_geaendert
+from finanzierung import (AFA_METHODEN, FINANZIERUNGSARTEN, finanzierungsplan, npv_zahlungsreihe,
+                          payback_zahlungsreihe)
+from energie import lade_preisreihe, energiekosten_tou
+from mengenplan import (lade_mengenplan, mengenplan_vorlage, mengenmatrix, programm_im_jahr, jahresstunden,
+                        erstes_ueberlastjahr)
+from portfolio import (VORHABEN_SPALTEN, BUDGETBEDARF, portfolio_vorlagen, lade_vorhaben, lade_programme,
+                       eindeutiger_name, bewerte_portfolio, waehle_portfolio)
+from snapshot import SNAPSHOT_SCHEMA, URL_PARAMETER, URL_MAX_ZEICHEN, kodiere_snapshot, dekodiere_snapshot
+from tabellen import (GROSSE_TABELLE, vorteil_text, gewinner_verlierer, histogramm, bericht_tabelle,
+                      seitenweise_tabelle)
 
 # --- SEITENKONFIGURATION ---
 st.set_page_config(page_title="Wirtschaftlichkeitsvergleich Werkzeugmaschinen", layout="wide")
@@ -18,179 +39,58 @@ Stückkostenkalkulation, Break-Even-Analyse, Amortisation und Barwert.
 # =========================
 # BERECHNUNGSFUNKTIONEN
 # =========================
-@st.cache_data(show_spinner=False)
-def berechne_mss(ak, n, zins, wartung_satz, raum, r_preis, vers, werkzeug, h_jahr, nutzgrad, kw, s_preis, restwert=0.0):
-    """
-    Berechnet Maschinenstundensatz und Kostenkomponenten
-    - AfA: linear auf Basis (AK - Restwert)
-    - Kalk. Zinsen: auf durchschnittlich gebundenes Kapital ~ (AK + Restwert)/2
-    """
-    afa_basis = max(0.0, ak - restwert)
-    afa = afa_basis / n if n > 0 else 0.0
-
-    geb_kapital_mittel = (ak + restwert) / 2.0
-    zinsen = geb_kapital_mittel * zins
-
-    wartung = ak * wartung_satz
-    raumkosten = raum * r_preis * 12
-    fix_jahr = afa + zinsen + wartung + raumkosten + vers + werkzeug
-
-    stunden_effektiv = h_jahr * nutzgrad
-    mss_fix = fix_jahr / stunden_effektiv if stunden_effektiv > 0 else 0.0
-    mss_var = kw * s_preis
-
-    return {
-        'mss_fix': mss_fix,
-        'mss_var': mss_var,
-        'fix_jahr': fix_jahr,
-        'stunden_effektiv': stunden_effektiv,
-        'afa': afa,
-        'zinsen': zinsen,
-        'wartung': wartung,
-        'raumkosten': raumkosten,
-        'versicherung': vers,
-        'werkzeug': werkzeug
-    }
-
-@st.cache_data(show_spinner=False)
-def kalkuliere_programm_detail(df, mss_fix, mss_var, lohn, bedien_faktor, machine="A"):
-    """Detaillierte Kalkulation mit Stückkostenaufschlüsselung (Maschine A oder B)"""
-    details = []
-    ges_kosten = 0.0
-    ges_stunden = 0.0
-    ges_stueck = 0
-
-    if machine == "A":
-        col_bearb = "Bearbzeit (min/Stk) A"
-        col_ruest = "Rüstzeit (min) A"
-        ruest_bedien_faktor = 1.0
-    else:
-        col_bearb = "Bearbzeit (min/Stk) B"
-        col_ruest = "Rüstzeit (min) B"
-        ruest_bedien_faktor = 1.0
-
-    for _, row in df.iterrows():
-        serie = row["Serie"]
-        serien_jahr = float(row["Serien/Jahr"])
-        stueck_serie = float(row["Stück/Serie"])
-
-        t_bearb_min = float(row[col_bearb])
-        t_ruest_min = float(row[col_ruest])
-
-        stueck_jahr = serien_jahr * stueck_serie
-        t_bearb_h = (stueck_jahr * t_bearb_min) / 60.0
-        t_ruest_h = (serien_jahr * t_ruest_min) / 60.0
-
-        # Bearbeitung (Automation über Bedienfaktor)
-        mss_gesamt_bearb = mss_fix + mss_var + (lohn * bedien_faktor)
-        kosten_bearb = t_bearb_h * mss_gesamt_bearb
-
-        # Rüsten (typisch: volle Bedienung)
-        mss_gesamt_ruest = mss_fix + mss_var + (lohn * ruest_bedien_faktor)
-        kosten_ruest = t_ruest_h * mss_gesamt_ruest
-
-        kosten_ges = kosten_bearb + kosten_ruest
-        kosten_stueck = kosten_ges / stueck_jahr if stueck_jahr > 0 else 0.0
-
-        details.append({
-            'Serie': serie,
-            'Stück/Jahr': int(stueck_jahr),
-            'Zeit Bearb (h)': round(t_bearb_h, 1),
-            'Zeit Rüst (h)': round(t_ruest_h, 1),
-            'Kosten Bearb (€)': round(kosten_bearb, 2),
-            'Kosten Rüst (€)': round(kosten_ruest, 2),
-            'Kosten Gesamt (€)': round(kosten_ges, 2),
-            'Kosten/Stück (€)': round(kosten_stueck, 2)
-        })
-
-        ges_kosten += float(kosten_ges)
-        ges_stunden += float(t_bearb_h + t_ruest_h)
-        ges_stueck += int(stueck_jahr)
-
-    return {
-        'details': pd.DataFrame(details),
-        'ges_kosten': float(ges_kosten),
-        'ges_stunden': float(ges_stunden),
-        'ges_stueck': int(ges_stueck)
-    }
-
-def fig_to_base64(fig):
-    """Konvertiert Matplotlib Figure zu Base64 für HTML-Einbettung"""
-    buf = BytesIO()
-    fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-    buf.seek(0)
-    img_str = base64.b64encode(buf.read()).decode()
-    plt.close(fig)
+def png_to_base64(png):
+    """Konvertiert PNG-Bytes zu Base64 für HTML-Einbettung"""
+    img_str = base64.b64encode(png).decode()
     return f"data:image/png;base64,{img_str}"
 
-def npv_alternative(ak_a, ak_b, rest_a, rest_b, annual_saving, zins, n_years):
-    """
-    NPV aus Sicht 'B statt A'
-      t=0: - (AK_B - AK_A)
-      t=1..n: + annual_saving
-      t=n: + (Rest_B - Rest_A)
-    """
-    mehrinvest = ak_b - ak_a
-    npv = -mehrinvest
-
-    for t in range(1, n_years + 1):
-        npv += annual_saving / ((1 + zins) ** t)
+# =========================
+# SNAPSHOT WIEDERHERSTELLEN (VOR DEM ANLEGEN DER WIDGETS)
+# =========================
+# Sidebar-Widgets tragen ihren Variablennamen als key; diese Werte (siehe snapshot.SNAPSHOT_SCHEMA)
+# plus Produktionsprogramm bilden den Snapshot
 
-    npv += (rest_b - rest_a) / ((1 + zins) ** n_years)
-    return float(npv)
 
-def npv_alternative_series(ak_a, ak_b, rest_a, rest_b, savings_series, zins):
-    """
-    NPV aus Sicht 'B statt A' mit jährlicher Einsparungsreihe
-      t=0: - (AK_B - AK_A)
-      t=1..n: + saving_t
-      t=n: + (Rest_B - Rest_A)
-    """
-    mehrinvest = ak_b - ak_a
-    npv = -mehrinvest
-    for t, saving in enumerate(savings_series, start=1):
-        npv += float(saving) / ((1 + zins) ** t)
-    if savings_series:
-        n_years = len(savings_series)
-        npv += (rest_b - rest_a) / ((1 + zins) ** n_years)
-    return float(npv)
-
-def discounted_payback(mehrinvest, savings_series, zins):
-    """Dynamische Amortisation (diskontierte Zahlungsreihe)."""
-    if mehrinvest <= 0:
-        return 0.0
-    cumulative = 0.0
-    for t, saving in enumerate(savings_series, start=1):
-        cumulative += float(saving) / ((1 + zins) ** t)
-        if cumulative >= mehrinvest:
-            return float(t)
-    return None
-
-@st.cache_data(show_spinner=False)
-def annual_costs_series(res, result, lohn, bedien_factor, years, cost_escalation, prod_growth):
+def snapshot_anwenden(code):
     """
-    Vereinfachte Kostenreihe:
-    - Fixkosten eskalieren mit cost_escalation
-    - Variable Kosten eskalieren mit cost_escalation und skalieren mit Produktionswachstum
+    Snapshot in den Session State übernehmen: Widgets und Programm-Editor starten mit diesen Werten
+    - dekodiere_snapshot prüft alles vorab; bei ValueError bleibt der Session State unverändert
     """
-    fixed0 = float(res['fix_jahr'])
-    variable0 = (float(res['mss_var']) + float(lohn) * float(bedien_factor)) * float(result['ges_stunden'])
-
-    series = []
-    for t in range(years):
-        esc = (1 + cost_escalation) ** t
-        prod = (1 + prod_growth) ** t
-        fixed = fixed0 * esc
-        variable = variable0 * esc * prod
-        series.append(float(fixed + variable))
-    return series
-
-def kapazitaetscheck(result, res):
-    if res['stunden_effektiv'] <= 0:
-        return False, 0.0
-    auslastung = result['ges_stunden'] / res['stunden_effektiv']
-    ok = result['ges_stunden'] <= res['stunden_effektiv']
-    return ok, float(auslastung)
+    t0 = time.perf_counter()
+    parameter, programm = dekodiere_snapshot(code)
+    for schluessel, wert in parameter.items():
+        st.session_state[schluessel] = wert
+    st.session_state['programm_basis'] = programm
+    programm_geaendert()
+    serien = f"{len(programm):,}".replace(",", ".")
+    st.session_state['snapshot_meldung'] = (
+        'success', f"✅ Snapshot wiederhergestellt: {serien} Serien, dekodiert und übernommen in "
+                   f"{(time.perf_counter() - t0) * 1000:.1f} ms")
+
+
+def snapshot_datei_laden():
+    """on_change des Snapshot-Uploads (läuft vor dem nächsten Durchlauf, also vor den Widgets)"""
+    datei = st.session_state.get('snapshot_datei')
+    if datei is None:
+        return
+    try:
+        snapshot_anwenden(datei.getvalue().decode("ascii", errors="replace"))
+        st.session_state['snapshot_neu'] = True
+    except ValueError as e:
+        st.session_state['snapshot_meldung'] = ('error', f"❌ Snapshot-Datei: {e}")
+
+
+snapshot_code = st.query_params.get(URL_PARAMETER)
+if snapshot_code and st.session_state.get('snapshot_geladen') != snapshot_code:
+    st.session_state['snapshot_geladen'] = snapshot_code
+    try:
+        snapshot_anwenden(snapshot_code)
+    except ValueError as e:
+        st.session_state['snapshot_meldung'] = ('error', f"❌ Snapshot im Link: {e}")
+
+snapshot_meldung = st.session_state.pop('snapshot_meldung', None)
+if snapshot_meldung is not None:
+    getattr(st, snapshot_meldung[0])(snapshot_meldung[1])
 
 # =========================
 # SIDEBAR: MASCHINENPARAMETER
@@ -198,59 +98,117 @@ def kapazitaetscheck(result, res):
 with st.sidebar:
     st.header("Grundparameter")
 
-    ak_a = st.number_input("Anschaffungskosten Maschine A [€]", value=600000, step=10000)
-    ak_b = st.number_input("Anschaffungskosten Maschine B [€]", value=950000, step=10000)
+    ak_a = st.number_input("Anschaffungskosten Maschine A [€]", value=600000, step=10000, key="ak_a")
+    ak_b = st.number_input("Anschaffungskosten Maschine B [€]", value=950000, step=10000, key="ak_b")
 
-    n = st.number_input("Nutzungsdauer [Jahre]", value=20, step=1, min_value=1)
-    zins_satz = st.slider("Kalk. Zinssatz [%]", 0.0, 10.0, 5.0, 0.5) / 100
+    n = st.number_input("Nutzungsdauer [Jahre]", value=20, step=1, min_value=1, key="n")
+    zins_satz = st.slider("Kalk. Zinssatz [%]", 0.0, 10.0, 5.0, 0.5, key="zins_satz") / 100
 
-    lohn_satz = st.number_input("Lohnkosten [€/h]", value=65.0, step=1.0)
-    strom_preis = st.number_input("Strompreis [€/kWh]", value=0.30, step=0.01)
-    raum_preis = st.number_input("Raumkosten [€/m²/Monat]", value=15.0, step=1.0)
+    lohn_satz = st.number_input("Lohnkosten [€/h]", value=65.0, step=1.0, key="lohn_satz")
+    strom_preis = st.number_input("Strompreis [€/kWh]", value=0.30, step=0.01, key="strom_preis")
+    raum_preis = st.number_input("Raumkosten [€/m²/Monat]", value=15.0, step=1.0, key="raum_preis")
 
     st.divider()
     st.subheader("Annahmen (Erste Abschätzung)")
-    kosten_steigerung = st.slider("Kostensteigerung p.a. [%]", 0.0, 8.0, 2.0, 0.25) / 100
-    prod_wachstum = st.slider("Produktionswachstum p.a. [%]", -5.0, 10.0, 0.0, 0.5) / 100
+    kosten_steigerung = st.slider("Kostensteigerung p.a. [%]", 0.0, 8.0, 2.0, 0.25, key="kosten_steigerung") / 100
+    prod_wachstum = st.slider("Produktionswachstum p.a. [%]", -5.0, 10.0, 0.0, 0.5, key="prod_wachstum") / 100
 
     st.divider()
     st.caption("Optional (für Barwert/NPV): Restwert am Ende der Nutzungsdauer")
-    restwert_a = st.number_input("Restwert A am Ende [€]", value=0, step=10000, min_value=0)
-    restwert_b = st.number_input("Restwert B am Ende [€]", value=0, step=10000, min_value=0)
+    restwert_a = st.number_input("Restwert A am Ende [€]", value=0, step=10000, min_value=0, key="restwert_a")
+    restwert_b = st.number_input("Restwert B am Ende [€]", value=0, step=10000, min_value=0, key="restwert_b")
+
+    with st.expander("Abschreibung & Finanzierung"):
+        afa_methode = st.selectbox("AfA-Methode", AFA_METHODEN, key="afa_methode")
+        afa_satz = st.slider("Degressiver AfA-Satz [%]", 0.0, 30.0, 20.0, 1.0,
+                             disabled=afa_methode != "degressiv", key="afa_satz") / 100
+        fin_a = st.selectbox("Finanzierung A", FINANZIERUNGSARTEN, key="fin_a")
+        fin_b = st.selectbox("Finanzierung B", FINANZIERUNGSARTEN, key="fin_b")
+        fk_quote = st.slider("Fremdkapitalquote Darlehen [%]", 0, 100, 80, 5, key="fk_quote") / 100
+        kredit_zins = st.slider("Kreditzins [%]", 0.0, 10.0, 4.0, 0.25, key="kredit_zins") / 100
+        fin_laufzeit = st.number_input("Laufzeit Darlehen/Leasing [Jahre]", value=10, step=1, min_value=1,
+                                       key="fin_laufzeit")
+        leasing_satz = st.slider("Leasingrate [% von AK p.a.]", 0.0, 30.0, 12.0, 0.5, key="leasing_satz") / 100
+        # Förderung mindert Auszahlung und AfA-Basis, bei Leasing gibt es beides nicht
+        foerder_a = st.slider("Förderquote A [% von AK]", 0, 50, 0, 5, disabled=fin_a == "Leasing",
+                              key="foerder_a") / 100
+        foerder_b = st.slider("Förderquote B [% von AK]", 0, 50, 0, 5, disabled=fin_b == "Leasing",
+                              key="foerder_b") / 100
+        foerder_a = 0.0 if fin_a == "Leasing" else foerder_a
+        foerder_b = 0.0 if fin_b == "Leasing" else foerder_b
+        if "Leasing" in (fin_a, fin_b) and fin_laufzeit < n:
+            st.caption(f"Leasinglaufzeit ({int(fin_laufzeit)} J.) kürzer als die Nutzungsdauer ({int(n)} J.): "
+                       f"danach Anschlussleasing zur gleichen Rate.")
 
     st.divider()
     st.subheader("Maschine A")
-    name_a = st.text_input("Bezeichnung A", value="Okuma LT3000-2T1MY")
-    h_jahr_a = st.number_input("Betriebsstunden/Jahr (A)", value=2400, step=100)
-    nutzgrad_a = st.slider("Nutzungsgrad A [%]", 0, 100, 75, 5) / 100
+    name_a = st.text_input("Bezeichnung A", value="Okuma LT3000-2T1MY", key="name_a")
+    h_jahr_a = st.number_input("Betriebsstunden/Jahr (A)", value=2400, step=100, key="h_jahr_a")
+    nutzgrad_a = st.slider("Nutzungsgrad A [%]", 0, 100, 75, 5, key="nutzgrad_a") / 100
     bedien_a = 1.0
     st.info(f"Bedienfaktor A: {bedien_a} (Vollzeit)")
-    wartung_a = st.slider("Wartungssatz A [% von AK]", 0.0, 10.0, 2.5, 0.5) / 100
-    raum_a = st.number_input("Platzbedarf A [m²]", value=20, step=5)
-    energie_a = st.number_input("Leistungsaufnahme A [kW]", value=8.0, step=1.0)
-    vers_a = st.number_input("Versicherung A [€/Jahr]", value=500, step=100)
-    werkzeug_a = st.number_input("Werkzeugkosten A [€/Jahr]", value=3000, step=500)
+    wartung_a = st.slider("Wartungssatz A [% von AK]", 0.0, 10.0, 2.5, 0.5, key="wartung_a") / 100
+    raum_a = st.number_input("Platzbedarf A [m²]", value=20, step=5, key="raum_a")
+    energie_a = st.number_input("Leistungsaufnahme A [kW]", value=8.0, step=1.0, key="energie_a")
+    vers_a = st.number_input("Versicherung A [€/Jahr]", value=500, step=100, key="vers_a")
+    werkzeug_a = st.number_input("Werkzeugkosten A [€/Jahr]", value=3000, step=500, key="werkzeug_a")
 
     st.divider()
     st.subheader("Maschine B")
-    name_b = st.text_input("Bezeichnung B", value="DMG CTX 550 mir Robo2Go")
-    h_jahr_b = st.number_input("Betriebsstunden/Jahr (B)", value=5000, step=100)
-    nutzgrad_b = st.slider("Nutzungsgrad B [%]", 0, 100, 85, 5) / 100
-    bedien_b = st.slider("Bedienfaktor B", 0.1, 1.0, 0.3, 0.05)
-    wartung_b = st.slider("Wartungssatz B [% von AK]", 0.0, 10.0, 4.5, 0.5) / 100
-    raum_b = st.number_input("Platzbedarf B [m²]", value=35, step=5)
-    energie_b = st.number_input("Leistungsaufnahme B [kW]", value=18.0, step=1.0)
-    vers_b = st.number_input("Versicherung B [€/Jahr]", value=1200, step=100)
-    werkzeug_b = st.number_input("Werkzeugkosten B [€/Jahr]", value=8000, step=500)
+    name_b = st.text_input("Bezeichnung B", value="DMG CTX 550 mir Robo2Go", key="name_b")
+    h_jahr_b = st.number_input("Betriebsstunden/Jahr (B)", value=5000, step=100, key="h_jahr_b")
+    nutzgrad_b = st.slider("Nutzungsgrad B [%]", 0, 100, 85, 5, key="nutzgrad_b") / 100
+    bedien_b = st.slider("Bedienfaktor B", 0.1, 1.0, 0.3, 0.05, key="bedien_b")
+    wartung_b = st.slider("Wartungssatz B [% von AK]", 0.0, 10.0, 4.5, 0.5, key="wartung_b") / 100
+    raum_b = st.number_input("Platzbedarf B [m²]", value=35, step=5, key="raum_b")
+    energie_b = st.number_input("Leistungsaufnahme B [kW]", value=18.0, step=1.0, key="energie_b")
+    vers_b = st.number_input("Versicherung B [€/Jahr]", value=1200, step=100, key="vers_b")
+    werkzeug_b = st.number_input("Werkzeugkosten B [€/Jahr]", value=8000, step=500, key="werkzeug_b")
+
+    st.divider()
+    with st.expander("⚡ Energie (zeitvariabler Tarif)"):
+        st.caption("Ohne Preisreihe gilt: Leistungsaufnahme × Strompreis. Mit Preisreihe wird die Leistungsaufnahme "
+                   "als Bearbeitungsleistung verwendet.")
+        preis_datei = st.file_uploader("Stündliche Strompreise (CSV, 8.760 Werte)", type=["csv"])
+        ruest_kw_a = st.number_input("Leistung Rüsten A [kW]", value=4.0, step=0.5, min_value=0.0, key="ruest_kw_a")
+        leer_kw_a = st.number_input("Leistung Leerlauf A [kW]", value=2.0, step=0.5, min_value=0.0, key="leer_kw_a")
+        ruest_kw_b = st.number_input("Leistung Rüsten B [kW]", value=6.0, step=0.5, min_value=0.0, key="ruest_kw_b")
+        leer_kw_b = st.number_input("Leistung Leerlauf B [kW]", value=4.0, step=0.5, min_value=0.0, key="leer_kw_b")
+
+preisreihe = None
+if preis_datei is not None:
+    try:
+        preisreihe = lade_preisreihe(preis_datei.getvalue())
+    except ValueError as e:
+        st.sidebar.error(f"❌ Preisreihe konnte nicht gelesen werden: {e}")
+
+# Aktuelle Eingaben für den Abhängigkeitsgraphen (siehe rechengraph.ABHAENGIGKEITEN)
+eingaben = {
+    'ak_a': ak_a, 'ak_b': ak_b, 'n': n, 'zins_satz': zins_satz, 'lohn_satz': lohn_satz,
+    'strom_preis': strom_preis, 'raum_preis': raum_preis,
+    'kosten_steigerung': kosten_steigerung, 'prod_wachstum': prod_wachstum,
+    'restwert_a': restwert_a, 'restwert_b': restwert_b,
+    'h_jahr_a': h_jahr_a, 'nutzgrad_a': nutzgrad_a, 'bedien_a': bedien_a, 'wartung_a': wartung_a,
+    'raum_a': raum_a, 'energie_a': energie_a, 'vers_a': vers_a, 'werkzeug_a': werkzeug_a,
+    'h_jahr_b': h_jahr_b, 'nutzgrad_b': nutzgrad_b, 'bedien_b': bedien_b, 'wartung_b': wartung_b,
+    'raum_b': raum_b, 'energie_b': energie_b, 'vers_b': vers_b, 'werkzeug_b': werkzeug_b,
+    'afa_methode': afa_methode, 'afa_satz': afa_satz, 'fin_a': fin_a, 'fin_b': fin_b,
+    'fk_quote': fk_quote, 'kredit_zins': kredit_zins, 'fin_laufzeit': fin_laufzeit,
+    'leasing_satz': leasing_satz, 'foerder_a': foerder_a, 'foerder_b': foerder_b,
+    'preise_id': preis_datei.file_id if preisreihe is not None else None,
+    'ruest_kw_a': ruest_kw_a, 'leer_kw_a': leer_kw_a, 'ruest_kw_b': ruest_kw_b, 'leer_kw_b': leer_kw_b,
+}
 
 # =========================
 # MSS / Fixkosten je Maschine
 # =========================
-res_a = berechne_mss(ak_a, n, zins_satz, wartung_a, raum_a, raum_preis, vers_a, werkzeug_a,
-                     h_jahr_a, nutzgrad_a, energie_a, strom_preis, restwert=restwert_a)
+res_a = knoten('mss_a', eingaben, lambda: berechne_mss(
+    ak_a, n, zins_satz, wartung_a, raum_a, raum_preis, vers_a, werkzeug_a,
+    h_jahr_a, nutzgrad_a, energie_a, strom_preis, restwert=restwert_a))
 
-res_b = berechne_mss(ak_b, n, zins_satz, wartung_b, raum_b, raum_preis, vers_b, werkzeug_b,
-                     h_jahr_b, nutzgrad_b, energie_b, strom_preis, restwert=restwert_b)
+res_b = knoten('mss_b', eingaben, lambda: berechne_mss(
+    ak_b, n, zins_satz, wartung_b, raum_b, raum_preis, vers_b, werkzeug_b,
+    h_jahr_b, nutzgrad_b, energie_b, strom_preis, restwert=restwert_b))
 
 if res_a['stunden_effektiv'] <= 0:
     st.warning("Maschine A: Effektive Jahresstunden sind 0 oder negativ. Bitte Eingaben prüfen.")
@@ -274,7 +232,9 @@ default_serien = pd.DataFrame({
 })
 
 df_serien = st.data_editor(
-    default_serien,
+    st.session_state.get('programm_basis', default_serien),
+    key="programm",
+    on_change=programm_geaendert,
     num_rows="dynamic",
     use_container_width=True,
     column_config={
@@ -288,9 +248,61 @@ df_serien = st.data_editor(
     }
 )
 
+eingaben['programm_version'] = st.session_state.get('programm_version', 0)
+
+# Programm einmal je Version einlesen: Mengen und Stunden je Serie teilen sich alle Bewertungen
+daten = knoten('programmdaten', eingaben, lambda: programmdaten(df_serien))
+if daten['unvollstaendig']:
+    st.warning(f"⚠️ {daten['unvollstaendig']} Zeile(n) im Produktionsprogramm unvollständig: "
+               "fehlende Werte zählen als 0.")
+
+with st.expander("📆 Mengenplanung je Jahr (optional)"):
+    st.caption("Stück/Jahr je Serie und Jahr (erste Spalte Serie, danach eine Spalte je Jahr). Kosten, Stunden und "
+               "Kapazität werden dann je Jahr aus den geplanten Mengen berechnet; das Produktionswachstum entfällt. "
+               "Serien ohne Planzeile behalten ihre Menge, nach dem letzten Planjahr gilt dessen Menge weiter.")
+    # Vorlage erst beim Klick erzeugen (bei großen Programmen mehrere MB), nicht bei jedem Durchlauf
+    st.download_button("📥 Vorlage aus aktuellem Programm (CSV)",
+                       data=partial(mengenplan_vorlage, daten, int(n), prod_wachstum),
+                       file_name="mengenplanung.csv", mime="text/csv")
+    mengen_datei = st.file_uploader("Mengenplanung (CSV)", type=["csv"], key="mengenplan")
+
+mengenplan = None
+if mengen_datei is not None:
+    try:
+        mengenplan = lade_mengenplan(mengen_datei.getvalue())
+    except ValueError as e:
+        st.error(f"❌ Mengenplanung konnte nicht gelesen werden: {e}")
+
+eingaben['mengen_id'] = mengen_datei.file_id if mengenplan is not None else None
+
+# Mehrjahresprogramm: Stück/Jahr je Serie und Jahr, daraus Stunden beider Maschinen je Jahr (2 x Jahre)
+mengen = knoten('mengenmatrix', eingaben, lambda: mengenmatrix(
+    daten, mengenplan, int(n)) if mengenplan is not None else None)
+jahre = knoten('jahresstunden', eingaben, lambda: jahresstunden(daten, mengen) if mengen is not None else None)
+wachstum = prod_wachstum if jahre is None else 0.0
+# Kernergebnisse (Kosten, Kapazität, Jahresvergleich) mit Jahr 1 der Mengenplanung, sonst aktuelles Programm
+daten_kern = knoten('programm_kern', eingaben, lambda: programm_im_jahr(
+    daten, mengen) if mengen is not None else daten)
+
+# Zeitvariabler Stromtarif: Energieanteil des MSS aus Preisreihe und Lastprofil
+# (mit Mengenplanung Stunden je Planjahr, Jahr 1 = daten_kern)
+energie_tou_a = knoten('energiekosten_a', eingaben, lambda: energiekosten_tou(
+    preisreihe, h_jahr_a,
+    *(programmstunden(daten_kern, "A") if jahre is None else (jahre['bearb'][0], jahre['ruest'][0])),
+    energie_a, ruest_kw_a, leer_kw_a, int(n), kosten_steigerung, wachstum) if preisreihe is not None else None)
+energie_tou_b = knoten('energiekosten_b', eingaben, lambda: energiekosten_tou(
+    preisreihe, h_jahr_b,
+    *(programmstunden(daten_kern, "B") if jahre is None else (jahre['bearb'][1], jahre['ruest'][1])),
+    energie_b, ruest_kw_b, leer_kw_b, int(n), kosten_steigerung, wachstum) if preisreihe is not None else None)
+if energie_tou_a is not None:
+    res_a = {**res_a, 'mss_var': energie_tou_a['mss_var']}
+    res_b = {**res_b, 'mss_var': energie_tou_b['mss_var']}
+
 # Programm-Kalkulation
-result_a = kalkuliere_programm_detail(df_serien, res_a['mss_fix'], res_a['mss_var'], lohn_satz, bedien_a, machine="A")
-result_b = kalkuliere_programm_detail(df_serien, res_b['mss_fix'], res_b['mss_var'], lohn_satz, bedien_b, machine="B")
+result_a = knoten('programm_a', eingaben, lambda: kalkuliere_programm_detail(
+    daten_kern, res_a['mss_fix'], res_a['mss_var'], lohn_satz, bedien_a, machine="A"))
+result_b = knoten('programm_b', eingaben, lambda: kalkuliere_programm_detail(
+    daten_kern, res_b['mss_fix'], res_b['mss_var'], lohn_satz, bedien_b, machine="B"))
 
 # Kapazitätscheck
 ok_a, ausl_a = kapazitaetscheck(result_a, res_a)
@@ -306,6 +318,15 @@ if not ok_b:
              f"Benötigt: {result_b['ges_stunden']:.0f} h, verfügbar: {res_b['stunden_effektiv']:.0f} h "
              f"(Auslastung: {ausl_b*100:.1f}%).")
 
+# Kapazität je Jahr laut Mengenplanung: erstes Jahr mit Überlast
+ueberlast_a = erstes_ueberlastjahr(jahre['gesamt'][0], res_a['stunden_effektiv']) if jahre is not None else None
+ueberlast_b = erstes_ueberlastjahr(jahre['gesamt'][1], res_b['stunden_effektiv']) if jahre is not None else None
+for name_m, jahr_m, zeile_m, res_m in ((name_a, ueberlast_a, 0, res_a), (name_b, ueberlast_b, 1, res_b)):
+    if jahr_m is not None:
+        st.error(f"❌ Mengenplanung: Kapazität von {name_m} ab Jahr {jahr_m} überschritten. "
+                 f"Benötigt: {jahre['gesamt'][zeile_m][jahr_m - 1]:.0f} h, "
+                 f"verfügbar: {res_m['stunden_effektiv']:.0f} h.")
+
 vergleich_ok = ok_a and ok_b
 if not vergleich_ok:
     st.warning("⚠️ Achtung: Mindestens eine Alternative kann das Produktionsprogramm kapazitiv nicht abbilden. "
@@ -316,15 +337,80 @@ if not vergleich_ok:
 # =========================
 st.divider()
 st.header("🎯 Kernergebnisse")
+if mengen is not None:
+    st.caption("Jahreswerte für Jahr 1 der Mengenplanung; Folgejahre in Kostenreihe und dynamischem NPV.")
 
 ersparnis = result_a['ges_kosten'] - result_b['ges_kosten']
 ersparnis_proz = (ersparnis / result_a['ges_kosten'] * 100) if result_a['ges_kosten'] > 0 else 0.0
 mehrinvest = ak_b - ak_a
 
+# Abschreibungs-/Finanzierungspläne je Jahr
+plan_a = knoten('finanzierung_a', eingaben, lambda: finanzierungsplan(
+    float(ak_a), int(n), float(restwert_a), zins_satz, afa_methode, afa_satz,
+    fin_a, fk_quote, kredit_zins, int(fin_laufzeit), leasing_satz, foerder_a))
+plan_b = knoten('finanzierung_b', eingaben, lambda: finanzierungsplan(
+    float(ak_b), int(n), float(restwert_b), zins_satz, afa_methode, afa_satz,
+    fin_b, fk_quote, kredit_zins, int(fin_laufzeit), leasing_satz, foerder_b))
+# Standardfall (linear, Eigenkapital, ohne Förderung) rechnet wie bisher mit AfA/Zinsen aus dem MSS
+plan_aktiv_a = afa_methode != "linear" or fin_a != "Eigenkapital" or foerder_a > 0
+plan_aktiv_b = afa_methode != "linear" or fin_b != "Eigenkapital" or foerder_b > 0
+
 # Kostenreihen für dynamische Bewertung
-costs_a_series = annual_costs_series(res_a, result_a, lohn_satz, bedien_a, int(n), kosten_steigerung, prod_wachstum)
-costs_b_series = annual_costs_series(res_b, result_b, lohn_satz, bedien_b, int(n), kosten_steigerung, prod_wachstum)
+costs_a_series = knoten('kostenreihe_a', eingaben, lambda: annual_costs_series(
+    res_a, result_a, lohn_satz, bedien_a, int(n), kosten_steigerung, prod_wachstum,
+    kapitalkosten=plan_a['kapitalkosten'] if plan_aktiv_a else None,
+    energiekosten=energie_tou_a['kosten_reihe'] if energie_tou_a is not None else None,
+    stunden=jahre['gesamt'][0] if jahre is not None else None))
+costs_b_series = knoten('kostenreihe_b', eingaben, lambda: annual_costs_series(
+    res_b, result_b, lohn_satz, bedien_b, int(n), kosten_steigerung, prod_wachstum,
+    kapitalkosten=plan_b['kapitalkosten'] if plan_aktiv_b else None,
+    energiekosten=energie_tou_b['kosten_reihe'] if energie_tou_b is not None else None,
+    stunden=jahre['gesamt'][1] if jahre is not None else None))
+# Betriebskosten ohne Kapitalkosten für die Zahlungsreihen-Sicht
+betrieb_a_series = knoten('betrieb_a', eingaben, lambda: annual_costs_series(
+    res_a, result_a, lohn_satz, bedien_a, int(n), kosten_steigerung, prod_wachstum, kapitalkosten=np.zeros(int(n)),
+    energiekosten=energie_tou_a['kosten_reihe'] if energie_tou_a is not None else None,
+    stunden=jahre['gesamt'][0] if jahre is not None else None))
+betrieb_b_series = knoten('betrieb_b', eingaben, lambda: annual_costs_series(
+    res_b, result_b, lohn_satz, bedien_b, int(n), kosten_steigerung, prod_wachstum, kapitalkosten=np.zeros(int(n)),
+    energiekosten=energie_tou_b['kosten_reihe'] if energie_tou_b is not None else None,
+    stunden=jahre['gesamt'][1] if jahre is not None else None))
 savings_series = [a - b for a, b in zip(costs_a_series, costs_b_series)]
+# Mit Finanzierung (Darlehen/Leasing) oder Förderung stecken Raten und Zuschuss in den Zahlungen, nicht in
+# AK_B - AK_A: dynamischer NPV und Amortisation dann aus Betriebskosten + Zahlungsreihe (die Kostenreihe
+# enthält die Raten bereits als Kapitalkosten). Die AfA-Methode allein ändert keine Zahlungen.
+zahlungsplan_aktiv = fin_a != "Eigenkapital" or fin_b != "Eigenkapital" or foerder_a > 0 or foerder_b > 0
+if vergleich_ok:
+    npv_b_vs_a_fin = float(npv_zahlungsreihe(
+        plan_a['zahlungen'], plan_b['zahlungen'], betrieb_a_series, betrieb_b_series,
+        plan_a['restwert'], plan_b['restwert'], zins_satz
+    ))
+    npv_b_vs_a_dyn = npv_b_vs_a_fin if zahlungsplan_aktiv else npv_alternative_series(
+        ak_a=ak_a, ak_b=ak_b,
+        rest_a=restwert_a, rest_b=restwert_b,
+        savings_series=savings_series,
+        zins=zins_satz
+    )
+    # Kopfzeile und Empfehlung: mit Finanzierung/Förderung dieselbe Zahlungsreihe, sonst konstante Einsparung
+    npv_b_vs_a = npv_b_vs_a_fin if zahlungsplan_aktiv else npv_alternative(
+        ak_a=ak_a, ak_b=ak_b,
+        rest_a=restwert_a, rest_b=restwert_b,
+        annual_saving=ersparnis,
+        zins=zins_satz,
+        n_years=n
+    )
+else:
+    npv_b_vs_a = npv_b_vs_a_dyn = npv_b_vs_a_fin = None
+
+# Statische Amortisation: mit Finanzierung/Förderung aus Auszahlung t=0 und Zahlungsüberschuss im Jahr 1
+if zahlungsplan_aktiv:
+    mehrinvest_amort = float(plan_b['zahlungen'][0] - plan_a['zahlungen'][0])
+    ersparnis_amort = float(betrieb_a_series[0] - betrieb_b_series[0]
+                            + plan_a['zahlungen'][1] - plan_b['zahlungen'][1])
+    amort_hilfe = "(Auszahlung B - A in t=0) / Zahlungsüberschuss von B im Jahr 1 (Betrieb, Raten, Zinsen)"
+else:
+    mehrinvest_amort, ersparnis_amort = mehrinvest, ersparnis
+    amort_hilfe = "(AK_B - AK_A) / jährliche Einsparung"
 
 col1, col2, col3, col4 = st.columns(4)
 
@@ -346,15 +432,14 @@ with col3:
 
 with col4:
     # Amortisation korrekt: (AK_B - AK_A) / jährliche Einsparung
-    if ersparnis > 0 and mehrinvest > 0:
-        amortisation = mehrinvest / ersparnis
-        st.metric("Amortisation", f"{amortisation:.1f} Jahre",
-                  help="(AK_B - AK_A) / jährliche Einsparung")
+    if ersparnis_amort > 0 and mehrinvest_amort > 0:
+        amortisation = mehrinvest_amort / ersparnis_amort
+        st.metric("Amortisation", f"{amortisation:.1f} Jahre", help=amort_hilfe)
         if amortisation < n:
             st.success("✅ Wirtschaftlich")
         else:
             st.warning("⚠️ Kritisch prüfen")
-    elif ersparnis > 0 and mehrinvest <= 0:
+    elif ersparnis_amort > 0 and mehrinvest_amort <= 0:
         amortisation = 0.0
         st.metric("Amortisation", "0.0 Jahre",
                   help="B ist nicht teurer in der Anschaffung und spart jährlich → sofort wirtschaftlich.")
@@ -365,14 +450,28 @@ with col4:
         st.info("ℹ️ Keine Einsparung durch B")
 
 # Dynamische Amortisation (diskontiert)
-dyn_amort = discounted_payback(mehrinvest, savings_series, zins_satz)
+if zahlungsplan_aktiv:
+    # Zahlungsreihe statt Mehrinvestition: bei Leasing fällt in t=0 keine Mehrauszahlung für B an
+    dyn_amort = payback_zahlungsreihe(plan_a['zahlungen'], plan_b['zahlungen'], betrieb_a_series,
+                                      betrieb_b_series, zins_satz)
+else:
+    dyn_amort = discounted_payback(mehrinvest, savings_series, zins_satz)
 if dyn_amort is not None:
     st.caption(f"Dynamische Amortisation (diskontiert): {dyn_amort:.0f} Jahre")
 else:
     st.caption("Dynamische Amortisation (diskontiert): nicht erreicht")
 
-# Empfehlungstext (mit Hinweis auf Kapazität)
-if ersparnis > 0:
+# Empfehlungstext (mit Hinweis auf Kapazität); mit Finanzierung/Förderung entscheidet der NPV der Zahlungsreihe
+if zahlungsplan_aktiv and npv_b_vs_a is not None:
+    if npv_b_vs_a >= 0:
+        empfehlung_text = f"""**💡 Empfehlung: Maschine B ({name_b})** ist mit der gewählten Finanzierung
+        (A {fin_a}, B {fin_b}) wirtschaftlich vorteilhaft: NPV **{npv_b_vs_a:,.0f} €**."""
+        st.success(empfehlung_text)
+    else:
+        empfehlung_text = f"""**💡 Empfehlung: Maschine A ({name_a})** ist mit der gewählten Finanzierung
+        (A {fin_a}, B {fin_b}) die wirtschaftlichere Lösung: NPV von B statt A **{npv_b_vs_a:,.0f} €**."""
+        st.warning(empfehlung_text)
+elif ersparnis > 0:
     empfehlung_text = f"""**💡 Empfehlung: Maschine B ({name_b})** ist wirtschaftlich vorteilhaft mit einer
     jährlichen Ersparnis von **{ersparnis:,.0f} €** ({ersparnis_proz:.1f}%)."""
     if mehrinvest > 0 and amortisation is not None:
@@ -391,28 +490,62 @@ else:
 st.divider()
 st.subheader("📌 Barwert (NPV) der Alternative B gegenüber A")
 if vergleich_ok:
-    npv_b_vs_a = npv_alternative(
-        ak_a=ak_a, ak_b=ak_b,
-        rest_a=restwert_a, rest_b=restwert_b,
-        annual_saving=ersparnis,
-        zins=zins_satz,
-        n_years=n
-    )
-    npv_b_vs_a_dyn = npv_alternative_series(
-        ak_a=ak_a, ak_b=ak_b,
-        rest_a=restwert_a, rest_b=restwert_b,
-        savings_series=savings_series,
-        zins=zins_satz
-    )
     if npv_b_vs_a >= 0:
         st.success(f"✅ NPV (B statt A): {npv_b_vs_a:.0f} €  → B ist aus Barwertsicht vorteilhaft.")
     else:
         st.warning(f"⚠️ NPV (B statt A): {npv_b_vs_a:.0f} €  → A ist aus Barwertsicht vorteilhafter.")
-    st.caption(f"NPV dynamisch (mit Kostensteigerung/Produktionswachstum): {npv_b_vs_a_dyn:.0f} €")
+    verlauf_text = 'Produktionswachstum' if jahre is None else 'Mengenplanung je Jahr'
+    if zahlungsplan_aktiv:
+        st.caption(f"NPV dynamisch (Zahlungsreihe mit Investition/Finanzierung: A {fin_a}, B {fin_b}; "
+                   f"Betriebskosten ohne AfA/Zinsen mit Kostensteigerung/{verlauf_text}): {npv_b_vs_a_dyn:.0f} €")
+    else:
+        st.caption(f"NPV dynamisch (mit Kostensteigerung/{verlauf_text}): {npv_b_vs_a_dyn:.0f} €")
+        st.caption(f"NPV Zahlungsreihe (Investition/Finanzierung: A {fin_a}, B {fin_b}; "
+                   f"Betriebskosten ohne AfA/Zinsen): {npv_b_vs_a_fin:.0f} €")
 else:
-    npv_b_vs_a = None
-    npv_b_vs_a_dyn = None
     st.info("NPV wird nicht ausgewertet, da mindestens eine Alternative kapazitiv nicht machbar ist.")
+if vergleich_ok and (ueberlast_a is not None or ueberlast_b is not None):
+    erstes_jahr = min(j for j in (ueberlast_a, ueberlast_b) if j is not None)
+    st.warning(f"⚠️ Laut Mengenplanung reicht die Kapazität ab Jahr {erstes_jahr} nicht mehr: die dynamischen "
+               "NPV unterstellen, dass die Mehrmengen trotzdem gefertigt werden.")
+
+df_finanzplan = pd.DataFrame({
+    'Jahr': np.arange(int(n) + 1),
+    'AfA A (€)': np.concatenate([[0.0], plan_a['afa']]),
+    'Kapitalkosten A (€)': np.concatenate([[0.0], plan_a['kapitalkosten']]),
+    'Auszahlungen A (€)': plan_a['zahlungen'],
+    'AfA B (€)': np.concatenate([[0.0], plan_b['afa']]),
+    'Kapitalkosten B (€)': np.concatenate([[0.0], plan_b['kapitalkosten']]),
+    'Auszahlungen B (€)': plan_b['zahlungen'],
+})
+with st.expander("📅 Abschreibungs- und Finanzierungsplan"):
+    st.dataframe(df_finanzplan.style.format({c: '{:,.0f}' for c in df_finanzplan.columns if c != 'Jahr'}),
+                 use_container_width=True, hide_index=True)
+
+df_mehrjahr = None
+if jahre is not None:
+    kapazitaet = np.array([[res_a['stunden_effektiv']], [res_b['stunden_effektiv']]])
+    auslastung = np.divide(jahre['gesamt'], kapazitaet, out=np.full_like(jahre['gesamt'], np.nan),
+                           where=kapazitaet > 0) * 100
+    df_mehrjahr = pd.DataFrame({
+        'Jahr': np.arange(1, int(n) + 1),
+        'Stück': jahre['stueck'],
+        'Stunden A (h)': jahre['gesamt'][0],
+        'Auslastung A (%)': auslastung[0],
+        'Stunden B (h)': jahre['gesamt'][1],
+        'Auslastung B (%)': auslastung[1],
+        'Kosten A (€)': costs_a_series,
+        'Kosten B (€)': costs_b_series,
+        'Einsparung B (€)': savings_series,
+    })
+    with st.expander("📆 Mehrjahresprogramm laut Mengenplanung", expanded=True):
+        st.line_chart(df_mehrjahr.set_index('Jahr')[['Stunden A (h)', 'Stunden B (h)']].assign(**{
+            'Kapazität A (h)': res_a['stunden_effektiv'], 'Kapazität B (h)': res_b['stunden_effektiv']}))
+        st.dataframe(df_mehrjahr.style.format({
+            'Stück': '{:,.0f}', 'Stunden A (h)': '{:,.0f}', 'Stunden B (h)': '{:,.0f}',
+            'Auslastung A (%)': '{:.1f}', 'Auslastung B (%)': '{:.1f}',
+            'Kosten A (€)': '{:,.0f}', 'Kosten B (€)': '{:,.0f}', 'Einsparung B (€)': '{:,.0f}'
+        }), use_container_width=True, hide_index=True)
 
 # =========================
 # MSS-VERGLEICH
@@ -420,6 +553,14 @@ else:
 st.divider()
 st.header("💰 Maschinenstundensatz (MSS)")
 
+if energie_tou_a is not None:
+    st.caption(
+        f"⚡ Energie mit stündlicher Preisreihe: {name_a} Ø {energie_tou_a['preis_mittel']:.3f} €/kWh in "
+        f"{energie_tou_a['betriebsstunden']} Betriebsstunden ({energie_tou_a['kosten_reihe'][0]:,.0f} €/Jahr), "
+        f"{name_b} Ø {energie_tou_b['preis_mittel']:.3f} €/kWh in {energie_tou_b['betriebsstunden']} Betriebsstunden "
+        f"({energie_tou_b['kosten_reihe'][0]:,.0f} €/Jahr)."
+    )
+
 col_mss1, col_mss2 = st.columns(2)
 
 with col_mss1:
@@ -467,30 +608,17 @@ werte_a = [res_a['afa'], res_a['zinsen'], res_a['wartung'], res_a['raumkosten'],
 werte_b = [res_b['afa'], res_b['zinsen'], res_b['wartung'], res_b['raumkosten'],
            res_b['versicherung'], res_b['werkzeug'], personal_kosten_b, energie_kosten_b]
 
-fig, ax = plt.subplots(figsize=(12, 6))
-x = np.arange(len(kategorien))
-width = 0.35
-
-bars1 = ax.bar(x - width/2, werte_a, width, label=name_a, color='#6b7280', alpha=0.8)
-bars2 = ax.bar(x + width/2, werte_b, width, label=name_b, color='#3b82f6', alpha=0.8)
-
-ax.set_ylabel('Kosten [€]', fontsize=12)
-ax.set_title('Vergleich der Kostenkomponenten', fontsize=14, fontweight='bold')
-ax.set_xticks(x)
-ax.set_xticklabels(kategorien, rotation=45, ha='right')
-ax.legend()
-ax.grid(axis='y', alpha=0.3)
+# Standardeingaben: Widgets wie beim ersten Durchlauf der Session (ohne Snapshot), Programm unverändert,
+# keine Uploads. Nur deren Diagramme gehen in den Plattencache (vorgewärmtes Image), alle anderen in den Speicher
+standard_werte = st.session_state.setdefault('standard_werte', None if 'snapshot_geladen' in st.session_state
+                                             else {k: st.session_state[k] for k in SNAPSHOT_SCHEMA})
+standard = (standard_werte is not None and eingaben['programm_version'] == 0
+            and preisreihe is None and mengenplan is None
+            and all(st.session_state[k] == wert for k, wert in standard_werte.items()))
 
-for bars in [bars1, bars2]:
-    for bar in bars:
-        height = bar.get_height()
-        if height > 1000:
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{height/1000:.1f}k', ha='center', va='bottom', fontsize=8)
-
-plt.tight_layout()
-kostenstruktur_img = fig_to_base64(fig)
-st.pyplot(fig)
+kostenstruktur_png = kostenstruktur_diagramm(kategorien, werte_a, werte_b, name_a, name_b, standard)
+kostenstruktur_img = png_to_base64(kostenstruktur_png)
+st.image(kostenstruktur_png, use_container_width=True)
 
 # =========================
 # BREAK-EVEN-ANALYSE
@@ -504,39 +632,19 @@ Der Schnittpunkt zeigt die Break-Even-Menge.
 """)
 
 faktoren = np.linspace(0.2, 3.0, 15)
-kosten_verlauf_a = []
-kosten_verlauf_b = []
-stueckzahlen = []
-
-for faktor in faktoren:
-    df_scaled = df_serien.copy()
-    df_scaled['Serien/Jahr'] = (df_scaled['Serien/Jahr'] * faktor).round().astype(int)
-
-    res_temp_a = kalkuliere_programm_detail(df_scaled, res_a['mss_fix'], res_a['mss_var'], lohn_satz, bedien_a, machine="A")
-    res_temp_b = kalkuliere_programm_detail(df_scaled, res_b['mss_fix'], res_b['mss_var'], lohn_satz, bedien_b, machine="B")
-
-    kosten_verlauf_a.append(res_temp_a['ges_kosten'])
-    kosten_verlauf_b.append(res_temp_b['ges_kosten'])
-    stueckzahlen.append(res_temp_a['ges_stueck'])
-
-fig2, ax2 = plt.subplots(figsize=(12, 6))
-ax2.plot(stueckzahlen, kosten_verlauf_a, 'o-', linewidth=2, markersize=6, label=name_a, color='#6b7280')
-ax2.plot(stueckzahlen, kosten_verlauf_b, 's-', linewidth=2, markersize=6, label=name_b, color='#3b82f6')
-
-ax2.axvline(result_a['ges_stueck'], color='red', linestyle='--', alpha=0.5, label='Aktuelles Programm')
-ax2.scatter([result_a['ges_stueck']], [result_a['ges_kosten']], s=150, color='#6b7280',
-            edgecolors='red', linewidths=2, zorder=5)
-ax2.scatter([result_b['ges_stueck']], [result_b['ges_kosten']], s=150, color='#3b82f6',
-            edgecolors='red', linewidths=2, zorder=5)
-
-ax2.set_xlabel('Stückzahl pro Jahr', fontsize=12)
-ax2.set_ylabel('Gesamtkosten [€]', fontsize=12)
-ax2.set_title('Kostenvergleich bei verschiedenen Produktionsmengen', fontsize=14, fontweight='bold')
-ax2.legend(fontsize=10)
-ax2.grid(alpha=0.3)
-plt.tight_layout()
-breakeven_img = fig_to_base64(fig2)
-st.pyplot(fig2)
+stueckzahlen, kosten_verlauf_a, kosten_verlauf_b = knoten('break_even', eingaben, lambda: break_even_verlauf(
+    daten_kern, (res_a['mss_fix'], res_a['mss_var']), (res_b['mss_fix'], res_b['mss_var']),
+    lohn_satz, bedien_a, bedien_b, tuple(faktoren)
+))
+
+breakeven_png = break_even_diagramm(
+    stueckzahlen, kosten_verlauf_a, kosten_verlauf_b,
+    (result_a['ges_stueck'], result_a['ges_kosten']),
+    (result_b['ges_stueck'], result_b['ges_kosten']),
+    name_a, name_b, standard
+)
+breakeven_img = png_to_base64(breakeven_png)
+st.image(breakeven_png, use_container_width=True)
 
 # =========================
 # STÜCKKOSTENDETAILS
@@ -548,19 +656,330 @@ df_vergleich = result_a['details'][['Serie', 'Stück/Jahr', 'Kosten/Stück (€)
 df_vergleich.rename(columns={'Kosten/Stück (€)': 'Kosten/Stk A (€)'}, inplace=True)
 df_vergleich['Kosten/Stk B (€)'] = result_b['details']['Kosten/Stück (€)'].values
 df_vergleich['Differenz (€)'] = df_vergleich['Kosten/Stk A (€)'] - df_vergleich['Kosten/Stk B (€)']
-df_vergleich['Vorteil'] = df_vergleich['Differenz (€)'].apply(
-    lambda x: f"✅ B spart {abs(x):.2f} €" if x > 0 else f"⚠️ A spart {abs(x):.2f} €"
-)
+df_vergleich['Vorteil'] = vorteil_text(df_vergleich['Differenz (€)'])
+
+# Break-Even-Menge je Serie (analytisch, Serien/Jahr fest)
+be_menge, be_richtung = knoten('break_even_serien', eingaben, lambda: break_even_serien(
+    daten_kern, (res_a['mss_fix'], res_a['mss_var']), (res_b['mss_fix'], res_b['mss_var']),
+    lohn_satz, bedien_a, bedien_b))
+df_vergleich['Break-Even (Stk/Jahr)'] = be_menge
+df_vergleich['B günstiger'] = pd.Series(be_richtung).map({
+    'ab': 'ab Break-Even', 'bis': 'bis Break-Even', 'immer': 'immer', 'nie': 'nie'
+}).values
+
+if len(df_vergleich) > GROSSE_TABELLE:
+    # Großes Programm: Überblick aus Aggregaten, Tabelle nur seitenweise
+    top = gewinner_verlierer(df_vergleich)
+    col_top_b, col_top_a = st.columns(2)
+    with col_top_b:
+        st.subheader(f"Größter Vorteil {name_b}")
+        st.dataframe(top['b'].style.format({'Stück/Jahr': '{:.0f}', 'Differenz (€)': '{:.2f}',
+                                            'Vorteil/Jahr (€)': '{:,.0f}'}),
+                     use_container_width=True, hide_index=True)
+    with col_top_a:
+        st.subheader(f"Größter Vorteil {name_a}")
+        st.dataframe(top['a'].style.format({'Stück/Jahr': '{:.0f}', 'Differenz (€)': '{:.2f}',
+                                            'Vorteil/Jahr (€)': '{:,.0f}'}),
+                     use_container_width=True, hide_index=True)
+    st.caption(f"Verteilung der Differenz je Stück (A − B) über {len(df_vergleich):,} Serien".replace(",", "."))
+    st.bar_chart(histogramm(df_vergleich['Differenz (€)']))
+
+seitenweise_tabelle(df_vergleich, 'vergleich', {
+    'Stück/Jahr': '{:.0f}',
+    'Kosten/Stk A (€)': '{:.2f}',
+    'Kosten/Stk B (€)': '{:.2f}',
+    'Differenz (€)': '{:.2f}',
+    'Break-Even (Stk/Jahr)': '{:,.0f}'
+}, farbspalte='Differenz (€)', na_rep='–')
+st.caption("Break-Even: Jahresstückzahl je Serie (bei gleicher Anzahl Serien/Jahr), ab bzw. bis zu der "
+           "Maschine B günstiger ist als A – exakt aus Rüst- und Bearbeitungskosten beider Maschinen.")
+
+# =========================
+# LOSGRÖSSENOPTIMIERUNG
+# =========================
+@st.fragment
+def losgroessen_abschnitt():
+    """Losgrößen-Abschnitt als Fragment: der Lagerkostensatz rechnet nur diesen Abschnitt neu"""
+    st.divider()
+    st.header("📦 Losgrößenoptimierung")
+
+    st.write("""
+    Kostenoptimale Losgröße je Serie aus Jahresbedarf, Rüstkosten (Rüstzeit × MSS bei voller Bedienung)
+    und Lagerhaltungskosten – unter Beachtung der verfügbaren Maschinenstunden.
+    """)
+
+    lager_satz = st.slider("Lagerhaltungskostensatz [% p.a. vom Bearbeitungswert]", 0.0, 50.0, 20.0, 1.0) / 100
+
+    if lager_satz > 0:
+        los = optimiere_losgroessen(
+            daten_kern,
+            (res_a['mss_fix'], res_b['mss_fix']),
+            (res_a['mss_var'], res_b['mss_var']),
+            lohn_satz,
+            (bedien_a, bedien_b),
+            (res_a['stunden_effektiv'], res_b['stunden_effektiv']),
+            lager_satz
+        )
+        ersparnis_los_ist = los['kosten_ist'][0] - los['kosten_ist'][1]
+        ersparnis_los_opt = los['kosten_opt'][0] - los['kosten_opt'][1]
+
+        col_los1, col_los2, col_los3 = st.columns(3)
+        with col_los1:
+            st.metric(f"Kosten A inkl. Lager ({name_a})", f"{los['kosten_opt'][0]:,.0f} €".replace(",", "."),
+                      delta=f"{los['kosten_opt'][0] - los['kosten_ist'][0]:,.0f} €".replace(",", "."),
+                      delta_color="inverse", help="Mit optimalen Losgrößen, Delta gegenüber Ist-Losgrößen")
+        with col_los2:
+            st.metric(f"Kosten B inkl. Lager ({name_b})", f"{los['kosten_opt'][1]:,.0f} €".replace(",", "."),
+                      delta=f"{los['kosten_opt'][1] - los['kosten_ist'][1]:,.0f} €".replace(",", "."),
+                      delta_color="inverse", help="Mit optimalen Losgrößen, Delta gegenüber Ist-Losgrößen")
+        with col_los3:
+            st.metric("Vorteil B inkl. Lager", f"{ersparnis_los_opt:,.0f} €".replace(",", "."),
+                      delta=f"{ersparnis_los_opt - ersparnis_los_ist:,.0f} € ggü. Ist-Losgrößen".replace(",", "."),
+                      help="Positive Werte bedeuten: Maschine B ist günstiger")
+
+        for name_m, ok_m, lam_m in zip((name_a, name_b), los['kapazitaet_ok'], los['schattenpreis']):
+            if not ok_m:
+                st.error(f"❌ {name_m}: Auch mit maximalen Losgrößen reicht die Kapazität nicht.")
+            elif lam_m > 0:
+                st.info(f"ℹ️ {name_m}: Kapazität begrenzt die Losgrößen (Schattenpreis Rüststunde: {lam_m:,.2f} €/h).")
+
+        seitenweise_tabelle(los['details'], 'losgroessen', {
+            'Serien/Jahr opt. A': '{:.1f}',
+            'Serien/Jahr opt. B': '{:.1f}',
+            'Kosten Ist A (€)': '{:.2f}',
+            'Kosten opt. A (€)': '{:.2f}',
+            'Kosten Ist B (€)': '{:.2f}',
+            'Kosten opt. B (€)': '{:.2f}'
+        })
+        st.caption("Kosten je Serie und Jahr: Bearbeitung + Rüsten + Lagerhaltung (halber Losbestand).")
+    else:
+        st.info("Ohne Lagerhaltungskosten ist die größtmögliche Losgröße (eine Serie pro Jahr) optimal.")
+
+losgroessen_abschnitt()
+
+# =========================
+# MASCHINENKATALOG
+# =========================
+@st.fragment
+def katalog_abschnitt():
+    """Katalog-Abschnitt als Fragment: Upload und Filter rechnen nur diesen Abschnitt neu"""
+    st.divider()
+    st.header("🗂️ Maschinenkatalog")
+    st.write(f"""
+    Katalogmaschinen (CSV) nach Restriktionen filtern und für das aktuelle Produktionsprogramm
+    nach Jahreskosten und Barwert gegenüber Maschine A ({name_a}) bewerten.
+    """)
+
+    col_kat1, col_kat2 = st.columns([3, 1])
+    with col_kat1:
+        katalog_datei = st.file_uploader("Maschinenkatalog (CSV)", type=["csv"])
+    with col_kat2:
+        st.download_button("⬇️ CSV-Vorlage", data=katalog_vorlage(), file_name="Maschinenkatalog_Vorlage.csv",
+                           mime="text/csv", use_container_width=True)
+
+    if katalog_datei is not None:
+        try:
+            katalog = lade_katalog(katalog_datei.getvalue())
+        except ValueError as e:
+            katalog = None
+            st.error(f"❌ Katalog konnte nicht gelesen werden: {e}")
+
+        if katalog is not None and len(katalog) > 0:
+            col_f1, col_f2, col_f3 = st.columns(3)
+            with col_f1:
+                max_budget = st.number_input("Max. Anschaffungskosten [€]", min_value=0,
+                                             value=int(katalog["Anschaffungskosten [€]"].max()), step=10000)
+            with col_f2:
+                max_platz = st.number_input("Max. Platzbedarf [m²]", min_value=0,
+                                            value=int(np.ceil(katalog["Platzbedarf [m²]"].max())), step=5)
+            with col_f3:
+                nur_kapazitaet = st.checkbox("Nur Maschinen mit ausreichender Kapazität", value=True)
+
+            # Referenz A rechnet mit der Preisreihe: Kandidaten dann mit deren Ø Preis in A's Betriebsstunden
+            katalog_strom = energie_tou_a['preis_mittel'] if energie_tou_a is not None else strom_preis
+            t_start = time.perf_counter()
+            kandidaten = filtere_katalog(katalog, max_budget=max_budget, max_platz=max_platz)
+            ranking = bewerte_katalog(
+                kandidaten, programmstunden(daten_kern, "A"),
+                {'ak': ak_a, 'restwert': restwert_a, 'ges_kosten': result_a['ges_kosten']},
+                int(n), zins_satz, lohn_satz, raum_preis, katalog_strom
+            )
+            if nur_kapazitaet:
+                ranking = ranking[ranking['Kapazität OK']]
+            dauer_ms = (time.perf_counter() - t_start) * 1000
+
+            st.caption(f"{len(ranking)} von {len(katalog)} Maschinen erfüllen die Restriktionen "
+                       f"(Filter + Bewertung: {dauer_ms:.0f} ms).")
+            if energie_tou_a is not None:
+                st.caption(f"⚡ Katalogmaschinen mit dem Ø Preis der Preisreihe in den Betriebsstunden von {name_a} "
+                           f"({katalog_strom:.3f} €/kWh, ohne Lastprofil); {name_a} selbst mit zeitvariablem Tarif.")
+            st.dataframe(
+                ranking.style.format({
+                    'Anschaffungskosten [€]': '{:,.0f}',
+                    'Platzbedarf [m²]': '{:.0f}',
+                    'MSS gesamt [€/h]': '{:.2f}',
+                    'Jahreskosten (€)': '{:,.0f}',
+                    'Ersparnis/Jahr (€)': '{:,.0f}',
+                    'NPV ggü. Referenz (€)': '{:,.0f}',
+                    'Auslastung (%)': '{:.1f}'
+                }),
+                use_container_width=True
+            )
+        elif katalog is not None:
+            st.info("Der Katalog enthält keine gültigen Maschinen.")
+    else:
+        st.info("Katalog als CSV hochladen (Spalten siehe Vorlage; Zeitfaktoren relativ zu den Zeiten von Maschine A).")
+
+katalog_abschnitt()
+
+# =========================
+# PORTFOLIO
+# =========================
+def aktueller_vergleich():
+    """Aktuelle Sidebar-Eingaben und Programm als Vorhaben-Zeile (Spalten wie VORHABEN_SPALTEN)"""
+    zeile = {"Standort": ""}
+    for m, werte in (("A", (ak_a, restwert_a, h_jahr_a, nutzgrad_a, bedien_a, wartung_a, raum_a, energie_a,
+                             vers_a, werkzeug_a)),
+                     ("B", (ak_b, restwert_b, h_jahr_b, nutzgrad_b, bedien_b, wartung_b, raum_b, energie_b,
+                             vers_b, werkzeug_b))):
+        ak, rest, h_jahr, nutzgrad, bedien, wartung, raum, kw, vers, werkzeug = werte
+        zeile.update({
+            f"Anschaffungskosten {m} [€]": float(ak), f"Restwert {m} [€]": float(rest),
+            f"Betriebsstunden/Jahr {m}": float(h_jahr), f"Nutzungsgrad {m} [%]": nutzgrad * 100,
+            f"Bedienfaktor {m}": float(bedien), f"Wartungssatz {m} [%]": wartung * 100,
+            f"Platzbedarf {m} [m²]": float(raum), f"Leistungsaufnahme {m} [kW]": float(kw),
+            f"Versicherung {m} [€/Jahr]": float(vers), f"Werkzeugkosten {m} [€/Jahr]": float(werkzeug),
+        })
+    zeile.update({"Nutzungsdauer [Jahre]": np.nan, "Lohnkosten [€/h]": np.nan,
+                  "Strompreis [€/kWh]": np.nan, "Raumkosten [€/m²/Monat]": np.nan})
+    return zeile
 
-st.dataframe(
-    df_vergleich.style.format({
-        'Stück/Jahr': '{:.0f}',
-        'Kosten/Stk A (€)': '{:.2f}',
-        'Kosten/Stk B (€)': '{:.2f}',
-        'Differenz (€)': '{:.2f}'
-    }).background_gradient(subset=['Differenz (€)'], cmap='RdYlGn'),
-    use_container_width=True
-)
+
+@st.fragment
+def portfolio_abschnitt():
+    """Portfolio als Fragment: Budgetänderungen lösen nur die Auswahl neu, ohne Kosten neu zu rechnen"""
+    st.divider()
+    st.header("🏭 Portfolio: mehrere Investitionsentscheidungen")
+    st.write("""
+    Mehrere A/B-Vergleiche (z. B. verschiedene Standorte) konkurrieren um ein Investitionsbudget.
+    Jeder Vergleich wird einzeln bewertet und gecacht; ausgewählt wird die Teilmenge mit dem
+    höchsten Gesamt-NPV, die das Budget einhält.
+    """)
+
+    eigene = st.session_state.setdefault('portfolio_eigene', {})
+    col_p1, col_p2, col_p3 = st.columns([2, 2, 1])
+    with col_p1:
+        vorhaben_datei = st.file_uploader("Vorhaben (CSV, eine Zeile je Vergleich)", type=["csv"])
+    with col_p2:
+        programme_datei = st.file_uploader("Programme (CSV, Spalte 'Vorhaben' je Serie)", type=["csv"])
+    with col_p3:
+        vorlagen = portfolio_vorlagen()
+        st.download_button("⬇️ Vorlage Vorhaben", data=vorlagen['vorhaben'], file_name="Portfolio_Vorhaben.csv",
+                           mime="text/csv", use_container_width=True)
+        st.download_button("⬇️ Vorlage Programme", data=vorlagen['programme'], file_name="Portfolio_Programme.csv",
+                           mime="text/csv", use_container_width=True)
+
+    vorhaben, programme = [], []
+    if vorhaben_datei is not None and programme_datei is not None:
+        try:
+            vorhaben = [lade_vorhaben(vorhaben_datei.getvalue())]
+            programme = [lade_programme(programme_datei.getvalue())]
+        except ValueError as e:
+            vorhaben, programme = [], []
+            st.error(f"❌ Portfolio konnte nicht gelesen werden: {e}")
+    elif vorhaben_datei is not None or programme_datei is not None:
+        st.info("Bitte sowohl Vorhaben als auch Programme hochladen.")
+    hochgeladen = set(vorhaben[0].index) if vorhaben else set()
+
+    col_e1, col_e2 = st.columns([3, 1])
+    with col_e1:
+        if st.button(f"➕ Aktuellen Vergleich aufnehmen ({name_a} → {name_b})"):
+            name = eindeutiger_name(f"{name_a} → {name_b}", hochgeladen | set(eigene))
+            eigene[name] = (aktueller_vergleich(), df_serien)
+    with col_e2:
+        if eigene and st.button("🗑️ Eigene leeren", use_container_width=True):
+            eigene.clear()
+
+    # Namen identifizieren die Programmzeilen: eigene Vergleiche nie unter dem Namen eines hochgeladenen
+    # Vorhabens (auch wenn die Datei erst nach dem Aufnehmen kommt), sonst würden die Programme vermischt
+    namen_eigene = []
+    for name in eigene:
+        namen_eigene.append(eindeutiger_name(name, hochgeladen | set(eigene) | set(namen_eigene))
+                            if name in hochgeladen else name)
+    if eigene:
+        vorhaben.append(pd.DataFrame([zeile for zeile, _ in eigene.values()],
+                                     index=pd.Index(namen_eigene, name="Vorhaben"),
+                                     columns=list(VORHABEN_SPALTEN)[1:]))
+        programme.extend(programm.assign(Vorhaben=name)
+                         for name, (_, programm) in zip(namen_eigene, eigene.values()))
+
+    if not vorhaben:
+        st.info("Vorhaben und Programme als CSV hochladen (Spalten siehe Vorlagen; leere Standortwerte wie Lohn "
+                "oder Strompreis gelten aus den Grundparametern) oder den aktuellen Vergleich aufnehmen.")
+        return
+
+    vorhaben = pd.concat(vorhaben)
+    programme = pd.concat(programme, ignore_index=True)
+    grund = {'n': int(n), 'zins': zins_satz, 'lohn': lohn_satz, 'strom_preis': strom_preis,
+             'raum_preis': raum_preis, 'kosten_steigerung': kosten_steigerung, 'prod_wachstum': prod_wachstum}
+
+    if energie_tou_a is not None:
+        st.caption("⚡ Das Portfolio rechnet Energie mit festem Strompreis je Standort (Spalte Strompreis bzw. "
+                   "Grundparameter); die stündliche Preisreihe gilt nur für den Einzelvergleich.")
+
+    t_start = time.perf_counter()
+    bewertung, ohne_programm = bewerte_portfolio(vorhaben, programme, grund)
+    dauer_bewertung = (time.perf_counter() - t_start) * 1000
+    if ohne_programm:
+        st.warning(f"Ohne Programmzeilen übersprungen: {', '.join(ohne_programm)}")
+    if bewertung.empty:
+        st.info("Keine gültigen Vorhaben mit Programm gefunden.")
+        return
+
+    col_b1, col_b2 = st.columns(2)
+    with col_b1:
+        bedarf_art = st.radio("Budgetbedarf je Vorhaben", list(BUDGETBEDARF), horizontal=True)
+    bedarf_spalte = BUDGETBEDARF[bedarf_art]
+    gesamt_bedarf = float(bewertung[bedarf_spalte].clip(lower=0).sum())
+    with col_b2:
+        budget = st.number_input("Investitionsbudget [€]", min_value=0, value=int(gesamt_bedarf), step=50000)
+
+    t_start = time.perf_counter()
+    wahl = waehle_portfolio(bewertung, budget, bedarf_spalte)
+    dauer_auswahl = (time.perf_counter() - t_start) * 1000
+    bewertung = bewertung.assign(**{'Ausgewählt': wahl['auswahl']})
+    gewaehlt = bewertung[bewertung['Ausgewählt']]
+
+    col_m1, col_m2, col_m3 = st.columns(3)
+    with col_m1:
+        st.metric("Ausgewählte Vorhaben", f"{len(gewaehlt)} von {len(bewertung)}")
+    with col_m2:
+        st.metric("Budget genutzt", f"{gewaehlt[bedarf_spalte].clip(lower=0).sum():,.0f} €".replace(",", "."),
+                  help=f"von {budget:,.0f} €".replace(",", "."))
+    with col_m3:
+        st.metric("Gesamt-NPV (B statt A)", f"{gewaehlt['NPV B statt A (€)'].sum():,.0f} €".replace(",", "."))
+
+    st.dataframe(
+        bewertung.style.format({
+            'Anschaffungskosten B (€)': '{:,.0f}',
+            'Mehrinvestition (€)': '{:,.0f}',
+            'Ersparnis/Jahr (€)': '{:,.0f}',
+            'NPV B statt A (€)': '{:,.0f}',
+            'Auslastung A (%)': '{:.1f}',
+            'Auslastung B (%)': '{:.1f}'
+        }),
+        use_container_width=True
+    )
+    st.caption(f"Bewertung {len(bewertung)} Vorhaben: {dauer_bewertung:.0f} ms, Auswahl: {dauer_auswahl:.1f} ms. "
+               f"Exakt auf einem Budgetraster von {wahl['raster']:,.0f} € (Bedarf aufgerundet); "
+               "Vorhaben ohne ausreichende Kapazität oder mit NPV ≤ 0 werden nicht ausgewählt.".replace(",", "."))
+
+    # Effizienzkurve: bester Gesamt-NPV je Budget (aus derselben DP-Tabelle)
+    schritt = max(1, len(wahl['budgets']) // 500)
+    st.line_chart(pd.DataFrame({'Gesamt-NPV (€)': wahl['npv_kurve'][::schritt]},
+                               index=pd.Index(wahl['budgets'][::schritt], name='Budget (€)')))
+
+portfolio_abschnitt()
 
 # =========================
 # DETAILLIERTE AUFSCHLÜSSELUNG
@@ -570,34 +989,28 @@ with st.expander("📋 Detaillierte Kostenaufschlüsselung"):
 
     with tab1:
         st.subheader(f"{name_a} - Details")
-        st.dataframe(
-            result_a['details'].style.format({
-                'Stück/Jahr': '{:.0f}',
-                'Zeit Bearb (h)': '{:.1f}',
-                'Zeit Rüst (h)': '{:.1f}',
-                'Kosten Bearb (€)': '{:.2f}',
-                'Kosten Rüst (€)': '{:.2f}',
-                'Kosten Gesamt (€)': '{:.2f}',
-                'Kosten/Stück (€)': '{:.2f}'
-            }),
-            use_container_width=True
-        )
+        seitenweise_tabelle(result_a['details'], 'details_a', {
+            'Stück/Jahr': '{:.0f}',
+            'Zeit Bearb (h)': '{:.1f}',
+            'Zeit Rüst (h)': '{:.1f}',
+            'Kosten Bearb (€)': '{:.2f}',
+            'Kosten Rüst (€)': '{:.2f}',
+            'Kosten Gesamt (€)': '{:.2f}',
+            'Kosten/Stück (€)': '{:.2f}'
+        })
         st.write(f"**Summe Gesamtkosten:** {result_a['ges_kosten']:,.2f} €")
 
     with tab2:
         st.subheader(f"{name_b} - Details")
-        st.dataframe(
-            result_b['details'].style.format({
-                'Stück/Jahr': '{:.0f}',
-                'Zeit Bearb (h)': '{:.1f}',
-                'Zeit Rüst (h)': '{:.1f}',
-                'Kosten Bearb (€)': '{:.2f}',
-                'Kosten Rüst (€)': '{:.2f}',
-                'Kosten Gesamt (€)': '{:.2f}',
-                'Kosten/Stück (€)': '{:.2f}'
-            }),
-            use_container_width=True
-        )
+        seitenweise_tabelle(result_b['details'], 'details_b', {
+            'Stück/Jahr': '{:.0f}',
+            'Zeit Bearb (h)': '{:.1f}',
+            'Zeit Rüst (h)': '{:.1f}',
+            'Kosten Bearb (€)': '{:.2f}',
+            'Kosten Rüst (€)': '{:.2f}',
+            'Kosten Gesamt (€)': '{:.2f}',
+            'Kosten/Stück (€)': '{:.2f}'
+        })
         st.write(f"**Summe Gesamtkosten:** {result_b['ges_kosten']:,.2f} €")
 
 # =========================
@@ -661,6 +1074,12 @@ def generate_html_report():
     fix_df_b_html = fix_df_b.copy()
     fix_df_b_html['Betrag [€/Jahr]'] = fix_df_b_html['Betrag [€/Jahr]'].apply(lambda v: f"{fmt_eur(v, 2)} €")
 
+    # Große Programme: Bericht mit den ersten Zeilen, vollständige Tabellen im Excel-Export
+    vergleich_html, vergleich_rest = bericht_tabelle(df_vergleich)
+    serien_html, serien_rest = bericht_tabelle(df_serien)
+    def rest_hinweis(rest):
+        return f"<p><em>… {rest:,} weitere Zeilen im Excel-Export</em></p>".replace(",", ".") if rest else ""
+
     html_content = f"""
     <!DOCTYPE html>
     <html lang="de">
@@ -871,12 +1290,14 @@ def generate_html_report():
 
         <div class="section">
             <h2>🔍 Stückkostenvergleich</h2>
-            {df_vergleich.to_html(index=False, classes='table')}
+            {vergleich_html.to_html(index=False, classes='table', na_rep='–', float_format=lambda v: f'{v:.2f}')}
+            {rest_hinweis(vergleich_rest)}
         </div>
 
         <div class="section">
             <h2>📋 Produktionsprogramm</h2>
-            {df_serien.to_html(index=False, classes='table')}
+            {serien_html.to_html(index=False, classes='table')}
+            {rest_hinweis(serien_rest)}
         </div>
 
         <div class="section">
@@ -922,65 +1343,115 @@ def generate_html_report():
 # =========================
 # EXPORT
 # =========================
-st.divider()
-st.header("💾 Export")
-col_export1, col_export2 = st.columns(2)
-
-with col_export1:
-    if st.button("📄 HTML-Bericht generieren", use_container_width=True):
-        html_report = generate_html_report()
-        st.download_button(
-            label="⬇️ HTML-Bericht herunterladen",
-            data=html_report,
-            file_name=f"Wirtschaftlichkeitsvergleich_{datetime.now().strftime('%Y%m%d_%H%M')}.html",
-            mime="text/html",
-            use_container_width=True
-        )
-        st.success("✅ HTML-Bericht erfolgreich generiert!")
-
-with col_export2:
-    if st.button("📊 Excel-Export (Rohdaten)", use_container_width=True):
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            overview_data = pd.DataFrame({
-                'Kennzahl': ['Gesamtkosten', 'Gesamtstunden', 'Gesamtstückzahl', 'Auslastung', 'MSS Gesamt', 'Mehrinvest', 'Amortisation', 'NPV (B statt A)'],
-                name_a: [
-                    f"{result_a['ges_kosten']:.2f} €",
-                    f"{result_a['ges_stunden']:.1f} h",
-                    f"{result_a['ges_stueck']} Stk",
-                    f"{ausl_a*100:.1f}%",
-                    f"{mss_gesamt_a:.2f} €/h",
-                    "",
-                    "",
-                    ""
-                ],
-                name_b: [
-                    f"{result_b['ges_kosten']:.2f} €",
-                    f"{result_b['ges_stunden']:.1f} h",
-                    f"{result_b['ges_stueck']} Stk",
-                    f"{ausl_b*100:.1f}%",
-                    f"{mss_gesamt_b:.2f} €/h",
-                    f"{mehrinvest:.2f} €",
-                    f"{amortisation:.2f} Jahre" if amortisation is not None else "N/A",
-                    f"{npv_b_vs_a:.2f} €" if npv_b_vs_a is not None else "N/A"
-                ]
-            })
-            overview_data.to_excel(writer, sheet_name='Übersicht', index=False)
-            result_a['details'].to_excel(writer, sheet_name='Details_A', index=False)
-            result_b['details'].to_excel(writer, sheet_name='Details_B', index=False)
-            df_serien.to_excel(writer, sheet_name='Produktionsprogramm', index=False)
-            fix_df_a.to_excel(writer, sheet_name='Fixkosten_A', index=False)
-            fix_df_b.to_excel(writer, sheet_name='Fixkosten_B', index=False)
-
-        output.seek(0)
-        st.download_button(
-            label="⬇️ Excel-Datei herunterladen",
-            data=output,
-            file_name=f"Wirtschaftlichkeitsvergleich_Daten_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            use_container_width=True
-        )
-        st.success("✅ Excel-Export vorbereitet!")
+@st.fragment
+def export_abschnitt():
+    """Export als Fragment: Button-Klicks lösen keinen vollständigen Rerun aus"""
+    st.divider()
+    st.header("💾 Export")
+    col_export1, col_export2 = st.columns(2)
+
+    with col_export1:
+        if st.button("📄 HTML-Bericht generieren", use_container_width=True):
+            html_report = generate_html_report()
+            st.download_button(
+                label="⬇️ HTML-Bericht herunterladen",
+                data=html_report,
+                file_name=f"Wirtschaftlichkeitsvergleich_{datetime.now().strftime('%Y%m%d_%H%M')}.html",
+                mime="text/html",
+                use_container_width=True
+            )
+            st.success("✅ HTML-Bericht erfolgreich generiert!")
+
+    with col_export2:
+        if st.button("📊 Excel-Export (Rohdaten)", use_container_width=True):
+            output = BytesIO()
+            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+                overview_data = pd.DataFrame({
+                    'Kennzahl': ['Gesamtkosten', 'Gesamtstunden', 'Gesamtstückzahl', 'Auslastung', 'MSS Gesamt', 'Mehrinvest', 'Amortisation', 'NPV (B statt A)'],
+                    name_a: [
+                        f"{result_a['ges_kosten']:.2f} €",
+                        f"{result_a['ges_stunden']:.1f} h",
+                        f"{result_a['ges_stueck']} Stk",
+                        f"{ausl_a*100:.1f}%",
+                        f"{mss_gesamt_a:.2f} €/h",
+                        "",
+                        "",
+                        ""
+                    ],
+                    name_b: [
+                        f"{result_b['ges_kosten']:.2f} €",
+                        f"{result_b['ges_stunden']:.1f} h",
+                        f"{result_b['ges_stueck']} Stk",
+                        f"{ausl_b*100:.1f}%",
+                        f"{mss_gesamt_b:.2f} €/h",
+                        f"{mehrinvest:.2f} €",
+                        f"{amortisation:.2f} Jahre" if amortisation is not None else "N/A",
+                        f"{npv_b_vs_a:.2f} €" if npv_b_vs_a is not None else "N/A"
+                    ]
+                })
+                overview_data.to_excel(writer, sheet_name='Übersicht', index=False)
+                result_a['details'].to_excel(writer, sheet_name='Details_A', index=False)
+                result_b['details'].to_excel(writer, sheet_name='Details_B', index=False)
+                df_serien.to_excel(writer, sheet_name='Produktionsprogramm', index=False)
+                df_vergleich.to_excel(writer, sheet_name='Stückkostenvergleich', index=False)
+                fix_df_a.to_excel(writer, sheet_name='Fixkosten_A', index=False)
+                fix_df_b.to_excel(writer, sheet_name='Fixkosten_B', index=False)
+                df_finanzplan.to_excel(writer, sheet_name='Finanzierungsplan', index=False)
+                if df_mehrjahr is not None:
+                    df_mehrjahr.to_excel(writer, sheet_name='Mehrjahresprogramm', index=False)
+
+            output.seek(0)
+            st.download_button(
+                label="⬇️ Excel-Datei herunterladen",
+                data=output,
+                file_name=f"Wirtschaftlichkeitsvergleich_Daten_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                use_container_width=True
+            )
+            st.success("✅ Excel-Export vorbereitet!")
+
+export_abschnitt()
+
+# =========================
+# TEILEN (SNAPSHOT)
+# =========================
+@st.fragment
+def teilen_abschnitt():
+    """Eingaben als Link oder Datei teilen und wiederherstellen (Fragment: Erstellen rechnet nichts neu)"""
+    if st.session_state.pop('snapshot_neu', False):
+        # Datei wurde im Fragment geladen: Sidebar und Programm gehören zum ganzen Skript
+        st.rerun(scope="app")
+
+    st.divider()
+    st.header("🔗 Teilen")
+    st.caption("Snapshot aller Sidebar-Eingaben und des Produktionsprogramms (kompakt, versioniert, komprimiert). "
+               "Hochgeladene Dateien (Strompreise, Mengenplanung, Katalog, Portfolio) sind nicht enthalten.")
+
+    col_link, col_laden = st.columns(2)
+    with col_link:
+        if st.button("🔗 Snapshot erstellen", use_container_width=True):
+            t0 = time.perf_counter()
+            code = kodiere_snapshot({k: st.session_state[k] for k in SNAPSHOT_SCHEMA}, df_serien)
+            dauer = (time.perf_counter() - t0) * 1000
+            zeichen, serien = (f"{len(code):,}".replace(",", "."), f"{len(df_serien):,}".replace(",", "."))
+            st.caption(f"{zeichen} Zeichen für {serien} Serien, kodiert in {dauer:.1f} ms")
+            if len(code) <= URL_MAX_ZEICHEN:
+                # Eigener Link: beim nächsten Durchlauf nicht erneut wiederherstellen
+                st.session_state['snapshot_geladen'] = code
+                st.query_params[URL_PARAMETER] = code
+                st.code(f"{(st.context.url or '').split('?')[0]}?{URL_PARAMETER}={code}", language=None)
+                st.success("Link erstellt und in die Adresszeile übernommen.")
+            else:
+                st.info(f"Für einen Link zu lang (mehr als {URL_MAX_ZEICHEN:,} Zeichen) – bitte als Datei teilen."
+                        .replace(",", "."))
+            st.download_button("📥 Snapshot-Datei", data=code,
+                               file_name=f"Snapshot_{datetime.now().strftime('%Y%m%d_%H%M')}.txt",
+                               mime="text/plain", use_container_width=True)
+    with col_laden:
+        st.file_uploader("Snapshot-Datei laden", type=["txt"], key="snapshot_datei", on_change=snapshot_datei_laden)
+
+
+teilen_abschnitt()
 
 # --- FOOTER ---
 st.divider()
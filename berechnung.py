@@ -0,0 +1,321 @@
+import hashlib
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+# =========================
+# BERECHNUNGSFUNKTIONEN
+# =========================
+def berechne_mss_batch(ak, n, zins, wartung_satz, raum, r_preis, vers, werkzeug, h_jahr, nutzgrad, kw, s_preis, restwert=0.0):
+    """
+    Vektorisierte Variante von berechne_mss: alle Parameter dürfen Arrays sein
+    (z. B. ein ganzer Maschinenkatalog), Rückgabe enthält Arrays gleicher Form.
+    """
+    ak = np.asarray(ak, dtype=float)
+    n = np.asarray(n, dtype=float)
+    restwert = np.asarray(restwert, dtype=float)
+
+    afa_basis = np.maximum(0.0, ak - restwert)
+    afa = np.divide(afa_basis, n, out=np.zeros(np.broadcast(afa_basis, n).shape), where=n > 0)
+
+    geb_kapital_mittel = (ak + restwert) / 2.0
+    zinsen = geb_kapital_mittel * zins
+
+    wartung = ak * wartung_satz
+    raumkosten = np.asarray(raum, dtype=float) * r_preis * 12
+    fix_jahr = afa + zinsen + wartung + raumkosten + vers + werkzeug
+
+    stunden_effektiv = np.asarray(h_jahr, dtype=float) * nutzgrad
+    mss_fix = np.divide(fix_jahr, stunden_effektiv, out=np.zeros(np.broadcast(fix_jahr, stunden_effektiv).shape),
+                        where=stunden_effektiv > 0)
+    mss_var = np.asarray(kw, dtype=float) * s_preis
+
+    return {
+        'mss_fix': mss_fix,
+        'mss_var': mss_var,
+        'fix_jahr': fix_jahr,
+        'stunden_effektiv': stunden_effektiv,
+        'afa': afa,
+        'zinsen': zinsen,
+        'wartung': wartung,
+        'raumkosten': raumkosten,
+        'versicherung': np.asarray(vers, dtype=float),
+        'werkzeug': np.asarray(werkzeug, dtype=float)
+    }
+
+@st.cache_data(show_spinner=False)
+def berechne_mss(ak, n, zins, wartung_satz, raum, r_preis, vers, werkzeug, h_jahr, nutzgrad, kw, s_preis, restwert=0.0):
+    """
+    Berechnet Maschinenstundensatz und Kostenkomponenten
+    - AfA: linear auf Basis (AK - Restwert)
+    - Kalk. Zinsen: auf durchschnittlich gebundenes Kapital ~ (AK + Restwert)/2
+    """
+    res = berechne_mss_batch(ak, n, zins, wartung_satz, raum, r_preis, vers, werkzeug,
+                             h_jahr, nutzgrad, kw, s_preis, restwert=restwert)
+    return {k: float(v) for k, v in res.items()}
+
+# =========================
+# PROGRAMMDATEN (EINMAL JE PROGRAMMVERSION)
+# =========================
+MASCHINEN = ("A", "B")
+SPALTEN_BEARB = [f"Bearbzeit (min/Stk) {m}" for m in MASCHINEN]
+SPALTEN_RUEST = [f"Rüstzeit (min) {m}" for m in MASCHINEN]
+PROGRAMM_SPALTEN = ["Serie", "Serien/Jahr", "Stück/Serie"] + SPALTEN_BEARB + SPALTEN_RUEST
+
+
+def zahlen(spalte):
+    """Text oder Zahl -> float (Dezimalkomma erlaubt, Ungültiges -> NaN); gemeinsam für alle CSV-Loader"""
+    if not pd.api.types.is_numeric_dtype(spalte):
+        spalte = spalte.astype(str).str.strip().str.replace(",", ".", regex=False)
+    return pd.to_numeric(spalte, errors="coerce")
+
+
+class Programmdaten(dict):
+    """Ergebnis von programmdaten; st.cache_data hasht es über 'kennung' statt über alle Arrays"""
+
+
+# Inhalts-Hash statt Streamlits Standard-Hash: der tastet große Arrays nur stichprobenartig ab und
+# nimmt bei Objekt-Arrays (Seriennamen) die Zeiger. So teilen Sessions mit gleichem Programm den Cache.
+PROGRAMM_HASH = {Programmdaten: lambda daten: daten['kennung']}
+
+
+def programmdaten(df):
+    """
+    Produktionsprogramm einmal einlesen und prüfen; alle Maschinenbewertungen teilen das Ergebnis
+    - Mengen je Serie: 'serien_jahr', 'stueck_serie', 'stueck_jahr'
+    - Zeiten je Serie und Maschine (Serien x 2, Spalten A, B): 'zeiten_bearb', 'zeiten_ruest' [min]
+    - Stunden je Serie und Maschine: 'stunden_bearb', 'stunden_ruest' [h]
+    - Programmsummen beider Maschinen als Matrixprodukt: 'summe_bearb', 'summe_ruest' [h]
+    - leere oder nicht numerische Felder zählen als 0, 'unvollstaendig' = Anzahl betroffener Zeilen
+    - 'kennung': Inhalts-Hash (Namen + Werte) als Cache-Schlüssel über Sessions hinweg
+    - ValueError, wenn Spalten aus PROGRAMM_SPALTEN fehlen
+    """
+    fehlend = [c for c in PROGRAMM_SPALTEN if c not in df.columns]
+    if fehlend:
+        raise ValueError(f"Fehlende Spalten im Produktionsprogramm: {', '.join(fehlend)}")
+    werte = df[PROGRAMM_SPALTEN[1:]].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    fehlt = np.isnan(werte).any(axis=1)
+    werte = np.where(np.isnan(werte), 0.0, werte)
+
+    serien_jahr, stueck_serie = werte[:, 0], werte[:, 1]
+    stueck_jahr = serien_jahr * stueck_serie
+    zeiten_bearb, zeiten_ruest = werte[:, 2:4], werte[:, 4:6]
+    summe_bearb, summe_ruest = maschinenstunden(
+        {'zeiten_bearb': zeiten_bearb, 'zeiten_ruest': zeiten_ruest}, stueck_jahr, serien_jahr)
+    serie = df["Serie"].to_numpy()
+    kennung = hashlib.sha1("\x1f".join(map(str, serie)).encode("utf-8") + werte.tobytes()).hexdigest()
+    return Programmdaten({
+        'kennung': kennung,
+        'serie': serie,
+        'serien_jahr': serien_jahr,
+        'stueck_serie': stueck_serie,
+        'stueck_jahr': stueck_jahr,
+        'zeiten_bearb': zeiten_bearb,
+        'zeiten_ruest': zeiten_ruest,
+        'stunden_bearb': stueck_jahr[:, None] * zeiten_bearb / 60.0,
+        'stunden_ruest': serien_jahr[:, None] * zeiten_ruest / 60.0,
+        'summe_bearb': summe_bearb,
+        'summe_ruest': summe_ruest,
+        'unvollstaendig': int(fehlt.sum())
+    })
+
+
+def maschinenstunden(daten, stueck_jahr, serien_jahr):
+    """
+    Bearbeitungs- und Rüststunden beider Maschinen als Matrixprodukt Zeiten^T x Mengen
+    - stueck_jahr, serien_jahr: je Serie (Vektor) oder Serien x Szenarien (Break-Even-Faktoren,
+      Jahre der Mengenplanung)
+    - Rückgabe: (Bearbeitung, Rüsten) mit Zeile 0 = A, 1 = B, je Szenario eine Spalte
+    """
+    return daten['zeiten_bearb'].T @ stueck_jahr / 60.0, daten['zeiten_ruest'].T @ serien_jahr / 60.0
+
+
+def _runden(werte, stellen):
+    """
+    Wie round() je Wert, aber vektorisiert: gerundet wird der exakte Binärwert (1.15 -> 1.1).
+    np.round skaliert in double und kippt solche Fälle (1.15 -> 1.2); in erweiterter Genauigkeit
+    ist werte x 10^stellen exakt. Ohne erweiterte Genauigkeit (longdouble = double) je Wert round().
+    """
+    faktor = 10 ** stellen
+    if np.finfo(np.longdouble).nmant >= 60:
+        return np.rint(werte.astype(np.longdouble) * faktor).astype(float) / faktor
+    return np.array([round(w, stellen) for w in werte.tolist()], dtype=float)
+
+
+@st.cache_data(show_spinner=False, max_entries=256, hash_funcs=PROGRAMM_HASH)
+def kalkuliere_programm_detail(daten, mss_fix, mss_var, lohn, bedien_faktor, machine="A"):
+    """
+    Detaillierte Kalkulation mit Stückkostenaufschlüsselung (Maschine A oder B, vektorisiert)
+    - daten: Ergebnis von programmdaten (Stunden je Serie sind dort bereits gerechnet)
+    - gecacht über Sessions hinweg (gleiches Programm und gleiche Sätze rechnen nur einmal)
+    - Bearbeitung mit Bedienfaktor, Rüsten mit voller Bedienung
+    """
+    m = MASCHINEN.index(machine)
+    t_bearb_h = daten['stunden_bearb'][:, m]
+    t_ruest_h = daten['stunden_ruest'][:, m]
+    stueck_jahr = daten['stueck_jahr']
+
+    kosten_bearb = t_bearb_h * (mss_fix + mss_var + lohn * bedien_faktor)
+    kosten_ruest = t_ruest_h * (mss_fix + mss_var + lohn * 1.0)
+    kosten_ges = kosten_bearb + kosten_ruest
+    kosten_stueck = np.divide(kosten_ges, stueck_jahr, out=np.zeros_like(kosten_ges), where=stueck_jahr > 0)
+
+    details = pd.DataFrame({
+        'Serie': daten['serie'],
+        'Stück/Jahr': stueck_jahr.astype(int),
+        'Zeit Bearb (h)': _runden(t_bearb_h, 1),
+        'Zeit Rüst (h)': _runden(t_ruest_h, 1),
+        'Kosten Bearb (€)': _runden(kosten_bearb, 2),
+        'Kosten Rüst (€)': _runden(kosten_ruest, 2),
+        'Kosten Gesamt (€)': _runden(kosten_ges, 2),
+        'Kosten/Stück (€)': _runden(kosten_stueck, 2)
+    })
+    return {
+        'details': details,
+        'ges_kosten': float(kosten_ges.sum()),
+        'ges_stunden': float(daten['summe_bearb'][m] + daten['summe_ruest'][m]),
+        'ges_stueck': int(details['Stück/Jahr'].sum())
+    }
+
+def programmstunden(daten, machine="A"):
+    """Bearbeitungs- und Rüststunden des Programms auf Maschine A oder B"""
+    m = MASCHINEN.index(machine)
+    return float(daten['summe_bearb'][m]), float(daten['summe_ruest'][m])
+
+@st.cache_data(show_spinner=False, max_entries=256, hash_funcs=PROGRAMM_HASH)
+def break_even_verlauf(daten, mss_a, mss_b, lohn, bedien_a, bedien_b, faktoren):
+    """
+    Gesamtkosten A/B bei skalierten Serien/Jahr (Faktorenliste), alle Faktoren in einem Durchgang
+    - mss_a, mss_b: Tupel (mss_fix, mss_var)
+    - Serien/Jahr je Faktor gerundet (Serien x Faktoren), Stunden als Matrixprodukt
+    - gecacht über Sessions hinweg wie kalkuliere_programm_detail
+    """
+    serien = np.round(daten['serien_jahr'][:, None] * np.asarray(faktoren, dtype=float))
+    stueck = serien * daten['stueck_serie'][:, None]
+    bearb, ruest = maschinenstunden(daten, stueck, serien)
+
+    basis = np.array([mss_a[0] + mss_a[1], mss_b[0] + mss_b[1]])[:, None]
+    satz_bearb = basis + lohn * np.array([bedien_a, bedien_b])[:, None]
+    kosten = bearb * satz_bearb + ruest * (basis + lohn)
+
+    stueckzahlen = stueck.astype(int).sum(axis=0)
+    return [int(s) for s in stueckzahlen], [float(k) for k in kosten[0]], [float(k) for k in kosten[1]]
+
+def break_even_serien(daten, mss_a, mss_b, lohn, bedien_a, bedien_b):
+    """
+    Break-Even-Menge je Serie (Stück/Jahr), analytisch und vektorisiert
+    - Serien/Jahr fest, variiert wird die Jahresmenge (also Stück/Serie)
+    - Kosten_m(V) = Serien/Jahr x t_Rüst_m x MSS_Rüst_m + V x t_Bearb_m x MSS_Bearb_m
+    - V* = Serien/Jahr x (Rüstkosten B - Rüstkosten A) / (Bearbeitungskosten/Stk A - B)
+    - mss_a, mss_b: Tupel (mss_fix, mss_var)
+    Rückgabe: (V*, Richtung) mit Richtung 'ab', 'bis', 'immer' oder 'nie' (B günstiger)
+    """
+    serien_jahr = daten['serien_jahr']
+    basis_a = mss_a[0] + mss_a[1]
+    basis_b = mss_b[0] + mss_b[1]
+
+    ruest_a = daten['zeiten_ruest'][:, 0] * (basis_a + lohn)
+    ruest_b = daten['zeiten_ruest'][:, 1] * (basis_b + lohn)
+    bearb_a = daten['zeiten_bearb'][:, 0] * (basis_a + lohn * bedien_a)
+    bearb_b = daten['zeiten_bearb'][:, 1] * (basis_b + lohn * bedien_b)
+
+    zaehler = serien_jahr * (ruest_b - ruest_a)
+    nenner = bearb_a - bearb_b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        menge = zaehler / nenner
+
+    richtung = np.select(
+        [(nenner > 0) & (zaehler > 0), (nenner < 0) & (zaehler < 0),
+         (nenner >= 0) & (zaehler <= 0) & ((nenner > 0) | (zaehler < 0))],
+        ['ab', 'bis', 'immer'],
+        default='nie'
+    )
+    menge = np.where((richtung == 'ab') | (richtung == 'bis'), menge, np.nan)
+    return menge, richtung
+
+def npv_alternative(ak_a, ak_b, rest_a, rest_b, annual_saving, zins, n_years):
+    """
+    NPV aus Sicht 'B statt A'
+      t=0: - (AK_B - AK_A)
+      t=1..n: + annual_saving
+      t=n: + (Rest_B - Rest_A)
+    """
+    mehrinvest = ak_b - ak_a
+    npv = -mehrinvest
+
+    for t in range(1, n_years + 1):
+        npv += annual_saving / ((1 + zins) ** t)
+
+    npv += (rest_b - rest_a) / ((1 + zins) ** n_years)
+    return float(npv)
+
+def npv_alternative_series(ak_a, ak_b, rest_a, rest_b, savings_series, zins):
+    """
+    NPV aus Sicht 'B statt A' mit jährlicher Einsparungsreihe
+      t=0: - (AK_B - AK_A)
+      t=1..n: + saving_t
+      t=n: + (Rest_B - Rest_A)
+    """
+    mehrinvest = ak_b - ak_a
+    npv = -mehrinvest
+    for t, saving in enumerate(savings_series, start=1):
+        npv += float(saving) / ((1 + zins) ** t)
+    if savings_series:
+        n_years = len(savings_series)
+        npv += (rest_b - rest_a) / ((1 + zins) ** n_years)
+    return float(npv)
+
+def discounted_payback(mehrinvest, savings_series, zins):
+    """Dynamische Amortisation (diskontierte Zahlungsreihe)."""
+    if mehrinvest <= 0:
+        return 0.0
+    cumulative = 0.0
+    for t, saving in enumerate(savings_series, start=1):
+        cumulative += float(saving) / ((1 + zins) ** t)
+        if cumulative >= mehrinvest:
+            return float(t)
+    return None
+
+@st.cache_data(show_spinner=False)
+def annual_costs_series(res, result, lohn, bedien_factor, years, cost_escalation, prod_growth, kapitalkosten=None,
+                        energiekosten=None, stunden=None):
+    """
+    Vereinfachte Kostenreihe:
+    - Fixkosten eskalieren mit cost_escalation
+    - Variable Kosten eskalieren mit cost_escalation und skalieren mit Produktionswachstum
+    - kapitalkosten (optional, Array je Jahr aus finanzierung.finanzierungsplan) ersetzen
+      AfA + kalk. Zinsen aus res; sie werden nicht eskaliert
+    - energiekosten (optional, Array je Jahr aus energie.energiekosten_tou) ersetzen mss_var x Stunden
+    - stunden (optional, Programmstunden je Jahr aus mengenplan.jahresstunden) ersetzen
+      Stunden Jahr 1 x Produktionswachstum
+    """
+    fixed0 = float(res['fix_jahr'])
+    personal0 = float(lohn) * float(bedien_factor) * float(result['ges_stunden'])
+    energie0 = float(res['mss_var']) * float(result['ges_stunden'])
+
+    t = np.arange(years)
+    esc = (1 + cost_escalation) ** t
+    prod = (1 + prod_growth) ** t
+    if stunden is not None:
+        # Reale Mengen je Jahr: Variable Kosten je Programmstunde x Stunden des Jahres
+        stunden = np.asarray(stunden, dtype=float)[:years]
+        personal0 = float(lohn) * float(bedien_factor)
+        energie0 = float(res['mss_var'])
+        prod = stunden
+    if kapitalkosten is None:
+        fixed = fixed0 * esc
+    else:
+        fixed = (fixed0 - float(res['afa']) - float(res['zinsen'])) * esc + np.asarray(kapitalkosten, dtype=float)[:years]
+    if energiekosten is None:
+        variable = (energie0 + personal0) * esc * prod
+    else:
+        variable = personal0 * esc * prod + np.asarray(energiekosten, dtype=float)[:years]
+    return [float(v) for v in fixed + variable]
+
+def kapazitaetscheck(result, res):
+    if res['stunden_effektiv'] <= 0:
+        return False, 0.0
+    auslastung = result['ges_stunden'] / res['stunden_effektiv']
+    ok = result['ges_stunden'] <= res['stunden_effektiv']
+    return ok, float(auslastung)
@@ -0,0 +1,146 @@
+from io import BytesIO
+
+import streamlit as st
+import numpy as np
+
+from rechenpool import im_pool
+
+# =========================
+# DIAGRAMME (objektorientierte Matplotlib-API, ohne globalen pyplot-Zustand)
+# =========================
+# Matplotlib wird erst beim ersten tatsächlich gerenderten Diagramm importiert (~0,5 s);
+# die PNGs der Standardeingaben sind auf Platte gecacht, damit ein vorgewärmtes Image sie beim Start
+# nicht neu rendert.
+# RdYlGn (ColorBrewer, 11 Stufen) für Tabellen-Farbverläufe ohne Matplotlib-Import
+_RDYLGN = np.array([
+    [165, 0, 38], [215, 48, 39], [244, 109, 67], [253, 174, 97], [254, 224, 139], [255, 255, 191],
+    [217, 239, 139], [166, 217, 106], [102, 189, 99], [26, 152, 80], [0, 104, 55]
+], dtype=float)
+
+
+def farbverlauf(werte, grenzen=None):
+    """
+    CSS-Hintergrund je Wert (rot = klein, grün = groß), vektorisiert
+    - Ersatz für Styler.background_gradient(cmap='RdYlGn'), das Matplotlib lädt
+    - grenzen: (min, max) der Skala, z. B. der ganzen Spalte bei seitenweiser Anzeige
+    - Schriftfarbe weiß auf dunklem Hintergrund; NaN bleibt ungefärbt
+    """
+    werte = np.asarray(werte, dtype=float)
+    gueltig = ~np.isnan(werte)
+    if not gueltig.any():
+        return [''] * len(werte)
+    lo, hi = grenzen if grenzen is not None else (np.nanmin(werte), np.nanmax(werte))
+    pos = np.clip((werte - lo) / (hi - lo), 0.0, 1.0) if hi > lo else np.full(len(werte), 0.5)
+    pos = np.nan_to_num(pos) * (len(_RDYLGN) - 1)
+    stufen = np.arange(len(_RDYLGN))
+    rgb = np.column_stack([np.interp(pos, stufen, _RDYLGN[:, k]) for k in range(3)]).round().astype(int)
+
+    lin = rgb / 255.0
+    lin = np.where(lin <= 0.03928, lin / 12.92, ((lin + 0.055) / 1.055) ** 2.4)
+    dunkel = lin @ np.array([0.2126, 0.7152, 0.0722]) < 0.408
+    return [
+        f'background-color: #{r:02x}{g:02x}{b:02x}; color: {"#f1f1f1" if d else "#000000"}' if ok else ''
+        for (r, g, b), d, ok in zip(rgb, dunkel, gueltig)
+    ]
+
+
+def fig_to_png(fig):
+    """Rendert eine Figure als PNG-Bytes (eine Figure pro Aufruf, thread-sicher)"""
+    buf = BytesIO()
+    fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
+    return buf.getvalue()
+
+
+def _kostenstruktur_png(kategorien, werte_a, werte_b, name_a, name_b):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+    x = np.arange(len(kategorien))
+    width = 0.35
+
+    bars1 = ax.bar(x - width/2, werte_a, width, label=name_a, color='#6b7280', alpha=0.8)
+    bars2 = ax.bar(x + width/2, werte_b, width, label=name_b, color='#3b82f6', alpha=0.8)
+
+    ax.set_ylabel('Kosten [€]', fontsize=12)
+    ax.set_title('Vergleich der Kostenkomponenten', fontsize=14, fontweight='bold')
+    ax.set_xticks(x)
+    ax.set_xticklabels(kategorien, rotation=45, ha='right')
+    ax.legend()
+    ax.grid(axis='y', alpha=0.3)
+
+    for bars in [bars1, bars2]:
+        for bar in bars:
+            height = bar.get_height()
+            if height > 1000:
+                ax.text(bar.get_x() + bar.get_width()/2., height,
+                        f'{height/1000:.1f}k', ha='center', va='bottom', fontsize=8)
+
+    fig.tight_layout()
+    return fig_to_png(fig)
+
+
+def _break_even_png(stueckzahlen, kosten_verlauf_a, kosten_verlauf_b, punkt_a, punkt_b, name_a, name_b):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 6))
+    ax2 = fig.subplots()
+    ax2.plot(stueckzahlen, kosten_verlauf_a, 'o-', linewidth=2, markersize=6, label=name_a, color='#6b7280')
+    ax2.plot(stueckzahlen, kosten_verlauf_b, 's-', linewidth=2, markersize=6, label=name_b, color='#3b82f6')
+
+    ax2.axvline(punkt_a[0], color='red', linestyle='--', alpha=0.5, label='Aktuelles Programm')
+    ax2.scatter([punkt_a[0]], [punkt_a[1]], s=150, color='#6b7280',
+                edgecolors='red', linewidths=2, zorder=5)
+    ax2.scatter([punkt_b[0]], [punkt_b[1]], s=150, color='#3b82f6',
+                edgecolors='red', linewidths=2, zorder=5)
+
+    ax2.set_xlabel('Stückzahl pro Jahr', fontsize=12)
+    ax2.set_ylabel('Gesamtkosten [€]', fontsize=12)
+    ax2.set_title('Kostenvergleich bei verschiedenen Produktionsmengen', fontsize=14, fontweight='bold')
+    ax2.legend(fontsize=10)
+    ax2.grid(alpha=0.3)
+    fig.tight_layout()
+    return fig_to_png(fig)
+
+
+def kostenstruktur_diagramm(kategorien, werte_a, werte_b, name_a, name_b, standard=False):
+    """
+    Balkendiagramm der Kostenkomponenten als PNG (gecacht, im Rechenpool gerendert)
+    - standard: Standardeingaben, dann im Plattencache (vorgewärmtes Image), sonst nur im Speicher
+    """
+    cache = _kostenstruktur_platte if standard else _kostenstruktur_speicher
+    return cache(kategorien, werte_a, werte_b, name_a, name_b)
+
+
+def break_even_diagramm(stueckzahlen, kosten_verlauf_a, kosten_verlauf_b, punkt_a, punkt_b, name_a, name_b,
+                        standard=False):
+    """
+    Kostenverlauf über der Stückzahl als PNG (gecacht, im Rechenpool gerendert)
+    - standard: wie bei kostenstruktur_diagramm
+    """
+    cache = _break_even_platte if standard else _break_even_speicher
+    return cache(stueckzahlen, kosten_verlauf_a, kosten_verlauf_b, punkt_a, punkt_b, name_a, name_b)
+
+
+# Plattencache wird von Streamlit nie geräumt (max_entries gilt nur im Speicher): dort landen deshalb
+# nur die Diagramme der Standardeingaben, alle anderen bleiben im begrenzten Speichercache
+@st.cache_data(show_spinner=False, max_entries=256)
+def _kostenstruktur_speicher(kategorien, werte_a, werte_b, name_a, name_b):
+    return im_pool(_kostenstruktur_png, kategorien, werte_a, werte_b, name_a, name_b)
+
+
+@st.cache_data(show_spinner=False, persist="disk")
+def _kostenstruktur_platte(kategorien, werte_a, werte_b, name_a, name_b):
+    return im_pool(_kostenstruktur_png, kategorien, werte_a, werte_b, name_a, name_b)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _break_even_speicher(stueckzahlen, kosten_verlauf_a, kosten_verlauf_b, punkt_a, punkt_b, name_a, name_b):
+    return im_pool(_break_even_png, stueckzahlen, kosten_verlauf_a, kosten_verlauf_b,
+                   punkt_a, punkt_b, name_a, name_b)
+
+
+@st.cache_data(show_spinner=False, persist="disk")
+def _break_even_platte(stueckzahlen, kosten_verlauf_a, kosten_verlauf_b, punkt_a, punkt_b, name_a, name_b):
+    return im_pool(_break_even_png, stueckzahlen, kosten_verlauf_a, kosten_verlauf_b,
+                   punkt_a, punkt_b, name_a, name_b)
@@ -0,0 +1,145 @@
+import re
+from io import BytesIO
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+from berechnung import zahlen
+
+# =========================
+# ENERGIEKOSTEN MIT ZEITVARIABLEM TARIF
+# =========================
+STUNDEN_JAHR = (8760, 8784)
+DEZIMALKOMMA = re.compile(r"[-+]?\d+,\d*")
+
+
+def _trennzeichen(zeilen):
+    """
+    Trennzeichen der Preis-CSV: ';' oder Tab, wenn vorhanden; ',' nur, wenn die Datenzeilen nicht
+    einfach Zahlen mit Dezimalkomma sind; sonst None (eine Spalte)
+    """
+    probe = [z.strip() for z in zeilen[:20] if z.strip()]
+    for zeichen in (";", "\t"):
+        if any(zeichen in z for z in probe):
+            return zeichen
+    daten = probe[1:] or probe
+    if any("," in z for z in probe) and not all(DEZIMALKOMMA.fullmatch(z) for z in daten):
+        return ","
+    return None
+
+
+# Deutsche Formate zuerst: ohne Format läse pandas 01.03.2025 als 3. Januar
+ZEITFORMATE = ("%d.%m.%Y %H:%M", "%d.%m.%Y %H:%M:%S", "%d.%m.%y %H:%M", "ISO8601")
+
+
+def _zeitstempel(spalte):
+    """
+    Zeitstempel der ersten Spalte -> (Wochentag, Stunde) oder None, wenn die Spalte keine Zeit enthält
+    - TT.MM.JJJJ hh:mm bzw. ISO 8601; Zeitzonenangaben werden ignoriert (lokale Uhrzeit zählt)
+    - reine Zahlen (laufende Nummer) gelten nicht als Zeitstempel
+    - ValueError, wenn einzelne Zeitstempel nicht lesbar sind
+    """
+    spalte = spalte.astype(str).str.strip()
+    if zahlen(spalte).notna().all():
+        return None
+    spalte = spalte.str.replace(r"(Z|[+-]\d{2}:?\d{2})$", "", regex=True)
+    # Format, das die meisten Zeilen liest; jede dann noch ungültige Zeile ist ein Fehler
+    zeit = max((pd.to_datetime(spalte, format=f, errors="coerce") for f in ZEITFORMATE),
+               key=lambda z: z.notna().sum())
+    if zeit.isna().any():
+        raise ValueError(f"Zeitstempel nicht lesbar: '{spalte[zeit.isna()].iloc[0]}' "
+                         "(erwartet TT.MM.JJJJ hh:mm oder JJJJ-MM-TT hh:mm).")
+    return zeit.dt.dayofweek.to_numpy(), zeit.dt.hour.to_numpy()
+
+
+@st.cache_data(show_spinner=False)
+def lade_preisreihe(csv_bytes):
+    """
+    Liest stündliche Strompreise (CSV mit 8.760 bzw. 8.784 Werten)
+    - Trennzeichen ';', Tab oder ',' (siehe _trennzeichen), auch einspaltig; Kopfzeile optional
+    - Preis: letzte Spalte, Dezimalkomma erlaubt; Werte > 5 gelten als €/MWh
+    - optional Zeitstempel in der ersten Spalte (für Wochentag/Stunde, siehe _zeitstempel),
+      sonst Beginn Montag 0 Uhr
+    """
+    text = csv_bytes.decode("utf-8-sig", errors="replace")
+    trenner = _trennzeichen(text[:4096].splitlines())
+    # Ohne Trennzeichen eine Spalte: ein im Text nicht vorkommendes Zeichen als sep
+    df = pd.read_csv(BytesIO(text.encode("utf-8")), sep=trenner or "\x1f", header=None, dtype=str,
+                     skip_blank_lines=True)
+    # Kopfzeile: erste Zeile, deren Preisfeld keine Zahl ist
+    if len(df) and np.isnan(zahlen(df.iloc[:1, -1]).iloc[0]):
+        df = df.iloc[1:].reset_index(drop=True)
+    preis = zahlen(df.iloc[:, -1]).to_numpy(dtype=float)
+
+    if len(preis) not in STUNDEN_JAHR:
+        raise ValueError(f"{len(preis)} Werte gefunden, erwartet werden 8760 (bzw. 8784) Stundenwerte.")
+    if np.isnan(preis).any():
+        raise ValueError("Die Preisreihe enthält ungültige Werte.")
+    if np.nanmedian(preis) > 5:
+        preis = preis / 1000.0
+
+    stunden = np.arange(len(preis))
+    wochentag = (stunden // 24) % 7
+    stunde = stunden % 24
+    zeit = _zeitstempel(df.iloc[:, 0]) if df.shape[1] > 1 else None
+    if zeit is not None:
+        wochentag, stunde = zeit
+
+    return {'preis': preis, 'wochentag': wochentag, 'stunde': stunde}
+
+
+def betriebsplan(wochentag, stunde, h_jahr):
+    """
+    Maske der Betriebsstunden im Jahr: h_jahr Stunden werden nach Schichten belegt
+    (Früh 6-14, Spät 14-22, Nacht 22-6 an Werktagen, dann Samstag, dann Sonntag),
+    innerhalb einer Schicht gleichmäßig über alle Tage verteilt.
+    """
+    wochentag = np.asarray(wochentag)
+    stunde = np.asarray(stunde)
+    werktag = wochentag < 5
+    rang = np.where(werktag, ((stunde - 6) % 24) // 8, wochentag - 2)
+    versatz = np.where(werktag, (stunde - 6) % 8, stunde)
+    tag = np.arange(len(stunde)) // 24
+
+    reihenfolge = np.lexsort((tag, versatz, rang))
+    maske = np.zeros(len(stunde), dtype=bool)
+    maske[reihenfolge[:int(round(min(max(h_jahr, 0), len(stunde))))]] = True
+    return maske
+
+
+@st.cache_data(show_spinner=False)
+def energiekosten_tou(preisreihe, h_jahr, stunden_bearb, stunden_ruest, kw_bearb, kw_ruest, kw_leer,
+                      jahre, kosten_steigerung, prod_wachstum):
+    """
+    Energiekosten je Jahr mit stündlichem Preis und Lastprofil (vektorisiert)
+    - Betriebsstunden laut betriebsplan; in jeder Betriebsstunde mittlere Leistung aus
+      Anteil Bearbeitung / Rüsten / Leerlauf am Programm
+    - Reihe über den Horizont: Programmstunden wachsen mit prod_wachstum (Leerlauf sinkt),
+      Preise eskalieren mit kosten_steigerung; stunden_bearb/stunden_ruest dürfen auch Arrays
+      je Jahr sein (Mengenplanung, dann prod_wachstum = 0)
+    - mss_var: Energiekosten im Jahr 1 je Programmstunde (ersetzt kW x Strompreis)
+    """
+    maske = betriebsplan(preisreihe['wochentag'], preisreihe['stunde'], h_jahr)
+    betrieb = int(maske.sum())
+    preis_summe = float(preisreihe['preis'][maske].sum())
+    if betrieb == 0:
+        return {'kosten_reihe': np.zeros(jahre), 'mss_var': 0.0, 'preis_mittel': 0.0, 'betriebsstunden': 0}
+
+    t = np.arange(jahre)
+    prod = (1 + prod_wachstum) ** t
+    esc = (1 + kosten_steigerung) ** t
+    bearb = np.asarray(stunden_bearb, dtype=float) * prod
+    ruest = np.asarray(stunden_ruest, dtype=float) * prod
+    leer = np.clip(betrieb - bearb - ruest, 0.0, None)
+
+    leistung_mittel = (bearb * kw_bearb + ruest * kw_ruest + leer * kw_leer) / betrieb
+    kosten_reihe = leistung_mittel * preis_summe * esc
+
+    programm_stunden = float(bearb[0] + ruest[0])
+    return {
+        'kosten_reihe': kosten_reihe,
+        'mss_var': float(kosten_reihe[0] / programm_stunden) if programm_stunden > 0 else 0.0,
+        'preis_mittel': preis_summe / betrieb,
+        'betriebsstunden': betrieb
+    }
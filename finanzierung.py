@@ -0,0 +1,173 @@
+from functools import lru_cache
+
+import numpy as np
+
+# =========================
+# ABSCHREIBUNG & FINANZIERUNG
+# =========================
+AFA_METHODEN = ["linear", "degressiv"]
+FINANZIERUNGSARTEN = ["Eigenkapital", "Annuitätendarlehen", "Leasing"]
+
+
+def _nur_lesen(arr):
+    arr.setflags(write=False)
+    return arr
+
+
+@lru_cache(maxsize=1024)
+def abschreibungsplan(ak, n, restwert=0.0, methode="linear", satz=0.0):
+    """
+    AfA je Jahr (Array der Länge n), gecacht je (AK, n, Restwert, Methode, Satz)
+    - linear: (AK - Restwert) / n
+    - degressiv: Satz x Buchwert, Wechsel zur linearen AfA sobald diese höher ist
+    """
+    n = int(n)
+    basis = max(0.0, ak - restwert)
+    if n <= 0:
+        return _nur_lesen(np.zeros(0))
+    if methode == "linear" or satz <= 0:
+        return _nur_lesen(np.full(n, basis / n))
+    if methode != "degressiv":
+        raise ValueError(f"Unbekannte AfA-Methode: {methode}")
+
+    # Buchwerte auf dem degressiven Pfad: AK x (1 - Satz)^t
+    t = np.arange(n)
+    buchwert = float(ak) * np.concatenate(([1.0], np.cumprod(np.full(n - 1, 1.0 - satz))))
+    degressiv = buchwert * satz
+    linear = (buchwert - restwert) / (n - t)
+    # ab dem ersten Jahr mit linear >= degressiv bleibt die lineare Rate dieses Jahres
+    gewechselt = np.maximum.accumulate(linear >= degressiv)
+    wechsel = int(np.argmax(gewechselt)) if gewechselt.any() else n - 1
+    afa = np.where(gewechselt, linear[wechsel], degressiv)
+    # insgesamt höchstens AK - Restwert
+    afa = np.diff(np.minimum(np.cumsum(afa), basis), prepend=0.0)
+    return _nur_lesen(afa)
+
+
+@lru_cache(maxsize=1024)
+def annuitaetenplan(betrag, zins, laufzeit):
+    """Zins- und Tilgungsanteile eines Annuitätendarlehens (Arrays der Länge laufzeit)"""
+    laufzeit = int(laufzeit)
+    if laufzeit <= 0 or betrag <= 0:
+        return _nur_lesen(np.zeros(max(laufzeit, 0))), _nur_lesen(np.zeros(max(laufzeit, 0)))
+    if zins == 0:
+        annuitaet = betrag / laufzeit
+    else:
+        q = (1 + zins) ** laufzeit
+        annuitaet = betrag * zins * q / (q - 1)
+
+    # Restschuld vor Jahr t: geschlossene Form statt Schleife
+    t = np.arange(laufzeit)
+    if zins == 0:
+        restschuld = betrag - annuitaet * t
+    else:
+        restschuld = betrag * (1 + zins) ** t - annuitaet * ((1 + zins) ** t - 1) / zins
+    zinsanteil = restschuld * zins
+    tilgung = annuitaet - zinsanteil
+    return _nur_lesen(zinsanteil), _nur_lesen(tilgung)
+
+
+def finanzierungsplan(ak, n, restwert, zins, afa_methode="linear", afa_satz=0.0,
+                      finanzierung="Eigenkapital", fk_quote=0.0, kredit_zins=0.0,
+                      laufzeit=0, leasing_satz=0.0, foerderquote=0.0):
+    """
+    Jahresbezogene Pläne einer Investition (Arrays, gecacht)
+    - 'afa', 'zinsen', 'kapitalkosten' (Länge n): Kostensicht für die Jahreskostenreihe;
+      kalk. Zinsen wie bisher auf das durchschnittlich gebundene Kapital
+    - 'zahlungen' (Länge n+1, t=0..n): Auszahlungen für Investition und Finanzierung
+    - 'restwert': Rückfluss am Ende (bei Leasing 0, die Maschine gehört dem Leasinggeber)
+    - Zuschuss (Förderquote) mindert Auszahlung und AfA-Basis; bei Leasing nicht anwendbar
+    - Leasing kürzer als n: Anschlussleasing zur gleichen Rate bis zum Ende der Nutzungsdauer
+    - Rückgabe je Aufruf ein eigenes dict (Arrays schreibgeschützt, aus dem Cache geteilt)
+    """
+    return dict(_finanzierungsplan(ak, n, restwert, zins, afa_methode, afa_satz, finanzierung,
+                                   fk_quote, kredit_zins, laufzeit, leasing_satz, foerderquote))
+
+
+@lru_cache(maxsize=1024)
+def _finanzierungsplan(ak, n, restwert, zins, afa_methode, afa_satz, finanzierung,
+                       fk_quote, kredit_zins, laufzeit, leasing_satz, foerderquote):
+    n = int(n)
+    laufzeit = int(laufzeit) if laufzeit else n
+    zahlungen = np.zeros(n + 1)
+
+    if finanzierung == "Leasing":
+        # Rate über die ganze Nutzungsdauer: nach Ablauf der Laufzeit Anschlussleasing zu gleichen Konditionen
+        rate = ak * leasing_satz
+        kapitalkosten = np.full(n, rate)
+        zahlungen[1:] = rate
+        return {
+            'afa': _nur_lesen(np.zeros(n)),
+            'zinsen': _nur_lesen(np.zeros(n)),
+            'kapitalkosten': _nur_lesen(kapitalkosten),
+            'zahlungen': _nur_lesen(zahlungen),
+            'restwert': 0.0
+        }
+
+    zuschuss = ak * foerderquote
+    ak_netto = ak - zuschuss
+    afa = abschreibungsplan(ak_netto, n, restwert, afa_methode, afa_satz)
+    zinsen = np.full(n, (ak_netto + restwert) / 2.0 * zins)
+
+    if finanzierung == "Annuitätendarlehen":
+        kredit = ak_netto * fk_quote
+        zinsanteil, tilgung = annuitaetenplan(kredit, kredit_zins, laufzeit)
+        jahre = min(laufzeit, n)
+        zahlungen[0] = ak_netto - kredit
+        zahlungen[1:jahre + 1] = zinsanteil[:jahre] + tilgung[:jahre]
+        if laufzeit > n:
+            # Restschuld am Ende der Nutzungsdauer wird abgelöst
+            zahlungen[n] += tilgung[n:].sum()
+    elif finanzierung == "Eigenkapital":
+        zahlungen[0] = ak_netto
+    else:
+        raise ValueError(f"Unbekannte Finanzierungsart: {finanzierung}")
+
+    return {
+        'afa': afa,
+        'zinsen': _nur_lesen(zinsen),
+        'kapitalkosten': _nur_lesen(afa + zinsen),
+        'zahlungen': _nur_lesen(zahlungen),
+        'restwert': float(restwert)
+    }
+
+
+def npv_zahlungsreihe(zahlungen_a, zahlungen_b, betrieb_a, betrieb_b, rest_a, rest_b, zins):
+    """
+    NPV 'B statt A' aus Zahlungsreihen (vektorisiert, führende Achsen z. B. für Szenarien)
+    - zahlungen_*: Investitions-/Finanzierungsauszahlungen t=0..n
+    - betrieb_*: laufende Betriebskosten t=1..n (ohne AfA und kalk. Zinsen)
+    """
+    zahlungen_a = np.asarray(zahlungen_a, dtype=float)
+    zahlungen_b = np.asarray(zahlungen_b, dtype=float)
+    betrieb_a = np.asarray(betrieb_a, dtype=float)
+    betrieb_b = np.asarray(betrieb_b, dtype=float)
+
+    n_years = zahlungen_a.shape[-1] - 1
+    abzins = (1 + zins) ** -np.arange(n_years + 1)
+    npv = ((zahlungen_a - zahlungen_b) * abzins).sum(axis=-1)
+    npv = npv + ((betrieb_a - betrieb_b) * abzins[1:]).sum(axis=-1)
+    npv = npv + (np.asarray(rest_b) - np.asarray(rest_a)) * abzins[-1]
+    return npv
+
+
+def payback_zahlungsreihe(zahlungen_a, zahlungen_b, betrieb_a, betrieb_b, zins):
+    """
+    Dynamische Amortisation 'B statt A' aus Zahlungsreihen (ohne Restwerte)
+    - kumulierte abgezinste Differenz aus Auszahlungen t=0..n und Betriebskosten t=1..n
+    - Jahr, ab dem die Summe bis zum Ende nicht mehr negativ wird (0: nie negativ),
+      None, wenn sie am Ende negativ ist
+    - auch wenn B in t=0 nichts mehr auszahlt (Leasing) und die Nachteile erst folgen
+    """
+    zahlungen_a = np.asarray(zahlungen_a, dtype=float)
+    zahlungen_b = np.asarray(zahlungen_b, dtype=float)
+    differenz = zahlungen_a - zahlungen_b
+    differenz[1:] += np.asarray(betrieb_a, dtype=float) - np.asarray(betrieb_b, dtype=float)
+
+    kumuliert = np.cumsum(differenz * (1 + zins) ** -np.arange(len(differenz)))
+    negativ = np.flatnonzero(kumuliert < 0)
+    if not len(negativ):
+        return 0.0
+    if negativ[-1] == len(kumuliert) - 1:
+        return None
+    return float(negativ[-1] + 1)
@@ -0,0 +1,129 @@
+import csv
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+from io import BytesIO
+
+from berechnung import berechne_mss_batch, zahlen
+
+# =========================
+# MASCHINENKATALOG
+# =========================
+# CSV-Spalte -> Standardwert (None = Pflichtspalte)
+KATALOG_SPALTEN = {
+    "Bezeichnung": None,
+    "Anschaffungskosten [€]": None,
+    "Leistungsaufnahme [kW]": None,
+    "Platzbedarf [m²]": None,
+    "Wartungssatz [%]": None,
+    "Versicherung [€/Jahr]": None,
+    "Werkzeugkosten [€/Jahr]": None,
+    "Betriebsstunden/Jahr": None,
+    "Nutzungsgrad [%]": 80.0,
+    "Bedienfaktor": 1.0,
+    "Restwert [€]": 0.0,
+    "Zeitfaktor Bearb": 1.0,
+    "Zeitfaktor Rüst": 1.0,
+}
+
+
+def katalog_vorlage():
+    """Leere CSV-Vorlage mit allen Katalogspalten"""
+    return pd.DataFrame(columns=list(KATALOG_SPALTEN)).to_csv(index=False, sep=";").encode("utf-8")
+
+
+@st.cache_data(show_spinner=False)
+def lade_katalog(csv_bytes):
+    """
+    Liest den Maschinenkatalog (CSV, Trennzeichen ; oder ,) und baut den Index auf
+    - fehlende optionale Spalten werden mit Standardwerten ergänzt, Dezimalkomma erlaubt
+    - Zeilen mit ungültigen Pflichtwerten werden verworfen
+    - Sortierung nach Anschaffungskosten, damit Budgetfilter per Binärsuche greift
+    """
+    try:
+        df = pd.read_csv(BytesIO(csv_bytes), sep=None, engine="python")
+    except csv.Error as e:
+        # Trennzeichen nicht erkennbar (z. B. leere Datei): wie andere Lesefehler als ValueError
+        raise ValueError(f"CSV nicht lesbar ({e}).") from e
+    df.columns = [str(c).strip() for c in df.columns]
+
+    fehlend = [c for c, default in KATALOG_SPALTEN.items() if default is None and c not in df.columns]
+    if fehlend:
+        raise ValueError(f"Fehlende Spalten im Katalog: {', '.join(fehlend)}")
+
+    for spalte, default in KATALOG_SPALTEN.items():
+        if spalte == "Bezeichnung":
+            continue
+        if spalte not in df.columns:
+            df[spalte] = default
+        df[spalte] = zahlen(df[spalte])
+        if default is not None:
+            df[spalte] = df[spalte].fillna(default)
+
+    df = df.dropna(subset=list(KATALOG_SPALTEN))
+    df["Bezeichnung"] = df["Bezeichnung"].astype(str)
+    df = df[list(KATALOG_SPALTEN)].sort_values("Anschaffungskosten [€]", kind="stable")
+    return df.set_index("Bezeichnung")
+
+
+def filtere_katalog(katalog, max_budget=None, max_platz=None):
+    """Kandidaten nach Restriktionen (Budget über sortierten AK-Index, Rest per Maske)"""
+    if max_budget is not None:
+        ak = katalog["Anschaffungskosten [€]"].to_numpy()
+        katalog = katalog.iloc[:np.searchsorted(ak, max_budget, side="right")]
+    maske = np.ones(len(katalog), dtype=bool)
+    if max_platz is not None:
+        maske &= katalog["Platzbedarf [m²]"].to_numpy() <= max_platz
+    return katalog[maske]
+
+
+@st.cache_data(show_spinner=False)
+def bewerte_katalog(katalog, stunden_ref, referenz, n, zins, lohn, r_preis, s_preis):
+    """
+    Jahreskosten und NPV aller Katalogmaschinen gegenüber einer Referenzmaschine
+    - stunden_ref: (Bearbeitungs-, Rüststunden) des Programms auf Maschine A (berechnung.programmstunden)
+    - Programmzeiten: Zeiten von Maschine A x Zeitfaktor der Katalogmaschine
+    - referenz: dict mit 'ak', 'restwert', 'ges_kosten'
+    - NPV aus Sicht 'Katalogmaschine statt Referenz' (konstante Einsparung, Rentenbarwertfaktor)
+    """
+    t_bearb_ref, t_ruest_ref = stunden_ref
+
+    ak = katalog["Anschaffungskosten [€]"].to_numpy()
+    restwert = katalog["Restwert [€]"].to_numpy()
+    res = berechne_mss_batch(
+        ak, n, zins,
+        katalog["Wartungssatz [%]"].to_numpy() / 100,
+        katalog["Platzbedarf [m²]"].to_numpy(), r_preis,
+        katalog["Versicherung [€/Jahr]"].to_numpy(),
+        katalog["Werkzeugkosten [€/Jahr]"].to_numpy(),
+        katalog["Betriebsstunden/Jahr"].to_numpy(),
+        katalog["Nutzungsgrad [%]"].to_numpy() / 100,
+        katalog["Leistungsaufnahme [kW]"].to_numpy(), s_preis,
+        restwert=restwert
+    )
+
+    t_bearb = t_bearb_ref * katalog["Zeitfaktor Bearb"].to_numpy()
+    t_ruest = t_ruest_ref * katalog["Zeitfaktor Rüst"].to_numpy()
+    mss_basis = res['mss_fix'] + res['mss_var']
+    kosten = t_bearb * (mss_basis + lohn * katalog["Bedienfaktor"].to_numpy()) + t_ruest * (mss_basis + lohn)
+    stunden = t_bearb + t_ruest
+
+    ersparnis = referenz['ges_kosten'] - kosten
+    rbf = n if zins == 0 else (1 - (1 + zins) ** -n) / zins
+    npv = -(ak - referenz['ak']) + ersparnis * rbf + (restwert - referenz['restwert']) / (1 + zins) ** n
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        auslastung = np.where(res['stunden_effektiv'] > 0, stunden / res['stunden_effektiv'], np.inf)
+
+    ranking = pd.DataFrame({
+        'Anschaffungskosten [€]': ak,
+        'Platzbedarf [m²]': katalog["Platzbedarf [m²]"].to_numpy(),
+        'MSS gesamt [€/h]': mss_basis + lohn * katalog["Bedienfaktor"].to_numpy(),
+        'Jahreskosten (€)': kosten,
+        'Ersparnis/Jahr (€)': ersparnis,
+        'NPV ggü. Referenz (€)': npv,
+        'Auslastung (%)': auslastung * 100,
+        'Kapazität OK': auslastung <= 1.0,
+    }, index=katalog.index)
+    return ranking.sort_values('NPV ggü. Referenz (€)', ascending=False, kind="stable")
@@ -0,0 +1,139 @@
+"""
+Lasttest: simuliert N gleichzeitige Sessions der App und misst die Rerun-Latenz.
+
+    python lasttest.py --sessions 30 --reruns 5
+    python lasttest.py --url http://localhost:8501 --sessions 30
+
+Ohne --url wird die App mit `streamlit run` auf einem freien Port gestartet. Jede
+Session verbindet sich wie ein Browser über den Websocket /_stcore/stream, startet
+das Skript und ändert danach pro Rerun den Lohnsatz (kleine Werteauswahl, damit
+identische Berechnungen verschiedener Sessions zusammenfallen können). Gemessen
+wird die Zeit von der Rerun-Anforderung bis zur Meldung "script_finished".
+
+Benötigt websockets: pip install -r requirements-dev.txt
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+from websockets.asyncio.client import connect
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+APP_PFAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+LOHN_LABEL = "Lohnkosten [€/h]"
+LOHN_WERTE = [55.0, 60.0, 65.0, 70.0, 75.0]
+
+
+def _freier_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def starte_server(port, timeout=60.0):
+    """Startet die App headless und wartet auf den Health-Endpunkt"""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_PFAD,
+         "--server.headless", "true", "--server.port", str(port),
+         "--server.enableXsrfProtection", "false", "--browser.gatherUsageStats", "false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    ende = time.monotonic() + timeout
+    while time.monotonic() < ende:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+                if r.status == 200:
+                    return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("Streamlit-Server ist nicht gestartet")
+
+
+async def _rerun(ws, widget_states, timeout):
+    """Sendet rerun_script und wartet auf script_finished; liefert Dauer und Widgets"""
+    msg = BackMsg()
+    msg.rerun_script.widget_states.widgets.extend(widget_states)
+    widgets = {}
+
+    t0 = time.perf_counter()
+    await ws.send(msg.SerializeToString())
+    while True:
+        fwd = ForwardMsg()
+        fwd.ParseFromString(await asyncio.wait_for(ws.recv(), timeout))
+        typ = fwd.WhichOneof("type")
+        if typ == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+            element = fwd.delta.new_element
+            feld = element.WhichOneof("type")
+            if feld == "number_input":
+                widgets[element.number_input.label] = element.number_input.id
+        elif typ == "script_finished":
+            return time.perf_counter() - t0, widgets
+
+
+async def session(nr, url, reruns, latenzen, fehler, timeout):
+    rnd = random.Random(nr)
+    ws_url = url.replace("http", "ws", 1).rstrip("/") + "/_stcore/stream"
+    try:
+        async with connect(ws_url, subprotocols=["streamlit"], max_size=None) as ws:
+            dauer, widgets = await _rerun(ws, [], timeout)
+            latenzen.append(dauer)
+            for _ in range(reruns):
+                lohn = WidgetState(id=widgets[LOHN_LABEL], double_value=rnd.choice(LOHN_WERTE))
+                dauer, _ = await _rerun(ws, [lohn], timeout)
+                latenzen.append(dauer)
+    except Exception as e:
+        fehler.append(f"Session {nr}: {type(e).__name__}: {e}")
+
+
+async def lauf(url, sessions, reruns, timeout):
+    latenzen, fehler = [], []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(session(nr, url, reruns, latenzen, fehler, timeout) for nr in range(sessions)))
+    return latenzen, fehler, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="laufende App (sonst wird ein Server gestartet)")
+    parser.add_argument("--sessions", type=int, default=30, help="gleichzeitige Sessions")
+    parser.add_argument("--reruns", type=int, default=5, help="Reruns je Session nach dem Start")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Timeout je Rerun [s]")
+    args = parser.parse_args()
+
+    proc = None
+    url = args.url
+    if url is None:
+        port = _freier_port()
+        proc = starte_server(port)
+        url = f"http://127.0.0.1:{port}"
+
+    try:
+        latenzen, fehler, dauer = asyncio.run(lauf(url, args.sessions, args.reruns, args.timeout))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    werte = np.array(latenzen) * 1000
+    print(f"Sessions: {args.sessions}, Reruns gesamt: {len(werte)}, Dauer: {dauer:.1f} s")
+    if len(werte):
+        print(f"Rerun-Latenz p50: {np.percentile(werte, 50):.0f} ms, "
+              f"p99: {np.percentile(werte, 99):.0f} ms, max: {werte.max():.0f} ms")
+    for f in fehler:
+        print(f"FEHLER {f}")
+    return 1 if fehler else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
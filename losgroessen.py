@@ -0,0 +1,112 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+from berechnung import PROGRAMM_HASH
+
+# =========================
+# LOSGRÖSSENOPTIMIERUNG (EOQ)
+# =========================
+
+
+def _jahreskosten_los(menge, losgroesse, t_bearb_h, t_ruest_h, satz_bearb, satz_ruest, lager_satz):
+    """
+    Losgrößenabhängige Jahreskosten je Serie und Maschine (Arrays Maschinen x Serien)
+    - Bearbeitung: unabhängig von der Losgröße
+    - Rüsten: (Bedarf / Losgröße) Rüstvorgänge mit voller Bedienung
+    - Lager: halber Losbestand, bewertet mit den Bearbeitungskosten je Stück
+    """
+    bearb_stk = t_bearb_h * satz_bearb
+    kosten_bearb = menge * bearb_stk
+    kosten_ruest = (menge / losgroesse) * t_ruest_h * satz_ruest
+    kosten_lager = lager_satz * bearb_stk * losgroesse / 2.0
+    stunden = menge * t_bearb_h + (menge / losgroesse) * t_ruest_h
+    return kosten_bearb, kosten_ruest, kosten_lager, stunden
+
+
+def _eoq(menge, ruestkosten, lagerkosten_stk):
+    """Klassische Andler-Formel, begrenzt auf 1 <= Q <= Jahresbedarf"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        q = np.sqrt(2.0 * menge * ruestkosten / lagerkosten_stk)
+    q = np.where(np.isfinite(q), q, menge)
+    return np.clip(q, 1.0, np.maximum(menge, 1.0))
+
+
+@st.cache_data(show_spinner=False, hash_funcs=PROGRAMM_HASH)
+def optimiere_losgroessen(daten, mss_fix, mss_var, lohn, bedien_faktor, stunden_effektiv, lager_satz):
+    """
+    Kostenoptimale Losgröße je Serie für Maschine A und B (vektorisiert)
+    - daten: Ergebnis von berechnung.programmdaten
+    - mss_fix, mss_var, bedien_faktor, stunden_effektiv: Tupel (A, B)
+    - Rüstkosten je Rüstvorgang: Rüststunden x MSS mit voller Bedienung
+    - Lagerkosten je Stück und Jahr: lager_satz x Bearbeitungskosten je Stück
+    - Kapazität: reicht die EOQ-Lösung nicht, werden Rüststunden über einen
+      Lagrange-Multiplikator [€/h] verteuert, bis die Stunden passen (Bisektion)
+    """
+    stueck_serie = daten['stueck_serie']
+    menge = daten['stueck_jahr']
+
+    t_bearb_h = daten['zeiten_bearb'].T / 60.0
+    t_ruest_h = daten['zeiten_ruest'].T / 60.0
+
+    mss_basis = (np.asarray(mss_fix, dtype=float) + np.asarray(mss_var, dtype=float))[:, None]
+    satz_bearb = mss_basis + lohn * np.asarray(bedien_faktor, dtype=float)[:, None]
+    satz_ruest = mss_basis + lohn * 1.0
+    kapazitaet = np.asarray(stunden_effektiv, dtype=float)[:, None]
+
+    ruestkosten = t_ruest_h * satz_ruest
+    lagerkosten_stk = lager_satz * t_bearb_h * satz_bearb
+
+    def losgroesse_bei(lam):
+        return _eoq(menge, ruestkosten + lam * t_ruest_h, lagerkosten_stk)
+
+    def stunden_bei(q):
+        return (menge * t_bearb_h + (menge / q) * t_ruest_h).sum(axis=1, keepdims=True)
+
+    # Kapazitätsrestriktion: Schattenpreis je Maschine per Bisektion
+    lam_lo = np.zeros_like(kapazitaet)
+    lam_hi = np.where(stunden_bei(losgroesse_bei(lam_lo)) > kapazitaet, 1.0, 0.0)
+    for _ in range(60):
+        zu_knapp = (stunden_bei(losgroesse_bei(lam_hi)) > kapazitaet) & (lam_hi > 0) & (lam_hi < 1e12)
+        if not zu_knapp.any():
+            break
+        lam_hi = np.where(zu_knapp, lam_hi * 10.0, lam_hi)
+    for _ in range(60):
+        lam_mid = (lam_lo + lam_hi) / 2.0
+        passt = stunden_bei(losgroesse_bei(lam_mid)) <= kapazitaet
+        lam_hi = np.where(passt, lam_mid, lam_hi)
+        lam_lo = np.where(passt, lam_lo, lam_mid)
+
+    q_opt = losgroesse_bei(lam_hi)
+    q_ist = np.broadcast_to(stueck_serie, q_opt.shape)
+
+    ist = _jahreskosten_los(menge, q_ist, t_bearb_h, t_ruest_h, satz_bearb, satz_ruest, lager_satz)
+    opt = _jahreskosten_los(menge, q_opt, t_bearb_h, t_ruest_h, satz_bearb, satz_ruest, lager_satz)
+    kosten_ist = ist[0] + ist[1] + ist[2]
+    kosten_opt = opt[0] + opt[1] + opt[2]
+
+    details = pd.DataFrame({
+        'Serie': daten['serie'],
+        'Stück/Jahr': menge.astype(int),
+        'Losgröße Ist': stueck_serie.astype(int),
+        'Losgröße opt. A': np.round(q_opt[0]).astype(int),
+        'Losgröße opt. B': np.round(q_opt[1]).astype(int),
+        'Serien/Jahr opt. A': np.round(menge / q_opt[0], 1),
+        'Serien/Jahr opt. B': np.round(menge / q_opt[1], 1),
+        'Kosten Ist A (€)': np.round(kosten_ist[0], 2),
+        'Kosten opt. A (€)': np.round(kosten_opt[0], 2),
+        'Kosten Ist B (€)': np.round(kosten_ist[1], 2),
+        'Kosten opt. B (€)': np.round(kosten_opt[1], 2),
+    })
+
+    stunden_opt = opt[3].sum(axis=1)
+    return {
+        'details': details,
+        'kosten_ist': kosten_ist.sum(axis=1),
+        'kosten_opt': kosten_opt.sum(axis=1),
+        'lager_ist': ist[2].sum(axis=1),
+        'lager_opt': opt[2].sum(axis=1),
+        'stunden_opt': stunden_opt,
+        'schattenpreis': lam_hi[:, 0],
+        'kapazitaet_ok': stunden_opt <= kapazitaet[:, 0] + 1e-6
+    }
@@ -0,0 +1,101 @@
+import hashlib
+from io import BytesIO
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+from berechnung import Programmdaten, maschinenstunden, zahlen
+
+# =========================
+# MEHRJAHRESPROGRAMM (MENGENPLANUNG JE JAHR)
+# =========================
+
+
+@st.cache_data(show_spinner=False)
+def lade_mengenplan(csv_bytes):
+    """
+    Liest die Mengenplanung (CSV): erste Spalte Serie, danach eine Spalte je Jahr mit Stück/Jahr
+    - Spaltenreihenfolge = Jahresreihenfolge, Dezimalkomma erlaubt
+    - leere Zellen: Menge des Vorjahres (bzw. aktuelle Programmmenge) bleibt
+    """
+    df = pd.read_csv(BytesIO(csv_bytes), sep=None, engine="python")
+    if df.shape[1] < 2:
+        raise ValueError("Erwartet werden eine Spalte Serie und mindestens eine Jahresspalte.")
+    df = df.set_index(df.columns[0])
+    df.index = df.index.astype(str).str.strip()
+    if df.index.duplicated().any():
+        raise ValueError(f"Serien mehrfach vorhanden: {', '.join(df.index[df.index.duplicated()].unique())}")
+
+    for spalte in df.columns:
+        df[spalte] = zahlen(df[spalte])
+    if (df < 0).any().any():
+        raise ValueError("Die Mengenplanung enthält negative Mengen.")
+    return df
+
+
+def mengenplan_vorlage(daten, jahre, prod_wachstum=0.0):
+    """CSV-Vorlage aus dem aktuellen Programm, Mengen mit dem bisherigen Produktionswachstum fortgeschrieben"""
+    mengen = np.outer(daten['stueck_jahr'], (1 + prod_wachstum) ** np.arange(jahre)).round()
+    vorlage = pd.DataFrame(mengen, columns=[f"Jahr {t + 1}" for t in range(jahre)])
+    vorlage.insert(0, "Serie", daten['serie'].astype(str))
+    return vorlage.to_csv(index=False, sep=";").encode("utf-8")
+
+
+def mengenmatrix(daten, plan, jahre):
+    """
+    Stück/Jahr je Serie und Jahr (Array Serien x Jahre)
+    - Zuordnung über den Seriennamen; Serien ohne Planzeile behalten ihre Programmmenge
+    - nach der letzten Planspalte gilt die Menge des letzten Planjahres weiter
+    """
+    basis = daten['stueck_jahr']
+    werte = plan.reindex(pd.Index(daten['serie'].astype(str)).str.strip()).to_numpy(dtype=float)[:, :jahre]
+    if werte.shape[1] < jahre:
+        werte = np.hstack([werte, np.full((len(werte), jahre - werte.shape[1]), np.nan)])
+
+    # Lücken mit dem jeweils letzten bekannten Wert füllen (vor dem ersten Planwert: Programmmenge)
+    werte = np.hstack([basis[:, None], werte])
+    gueltig = ~np.isnan(werte)
+    letzte = np.maximum.accumulate(np.where(gueltig, np.arange(werte.shape[1]), 0), axis=1)
+    return np.take_along_axis(werte, letzte, axis=1)[:, 1:]
+
+
+def programm_im_jahr(daten, mengen, jahr=0):
+    """
+    Programmdaten mit den Mengen eines Planjahres (Standard: Jahr 1) für die Kernergebnisse
+    - Losgröße (Stück/Serie) fest, Serien/Jahr = Menge / Losgröße wie in jahresstunden
+    - 'kennung' aus Programmkennung und Planmengen (Cache-Schlüssel der Programmkalkulation)
+    """
+    stueck_jahr = np.ascontiguousarray(mengen[:, jahr], dtype=float)
+    losgroesse = daten['stueck_serie']
+    serien_jahr = np.divide(stueck_jahr, losgroesse, out=np.zeros_like(stueck_jahr), where=losgroesse > 0)
+    summe_bearb, summe_ruest = maschinenstunden(daten, stueck_jahr, serien_jahr)
+    kennung = hashlib.sha1(daten['kennung'].encode("ascii") + stueck_jahr.tobytes()).hexdigest()
+    return Programmdaten({
+        **daten,
+        'kennung': kennung,
+        'serien_jahr': serien_jahr,
+        'stueck_jahr': stueck_jahr,
+        'stunden_bearb': stueck_jahr[:, None] * daten['zeiten_bearb'] / 60.0,
+        'stunden_ruest': serien_jahr[:, None] * daten['zeiten_ruest'] / 60.0,
+        'summe_bearb': summe_bearb,
+        'summe_ruest': summe_ruest
+    })
+
+
+def jahresstunden(daten, mengen):
+    """
+    Bearbeitungs- und Rüststunden beider Maschinen je Jahr in einem Durchgang (Matrixprodukt)
+    - mengen: Stück/Jahr (Serien x Jahre); Losgröße (Stück/Serie) fest, Serien/Jahr = Menge / Losgröße
+    - Rückgabe: Arrays 2 x Jahre (Zeile 0 = A, 1 = B) 'bearb', 'ruest', 'gesamt' sowie 'stueck' je Jahr
+    """
+    losgroesse = daten['stueck_serie'][:, None]
+    serien = np.divide(mengen, losgroesse, out=np.zeros_like(mengen), where=losgroesse > 0)
+    bearb, ruest = maschinenstunden(daten, mengen, serien)
+    return {'bearb': bearb, 'ruest': ruest, 'gesamt': bearb + ruest, 'stueck': mengen.sum(axis=0)}
+
+
+def erstes_ueberlastjahr(stunden, kapazitaet):
+    """Erstes Jahr (1-basiert), in dem die Stunden die effektive Kapazität übersteigen, sonst None"""
+    ueber = np.flatnonzero(np.asarray(stunden) > kapazitaet)
+    return int(ueber[0]) + 1 if len(ueber) else None
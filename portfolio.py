@@ -0,0 +1,275 @@
+import hashlib
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+from io import BytesIO
+
+from berechnung import PROGRAMM_SPALTEN, berechne_mss_batch, programmdaten, programmstunden, annual_costs_series, npv_alternative_series, kapazitaetscheck, zahlen
+from rechenpool import im_pool_alle
+
+# =========================
+# PORTFOLIO MEHRERER INVESTITIONSENTSCHEIDUNGEN
+# =========================
+# CSV-Spalte -> Standardwert (None = Pflichtspalte, NaN = Wert aus den Grundparametern der Sidebar)
+VORHABEN_SPALTEN = {
+    "Vorhaben": None,
+    "Standort": "",
+    "Anschaffungskosten A [€]": None,
+    "Anschaffungskosten B [€]": None,
+    "Restwert A [€]": 0.0,
+    "Restwert B [€]": 0.0,
+    "Betriebsstunden/Jahr A": None,
+    "Betriebsstunden/Jahr B": None,
+    "Nutzungsgrad A [%]": 80.0,
+    "Nutzungsgrad B [%]": 80.0,
+    "Bedienfaktor A": 1.0,
+    "Bedienfaktor B": 1.0,
+    "Wartungssatz A [%]": None,
+    "Wartungssatz B [%]": None,
+    "Platzbedarf A [m²]": None,
+    "Platzbedarf B [m²]": None,
+    "Leistungsaufnahme A [kW]": None,
+    "Leistungsaufnahme B [kW]": None,
+    "Versicherung A [€/Jahr]": 0.0,
+    "Versicherung B [€/Jahr]": 0.0,
+    "Werkzeugkosten A [€/Jahr]": 0.0,
+    "Werkzeugkosten B [€/Jahr]": 0.0,
+    "Nutzungsdauer [Jahre]": np.nan,
+    "Lohnkosten [€/h]": np.nan,
+    "Strompreis [€/kWh]": np.nan,
+    "Raumkosten [€/m²/Monat]": np.nan,
+}
+# Standortabhängige Spalten -> Schlüssel in den Grundparametern
+GRUNDPARAMETER = {
+    "Nutzungsdauer [Jahre]": 'n',
+    "Lohnkosten [€/h]": 'lohn',
+    "Strompreis [€/kWh]": 'strom_preis',
+    "Raumkosten [€/m²/Monat]": 'raum_preis',
+}
+# Programm-CSV: Spalten des Programm-Editors, Zuordnung zum Vorhaben vorangestellt
+PORTFOLIO_SPALTEN = ["Vorhaben", *PROGRAMM_SPALTEN]
+BUDGETBEDARF = {
+    "Anschaffungskosten B": 'Anschaffungskosten B (€)',
+    "Mehrinvestition (B − A)": 'Mehrinvestition (€)',
+}
+# Auflösung der Budgetachse im Knapsack: mindestens 100 €, höchstens MAX_ZELLEN Schritte
+RASTER_MIN = 100.0
+MAX_ZELLEN = 50_000
+
+
+def tabellen_hash(df):
+    """Inhalts-Hash eines DataFrames über alle Zeilen (Spaltennamen, Index und Werte)"""
+    zeilen = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    return hashlib.sha1("\x1f".join(map(str, df.columns)).encode("utf-8") + zeilen.tobytes()).hexdigest()
+
+
+# Wie berechnung.PROGRAMM_HASH: Streamlits Standard-Hash tastet DataFrames ab 50.000 Zeilen nur
+# stichprobenartig ab, eine geänderte Zeile großer Vorhaben-/Programmlisten bliebe sonst unbemerkt
+TABELLEN_HASH = {pd.DataFrame: tabellen_hash}
+
+
+def portfolio_vorlagen():
+    """Leere CSV-Vorlagen für Vorhaben und Programme"""
+    return {
+        'vorhaben': pd.DataFrame(columns=list(VORHABEN_SPALTEN)).to_csv(index=False, sep=";").encode("utf-8"),
+        'programme': pd.DataFrame(columns=PORTFOLIO_SPALTEN).to_csv(index=False, sep=";").encode("utf-8"),
+    }
+
+
+@st.cache_data(show_spinner=False)
+def lade_vorhaben(csv_bytes):
+    """
+    Liest die Vorhabenliste (eine Zeile je A/B-Vergleich), Index: Vorhaben
+    - fehlende optionale Spalten werden ergänzt, leere standortabhängige Werte bleiben NaN
+    - Zeilen mit ungültigen Pflichtwerten werden verworfen
+    """
+    df = pd.read_csv(BytesIO(csv_bytes), sep=None, engine="python")
+    df.columns = [str(c).strip() for c in df.columns]
+
+    fehlend = [c for c, default in VORHABEN_SPALTEN.items() if default is None and c not in df.columns]
+    if fehlend:
+        raise ValueError(f"Fehlende Spalten in der Vorhabenliste: {', '.join(fehlend)}")
+
+    for spalte, default in VORHABEN_SPALTEN.items():
+        if spalte in ("Vorhaben", "Standort"):
+            continue
+        if spalte not in df.columns:
+            df[spalte] = default
+        df[spalte] = zahlen(df[spalte])
+        if default is not None:
+            df[spalte] = df[spalte].fillna(default)
+
+    df["Standort"] = df["Standort"].fillna("").astype(str) if "Standort" in df.columns else ""
+    df = df.dropna(subset=[c for c, default in VORHABEN_SPALTEN.items() if default is None])
+    df["Vorhaben"] = df["Vorhaben"].astype(str)
+    doppelt = df["Vorhaben"][df["Vorhaben"].duplicated()].unique()
+    if len(doppelt):
+        raise ValueError(f"Vorhaben mehrfach vorhanden: {', '.join(doppelt)}")
+    return df[list(VORHABEN_SPALTEN)].set_index("Vorhaben")
+
+
+@st.cache_data(show_spinner=False)
+def lade_programme(csv_bytes):
+    """Liest die Produktionsprogramme aller Vorhaben (Spalte 'Vorhaben' ordnet die Serien zu)"""
+    df = pd.read_csv(BytesIO(csv_bytes), sep=None, engine="python")
+    df.columns = [str(c).strip() for c in df.columns]
+
+    fehlend = [c for c in PORTFOLIO_SPALTEN if c not in df.columns]
+    if fehlend:
+        raise ValueError(f"Fehlende Spalten in den Programmen: {', '.join(fehlend)}")
+
+    for spalte in PORTFOLIO_SPALTEN[2:]:
+        df[spalte] = zahlen(df[spalte])
+    df = df.dropna(subset=PORTFOLIO_SPALTEN[2:])
+    df["Vorhaben"] = df["Vorhaben"].astype(str)
+    df["Serie"] = df["Serie"].astype(str)
+    return df[PORTFOLIO_SPALTEN].reset_index(drop=True)
+
+
+def eindeutiger_name(name, vergeben):
+    """Name eines Vorhabens, der in vergeben nicht vorkommt (sonst mit laufender Nummer)"""
+    kandidat, nummer = name, 2
+    while kandidat in vergeben:
+        kandidat, nummer = f"{name} ({nummer})", nummer + 1
+    return kandidat
+
+
+@st.cache_data(show_spinner=False)
+def bewerte_vorhaben(zeile, _programm, programm_schluessel, grund):
+    """
+    Ein A/B-Vergleich (gecacht je Vorhaben: Änderungen an anderen Vorhaben rechnen ihn nicht neu)
+    - zeile: dict mit den VORHABEN_SPALTEN (NaN -> Grundparameter)
+    - _programm (berechnung.programmdaten) wird nicht gehasht, programm_schluessel (Inhalts-Hash)
+      vertritt es im Cache-Schlüssel
+    - grund: dict der Grundparameter (n, zins, lohn, strom_preis, raum_preis, kosten_steigerung, prod_wachstum)
+    - Jahreskosten wie in kalkuliere_programm_detail (Rüsten mit voller Bedienung),
+      NPV 'B statt A' dynamisch mit Kostensteigerung/Produktionswachstum
+    """
+    p = dict(grund)
+    for spalte, schluessel in GRUNDPARAMETER.items():
+        if not pd.isna(zeile[spalte]):
+            p[schluessel] = zeile[spalte]
+    n = int(p['n'])
+
+    ergebnis = {}
+    for m in ("A", "B"):
+        res = berechne_mss_batch(
+            zeile[f"Anschaffungskosten {m} [€]"], n, p['zins'], zeile[f"Wartungssatz {m} [%]"] / 100,
+            zeile[f"Platzbedarf {m} [m²]"], p['raum_preis'], zeile[f"Versicherung {m} [€/Jahr]"],
+            zeile[f"Werkzeugkosten {m} [€/Jahr]"], zeile[f"Betriebsstunden/Jahr {m}"],
+            zeile[f"Nutzungsgrad {m} [%]"] / 100, zeile[f"Leistungsaufnahme {m} [kW]"], p['strom_preis'],
+            restwert=zeile[f"Restwert {m} [€]"]
+        )
+        res = {k: float(v) for k, v in res.items()}
+        t_bearb, t_ruest = programmstunden(_programm, m)
+        mss_basis = res['mss_fix'] + res['mss_var']
+        bedien = zeile[f"Bedienfaktor {m}"]
+        result = {
+            'ges_kosten': t_bearb * (mss_basis + p['lohn'] * bedien) + t_ruest * (mss_basis + p['lohn']),
+            'ges_stunden': t_bearb + t_ruest
+        }
+        ok, auslastung = kapazitaetscheck(result, res)
+        ergebnis[m] = {
+            'kosten': result['ges_kosten'],
+            'reihe': annual_costs_series(res, result, p['lohn'], bedien, n, p['kosten_steigerung'], p['prod_wachstum']),
+            'auslastung': auslastung,
+            'ok': ok
+        }
+
+    ak_a, ak_b = zeile["Anschaffungskosten A [€]"], zeile["Anschaffungskosten B [€]"]
+    npv = npv_alternative_series(
+        ak_a, ak_b, zeile["Restwert A [€]"], zeile["Restwert B [€]"],
+        [a - b for a, b in zip(ergebnis["A"]['reihe'], ergebnis["B"]['reihe'])], p['zins']
+    )
+    return {
+        'Standort': zeile["Standort"],
+        'Anschaffungskosten B (€)': float(ak_b),
+        'Mehrinvestition (€)': float(ak_b - ak_a),
+        'Ersparnis/Jahr (€)': ergebnis["A"]['kosten'] - ergebnis["B"]['kosten'],
+        'NPV B statt A (€)': npv,
+        'Auslastung A (%)': ergebnis["A"]['auslastung'] * 100,
+        'Auslastung B (%)': ergebnis["B"]['auslastung'] * 100,
+        'Kapazität OK': ergebnis["A"]['ok'] and ergebnis["B"]['ok'],
+    }
+
+
+@st.cache_data(show_spinner=False, hash_funcs=TABELLEN_HASH)
+def bewerte_portfolio(vorhaben, programme, grund):
+    """
+    Alle Vorhaben parallel im gemeinsamen Rechenpool bewerten
+    - gecacht als Ganzes (Budgetänderungen: ein Cache-Treffer) und je Vorhaben (bewerte_vorhaben);
+      Schlüssel über den Inhalts-Hash beider Tabellen (TABELLEN_HASH)
+    - Programm-Schlüssel aus einem Zeilen-Hash über alle Programme (statt DataFrame-Hash je Vorhaben)
+    - Vorhaben ohne Programmzeilen werden übersprungen und als Liste zurückgegeben
+    - Rückgabe: (DataFrame je Vorhaben, Liste fehlender Programme)
+    """
+    programm_spalten = programme.drop(columns="Vorhaben")
+    zeilen_hash = pd.util.hash_pandas_object(programm_spalten, index=False).to_numpy()
+    gruppen = programme.groupby("Vorhaben", sort=False).indices
+    namen = [v for v in vorhaben.index if v in gruppen]
+    ohne_programm = [v for v in vorhaben.index if v not in gruppen]
+
+    # Zahlen einheitlich als float: gleiche Werte ergeben denselben Cache-Schlüssel, egal ob aus CSV oder Sidebar
+    kennwerte = vorhaben.drop(columns="Standort").astype(float)
+    aufrufe = [{
+        'zeile': {"Standort": vorhaben.at[v, "Standort"], **kennwerte.loc[v].to_dict()},
+        '_programm': programmdaten(programm_spalten.iloc[gruppen[v]]),
+        'programm_schluessel': hashlib.sha1(zeilen_hash[gruppen[v]].tobytes()).hexdigest(),
+        'grund': grund
+    } for v in namen]
+    ergebnisse = im_pool_alle(bewerte_vorhaben, aufrufe)
+    return pd.DataFrame(ergebnisse, index=pd.Index(namen, name="Vorhaben")), ohne_programm
+
+
+# Die Tabelle hängt nicht vom Budget ab: Budgetänderungen verfolgen nur neu zurück. 'nimm' ist groß
+# (Vorhaben x bis zu MAX_ZELLEN), daher nur aktuelles und vorheriges Portfolio im Cache
+@st.cache_data(show_spinner=False, max_entries=2)
+def knapsack_tabelle(gewichte, werte):
+    """
+    0/1-Knapsack über alle Budgets zugleich (dynamische Programmierung, exakt auf dem Raster)
+    - gewichte: ganzzahlige Rasterschritte (> 0), werte: NPV je Vorhaben
+    - 'bester'[c]: maximaler NPV mit Budget c Rasterschritten (Effizienzkurve)
+    - 'nimm'[i, c]: Vorhaben i wird bei Restbudget c genommen (für die Rückverfolgung)
+    """
+    kapazitaet = int(sum(gewichte))
+    bester = np.zeros(kapazitaet + 1)
+    nimm = np.zeros((len(gewichte), kapazitaet + 1), dtype=bool)
+    for i, (w, v) in enumerate(zip(gewichte, werte)):
+        kandidat = bester[:kapazitaet + 1 - w] + v
+        besser = kandidat > bester[w:]
+        nimm[i, w:] = besser
+        bester[w:] = np.where(besser, kandidat, bester[w:])
+    return {'bester': bester, 'nimm': nimm}
+
+
+def waehle_portfolio(bewertung, budget, bedarf_spalte):
+    """
+    NPV-maximale Auswahl unter dem Budget
+    - Kandidaten: Kapazität OK und NPV > 0; ohne Budgetbedarf (<= 0) immer ausgewählt
+    - Budgetbedarf wird auf das Raster aufgerundet, das Budget abgerundet: die Auswahl hält das Budget immer ein
+    - Rückgabe: dict mit 'auswahl' (bool je Vorhaben), 'raster', 'budgets', 'npv_kurve'
+    """
+    npv = bewertung['NPV B statt A (€)'].to_numpy(dtype=float)
+    bedarf = bewertung[bedarf_spalte].to_numpy(dtype=float)
+    kandidat = bewertung['Kapazität OK'].to_numpy(dtype=bool) & (npv > 0)
+    frei = kandidat & (bedarf <= 0)
+    im_dp = np.flatnonzero(kandidat & (bedarf > 0))
+
+    raster = max(RASTER_MIN, np.ceil(bedarf[im_dp].sum() / MAX_ZELLEN / RASTER_MIN) * RASTER_MIN)
+    gewichte = np.ceil(bedarf[im_dp] / raster).astype(int)
+    tabelle = knapsack_tabelle(tuple(gewichte.tolist()), tuple(npv[im_dp].tolist()))
+
+    auswahl = frei.copy()
+    c = min(int(budget // raster), len(tabelle['bester']) - 1) if budget > 0 else 0
+    for i in range(len(im_dp) - 1, -1, -1):
+        if tabelle['nimm'][i, c]:
+            auswahl[im_dp[i]] = True
+            c -= gewichte[i]
+
+    return {
+        'auswahl': auswahl,
+        'raster': raster,
+        'budgets': np.arange(len(tabelle['bester'])) * raster,
+        'npv_kurve': tabelle['bester'] + npv[frei].sum()
+    }
@@ -0,0 +1,71 @@
+import streamlit as st
+
+# =========================
+# ABHÄNGIGKEITSGRAPH DER BERECHNUNGEN
+# =========================
+# Knoten -> Eingaben (Widget-Werte) bzw. vorgelagerte Knoten.
+# Bezeichnungen (name_a/name_b) tauchen bewusst nirgends auf: eine Umbenennung
+# löst keine Kostenberechnung aus.
+ABHAENGIGKEITEN = {
+    'programmdaten': ('programm_version',),
+    'mss_a': ('ak_a', 'n', 'zins_satz', 'wartung_a', 'raum_a', 'raum_preis', 'vers_a', 'werkzeug_a',
+              'h_jahr_a', 'nutzgrad_a', 'energie_a', 'strom_preis', 'restwert_a'),
+    'mss_b': ('ak_b', 'n', 'zins_satz', 'wartung_b', 'raum_b', 'raum_preis', 'vers_b', 'werkzeug_b',
+              'h_jahr_b', 'nutzgrad_b', 'energie_b', 'strom_preis', 'restwert_b'),
+    'mengenmatrix': ('programmdaten', 'mengen_id', 'n'),
+    'jahresstunden': ('programmdaten', 'mengenmatrix'),
+    'programm_kern': ('programmdaten', 'mengenmatrix'),
+    'energiekosten_a': ('programm_kern', 'jahresstunden', 'preise_id', 'h_jahr_a', 'energie_a',
+                        'ruest_kw_a', 'leer_kw_a', 'n', 'kosten_steigerung', 'prod_wachstum'),
+    'energiekosten_b': ('programm_kern', 'jahresstunden', 'preise_id', 'h_jahr_b', 'energie_b',
+                        'ruest_kw_b', 'leer_kw_b', 'n', 'kosten_steigerung', 'prod_wachstum'),
+    'programm_a': ('programm_kern', 'mss_a', 'energiekosten_a', 'lohn_satz', 'bedien_a'),
+    'programm_b': ('programm_kern', 'mss_b', 'energiekosten_b', 'lohn_satz', 'bedien_b'),
+    'finanzierung_a': ('ak_a', 'n', 'restwert_a', 'zins_satz', 'afa_methode', 'afa_satz', 'fin_a',
+                       'fk_quote', 'kredit_zins', 'fin_laufzeit', 'leasing_satz', 'foerder_a'),
+    'finanzierung_b': ('ak_b', 'n', 'restwert_b', 'zins_satz', 'afa_methode', 'afa_satz', 'fin_b',
+                       'fk_quote', 'kredit_zins', 'fin_laufzeit', 'leasing_satz', 'foerder_b'),
+    'kostenreihe_a': ('jahresstunden', 'mss_a', 'energiekosten_a', 'programm_a', 'finanzierung_a',
+                      'lohn_satz', 'bedien_a', 'n', 'kosten_steigerung', 'prod_wachstum'),
+    'kostenreihe_b': ('jahresstunden', 'mss_b', 'energiekosten_b', 'programm_b', 'finanzierung_b',
+                      'lohn_satz', 'bedien_b', 'n', 'kosten_steigerung', 'prod_wachstum'),
+    'betrieb_a': ('jahresstunden', 'mss_a', 'energiekosten_a', 'programm_a', 'lohn_satz', 'bedien_a',
+                  'n', 'kosten_steigerung', 'prod_wachstum'),
+    'betrieb_b': ('jahresstunden', 'mss_b', 'energiekosten_b', 'programm_b', 'lohn_satz', 'bedien_b',
+                  'n', 'kosten_steigerung', 'prod_wachstum'),
+    'break_even': ('programm_kern', 'mss_a', 'mss_b', 'energiekosten_a', 'energiekosten_b',
+                   'lohn_satz', 'bedien_a', 'bedien_b'),
+    'break_even_serien': ('programm_kern', 'mss_a', 'mss_b', 'energiekosten_a', 'energiekosten_b',
+                          'lohn_satz', 'bedien_a', 'bedien_b'),
+}
+
+
+def programm_geaendert():
+    """on_change des Programm-Editors: Version hochzählen statt DataFrame zu hashen"""
+    st.session_state['programm_version'] = st.session_state.get('programm_version', 0) + 1
+
+
+def knoten(name, eingaben, fn):
+    """
+    Ergebnis eines Knotens, neu berechnet nur wenn sich eine seiner Abhängigkeiten geändert hat
+    - eingaben: dict der aktuellen Widget-Werte
+    - vorgelagerte Knoten gehen über ihre Versionsnummer ein (müssen vorher berechnet sein)
+    - Speicher je Session in st.session_state
+    """
+    speicher = st.session_state.setdefault('_rechengraph', {})
+    schluessel = tuple(
+        speicher[d]['version'] if d in ABHAENGIGKEITEN else eingaben[d]
+        for d in ABHAENGIGKEITEN[name]
+    )
+
+    eintrag = speicher.get(name)
+    if eintrag is not None and eintrag['schluessel'] == schluessel:
+        return eintrag['wert']
+
+    wert = fn()
+    speicher[name] = {
+        'schluessel': schluessel,
+        'wert': wert,
+        'version': eintrag['version'] + 1 if eintrag is not None else 0
+    }
+    return wert
@@ -0,0 +1,114 @@
+import os
+import hashlib
+import pickle
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
+
+# =========================
+# GEMEINSAMER RECHENPOOL
+# =========================
+# Obergrenze paralleler Berechnungen über alle Sessions eines Servers
+MAX_WORKER = int(os.environ.get("MSS_MAX_WORKER", min(4, os.cpu_count() or 1)))
+
+
+@st.cache_resource(show_spinner=False)
+def _rechenpool():
+    """Prozessweiter Pool + Tabelle laufender Berechnungen (einmal pro Server)"""
+    return {
+        'executor': ThreadPoolExecutor(max_workers=MAX_WORKER, thread_name_prefix="mss-rechenpool"),
+        'laufend': {},
+        'lock': threading.RLock()
+    }
+
+
+def _schluessel_teil(obj):
+    """Stabile Bytes für Argumente (DataFrames/Arrays über Inhalts-Hash)"""
+    if isinstance(obj, pd.DataFrame):
+        return b"df" + pickle.dumps(list(obj.columns)) + pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes()
+    if isinstance(obj, np.ndarray):
+        return b"nd" + str(obj.dtype).encode() + str(obj.shape).encode() + obj.tobytes()
+    if isinstance(obj, (list, tuple)):
+        return b"(" + b",".join(_schluessel_teil(o) for o in obj) + b")"
+    if isinstance(obj, dict):
+        return b"{" + b",".join(_schluessel_teil(k) + b":" + _schluessel_teil(v) for k, v in sorted(obj.items())) + b"}"
+    return repr(obj).encode()
+
+
+def berechnungs_schluessel(fn, *args, **kwargs):
+    """
+    Schlüssel aus Funktion und Argumenten für die Deduplizierung
+    - Keyword-Argumente mit führendem Unterstrich gehen wie bei st.cache_data nicht ein
+    """
+    kwargs = {k: v for k, v in kwargs.items() if not k.startswith("_")}
+    roh = f"{fn.__module__}.{fn.__qualname__}".encode() + _schluessel_teil(args) + _schluessel_teil(kwargs)
+    return hashlib.sha1(roh).hexdigest()
+
+
+def _mit_kontext(fn, ctx):
+    """
+    fn im Worker mit dem ScriptRunContext der einreichenden Session (st.cache_data in fn braucht ihn)
+    - eigener contextvars-Kontext je Aufgabe, der Kontext wird danach wieder vom Worker gelöst
+    """
+    if ctx is None:
+        return fn
+
+    def _in_kontext(*args, **kwargs):
+        thread = threading.current_thread()
+        add_script_run_ctx(thread, ctx)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            delattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME)
+
+    return lambda *args, **kwargs: contextvars.copy_context().run(_in_kontext, *args, **kwargs)
+
+
+def _einreichen(fn, *args, **kwargs):
+    """Future für fn(*args, **kwargs); läuft dieselbe Berechnung schon, wird ihr Future geteilt"""
+    pool = _rechenpool()
+    schluessel = berechnungs_schluessel(fn, *args, **kwargs)
+
+    with pool['lock']:
+        future = pool['laufend'].get(schluessel)
+        # fertige Futures (Rückruf zum Austragen steht noch aus) nicht teilen, v. a. fehlgeschlagene
+        if future is None or future.done():
+            ctx = get_script_run_ctx(suppress_warning=True)
+            future = pool['executor'].submit(_mit_kontext(fn, ctx), *args, **kwargs)
+            pool['laufend'][schluessel] = future
+
+            def _fertig(fertig, key=schluessel):
+                # auch bei Fehlern austragen: der nächste Aufruf rechnet neu statt den Fehler zu teilen
+                with pool['lock']:
+                    if pool['laufend'].get(key) is fertig:
+                        del pool['laufend'][key]
+
+            future.add_done_callback(_fertig)
+
+    return future
+
+
+def im_pool(fn, *args, **kwargs):
+    """
+    Führt fn im gemeinsamen Pool aus und wartet auf das Ergebnis
+    - begrenzte Parallelität (MAX_WORKER) statt eines Rechen-Threads je Session
+    - identische gleichzeitige Aufrufe (gleiche Funktion + Argumente) teilen sich
+      eine Berechnung; nach Abschluss übernimmt st.cache_data das Wiederverwenden
+    """
+    return _einreichen(fn, *args, **kwargs).result()
+
+
+def im_pool_alle(fn, aufrufe):
+    """
+    Mehrere unabhängige Aufrufe von fn parallel im gemeinsamen Pool
+    - aufrufe: Liste von dicts mit Keyword-Argumenten; Ergebnisse in derselben Reihenfolge
+    - fn darf selbst nicht im_pool aufrufen (Worker würden aufeinander warten)
+    """
+    futures = [_einreichen(fn, **kwargs) for kwargs in aufrufe]
+    return [f.result() for f in futures]
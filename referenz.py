@@ -0,0 +1,229 @@
+"""
+Referenzfälle: prüft die Rechenergebnisse gegen gespeicherte Sollwerte (Golden Master).
+
+    python referenz.py                          # aktuelle Engine gegen referenz.npz prüfen
+    python referenz.py --erzeugen               # Sollwerte neu schreiben (nur nach bewusster Änderung!)
+    python referenz.py --erzeugen --faelle 5000 --seed 7
+
+Die Eingaben (zufällig, aber deterministisch aus --seed erzeugt) werden zusammen mit den
+Sollwerten gespeichert; geprüft wird immer gegen die gespeicherten Eingaben. Verglichen werden
+MSS, Kosten je Serie und Summen, NPV (konstant und dynamisch), dynamische Amortisation sowie
+Break-Even je Serie und Kostenverlauf. Toleranzen siehe TOLERANZEN: Summen und Kennzahlen
+relativ 1e-9, gerundete Detailwerte der Programmkalkulation (round(..., 2)) auf einen Cent,
+damit eine Engine ohne Zwischenrundung dieselben Sollwerte erfüllt. Exit-Code 1 bei Abweichung.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from berechnung import (PROGRAMM_SPALTEN, berechne_mss_batch, programmdaten, kalkuliere_programm_detail, break_even_verlauf,
+                        break_even_serien, npv_alternative, npv_alternative_series, discounted_payback,
+                        annual_costs_series)
+
+REFERENZ_PFAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "referenz.npz")
+# Ergebnis -> (relative Toleranz, absolute Toleranz)
+TOLERANZEN = {
+    'mss_fix': (1e-9, 1e-9), 'mss_var': (1e-9, 1e-9), 'fix_jahr': (1e-9, 1e-6),
+    'kosten_serie': (0.0, 0.0051), 'kosten_stueck': (0.0, 0.0051), 'stueck_jahr': (0.0, 0.0),
+    'zeit_bearb': (0.0, 0.051), 'zeit_ruest': (0.0, 0.051),
+    'ges_kosten': (1e-9, 1e-6), 'ges_stunden': (1e-9, 1e-9), 'ges_stueck': (0.0, 0.0),
+    'kostenreihe': (1e-9, 1e-6), 'npv': (1e-9, 1e-6), 'npv_dyn': (1e-9, 1e-6), 'amortisation': (0.0, 0.0),
+    'be_menge': (1e-9, 1e-9), 'be_verlauf': (1e-9, 1e-6), 'be_stueck': (0.0, 0.0),
+}
+# Break-Even-Verlauf nur für jeden BE_JEDER-ten Fall (so sind die Sollwerte in referenz.npz abgelegt)
+BE_FAKTOREN = (0.2, 1.0, 3.0)
+BE_JEDER = 10
+
+
+def erzeuge_eingaben(faelle, seed):
+    """Zufällige, aber reproduzierbare Eingaben inkl. Randfälle (Zins 0, Restwert, Nutzungsgrad 0)"""
+    r = np.random.default_rng(seed)
+    e = {m + '_' + k: v for m in ('a', 'b') for k, v in {
+        'ak': r.integers(1, 40, faelle) * 25000.0,
+        'wartung': r.uniform(0.0, 0.08, faelle),
+        'raum': r.integers(5, 60, faelle).astype(float),
+        'vers': r.integers(0, 30, faelle) * 100.0,
+        'werkzeug': r.integers(0, 40, faelle) * 500.0,
+        'h_jahr': r.choice([1600.0, 2400.0, 4000.0, 6000.0, 8000.0], faelle),
+        'nutzgrad': np.where(r.random(faelle) < 0.01, 0.0, r.uniform(0.5, 0.95, faelle)),
+        'kw': r.uniform(2.0, 40.0, faelle),
+        'bedien': np.where(r.random(faelle) < 0.5, 1.0, r.uniform(0.1, 1.0, faelle)),
+    }.items()}
+    for m in ('a', 'b'):
+        e[m + '_rest'] = np.where(r.random(faelle) < 0.5, 0.0, e[m + '_ak'] * r.uniform(0.0, 0.3, faelle))
+    e.update({
+        'n': r.integers(1, 25, faelle).astype(float),
+        'zins': np.where(r.random(faelle) < 0.05, 0.0, r.uniform(0.0, 0.12, faelle)),
+        'lohn': r.uniform(25.0, 90.0, faelle),
+        'r_preis': r.uniform(5.0, 25.0, faelle),
+        's_preis': r.uniform(0.1, 0.5, faelle),
+        'steigerung': r.uniform(0.0, 0.06, faelle),
+        'wachstum': r.uniform(-0.05, 0.1, faelle),
+    })
+
+    # Programme: 1..20 Serien je Fall, flach gespeichert mit Startindex je Fall
+    serien = r.integers(1, 21, faelle)
+    e['start'] = np.concatenate([[0], np.cumsum(serien)])
+    gesamt = int(serien.sum())
+    e['serien_jahr'] = r.integers(1, 200, gesamt).astype(float)
+    e['stueck_serie'] = r.integers(1, 500, gesamt).astype(float)
+    e['bearb_a'] = np.round(r.uniform(0.1, 30.0, gesamt), 1)
+    e['bearb_b'] = np.round(r.uniform(0.1, 30.0, gesamt), 1)
+    e['ruest_a'] = np.round(r.uniform(0.0, 240.0, gesamt))
+    e['ruest_b'] = np.round(r.uniform(0.0, 240.0, gesamt))
+    return e
+
+
+def programm(e, i):
+    """Produktionsprogramm von Fall i als DataFrame wie im Programm-Editor"""
+    s = slice(e['start'][i], e['start'][i + 1])
+    df = pd.DataFrame(dict(zip(PROGRAMM_SPALTEN[1:], (e['serien_jahr'][s], e['stueck_serie'][s], e['bearb_a'][s],
+                                                      e['bearb_b'][s], e['ruest_a'][s], e['ruest_b'][s]))))
+    df.insert(0, "Serie", [f"Serie {j + 1}" for j in range(len(df))])
+    return df
+
+
+def rechne(e, von=0, bis=None):
+    """
+    Ergebnisse der aktuellen Engine für die Fälle von..bis-1 als flache Arrays
+    - gecachte Funktionen über __wrapped__: geprüft wird die Rechnung, nicht ein Cache-Treffer
+    """
+    bis = len(e['n']) if bis is None else bis
+    res = {m: berechne_mss_batch(e[m + '_ak'], e['n'], e['zins'], e[m + '_wartung'], e[m + '_raum'], e['r_preis'],
+                                 e[m + '_vers'], e[m + '_werkzeug'], e[m + '_h_jahr'], e[m + '_nutzgrad'],
+                                 e[m + '_kw'], e['s_preis'], restwert=e[m + '_rest'])
+           for m in ('a', 'b')}
+    aus = {f'{k}_{m}': res[m][k][von:bis] for m in ('a', 'b') for k in ('mss_fix', 'mss_var', 'fix_jahr')}
+
+    listen = {k: [] for k in ('kosten_serie_a', 'kosten_serie_b', 'kosten_stueck_a', 'kosten_stueck_b',
+                              'zeit_bearb_a', 'zeit_bearb_b', 'zeit_ruest_a', 'zeit_ruest_b', 'stueck_jahr',
+                              'ges_kosten_a', 'ges_kosten_b', 'ges_stunden_a', 'ges_stunden_b', 'ges_stueck',
+                              'kostenreihe_a', 'kostenreihe_b', 'npv', 'npv_dyn', 'amortisation',
+                              'be_menge', 'be_richtung', 'be_verlauf_a', 'be_verlauf_b', 'be_stueck')}
+    for i in range(von, bis):
+        daten = programmdaten(programm(e, i))
+        n = int(e['n'][i])
+        lohn = float(e['lohn'][i])
+        mss = {m: (float(res[m]['mss_fix'][i]), float(res[m]['mss_var'][i])) for m in ('a', 'b')}
+        reihen = {}
+        for m in ('a', 'b'):
+            r = kalkuliere_programm_detail.__wrapped__(daten, *mss[m], lohn, float(e[m + '_bedien'][i]),
+                                                       machine=m.upper())
+            d = r['details']
+            listen['kosten_serie_' + m].append(d['Kosten Gesamt (€)'].to_numpy(dtype=float))
+            listen['kosten_stueck_' + m].append(d['Kosten/Stück (€)'].to_numpy(dtype=float))
+            listen['zeit_bearb_' + m].append(d['Zeit Bearb (h)'].to_numpy(dtype=float))
+            listen['zeit_ruest_' + m].append(d['Zeit Rüst (h)'].to_numpy(dtype=float))
+            listen['ges_kosten_' + m].append(r['ges_kosten'])
+            listen['ges_stunden_' + m].append(r['ges_stunden'])
+            reihen[m] = annual_costs_series.__wrapped__(
+                {k: float(v[i]) for k, v in res[m].items()}, r, lohn, float(e[m + '_bedien'][i]), n,
+                float(e['steigerung'][i]), float(e['wachstum'][i]))
+            listen['kostenreihe_' + m].append(np.asarray(reihen[m]))
+        listen['stueck_jahr'].append(d['Stück/Jahr'].to_numpy(dtype=float))
+        listen['ges_stueck'].append(r['ges_stueck'])
+
+        ersparnis = listen['ges_kosten_a'][-1] - listen['ges_kosten_b'][-1]
+        einsparungen = [a - b for a, b in zip(reihen['a'], reihen['b'])]
+        ak_a, ak_b, rest_a, rest_b = e['a_ak'][i], e['b_ak'][i], e['a_rest'][i], e['b_rest'][i]
+        listen['npv'].append(npv_alternative(ak_a, ak_b, rest_a, rest_b, ersparnis, float(e['zins'][i]), n))
+        listen['npv_dyn'].append(npv_alternative_series(ak_a, ak_b, rest_a, rest_b, einsparungen, float(e['zins'][i])))
+        amort = discounted_payback(ak_b - ak_a, einsparungen, float(e['zins'][i]))
+        listen['amortisation'].append(np.nan if amort is None else amort)
+
+        menge, richtung = break_even_serien(daten, mss['a'], mss['b'], lohn, float(e['a_bedien'][i]),
+                                            float(e['b_bedien'][i]))
+        listen['be_menge'].append(menge)
+        listen['be_richtung'].append(richtung)
+        if i % BE_JEDER == 0:
+            stueck, verlauf_a, verlauf_b = break_even_verlauf.__wrapped__(
+                daten, mss['a'], mss['b'], lohn, float(e['a_bedien'][i]), float(e['b_bedien'][i]), BE_FAKTOREN)
+            listen['be_verlauf_a'].append(verlauf_a)
+            listen['be_verlauf_b'].append(verlauf_b)
+            listen['be_stueck'].append(stueck)
+
+    for k, werte in listen.items():
+        aus[k] = np.concatenate([np.atleast_1d(np.asarray(w)) for w in werte]) if werte else np.zeros(0)
+    return aus
+
+
+def rechne_parallel(e, prozesse):
+    """rechne() in Blöcken auf mehrere Prozesse verteilt; Ergebnis identisch zur seriellen Rechnung"""
+    faelle = len(e['n'])
+    if prozesse <= 1:
+        return rechne(e)
+    grenzen = np.linspace(0, faelle, prozesse * 4 + 1).astype(int)
+    with ProcessPoolExecutor(max_workers=prozesse) as pool:
+        teile = list(pool.map(rechne, [e] * (len(grenzen) - 1), grenzen[:-1], grenzen[1:]))
+    return {k: np.concatenate([t[k] for t in teile]) for k in teile[0]}
+
+
+def lade_referenz(pfad=REFERENZ_PFAD):
+    """Gespeicherte Eingaben und Sollwerte: (eingaben, soll)"""
+    with np.load(pfad) as daten:
+        e = {k[2:]: daten[k] for k in daten.files if k.startswith('e_')}
+        soll = {k[2:]: daten[k] for k in daten.files if k.startswith('s_')}
+    return e, soll
+
+
+def vergleiche(soll, ist):
+    """Abweichungen je Ergebnis: (Name, Anzahl Werte, Verletzungen, max. Abweichung)"""
+    zeilen = []
+    for k in sorted(soll):
+        a, b = soll[k], ist.get(k)
+        if b is None or a.shape != b.shape:
+            zeilen.append((k, len(a), len(a), np.inf))
+            continue
+        if a.dtype.kind in 'US':
+            zeilen.append((k, len(a), int((a != b).sum()), 0.0))
+            continue
+        basis = k.rsplit('_', 1)[0] if k not in TOLERANZEN else k
+        rel, abs_ = TOLERANZEN[basis]
+        nan_gleich = np.isnan(a) & np.isnan(b)
+        diff = np.where(nan_gleich, 0.0, np.abs(a - b))
+        verletzt = ~nan_gleich & ~(diff <= abs_ + rel * np.abs(a))
+        zeilen.append((k, len(a), int(verletzt.sum()), float(np.nanmax(diff)) if len(diff) else 0.0))
+    return zeilen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--erzeugen", action="store_true", help="Sollwerte mit der aktuellen Engine neu schreiben")
+    parser.add_argument("--faelle", type=int, default=2000, help="Anzahl Fälle beim Erzeugen")
+    parser.add_argument("--seed", type=int, default=20240601, help="Zufallsstartwert beim Erzeugen")
+    parser.add_argument("--pfad", default=REFERENZ_PFAD, help="Datei mit Eingaben und Sollwerten")
+    parser.add_argument("--prozesse", type=int, default=min(4, os.cpu_count() or 1), help="parallele Prozesse")
+    args = parser.parse_args()
+
+    if args.erzeugen:
+        e = erzeuge_eingaben(args.faelle, args.seed)
+        t0 = time.perf_counter()
+        soll = rechne_parallel(e, args.prozesse)
+        np.savez_compressed(args.pfad, **{'e_' + k: v for k, v in e.items()}, **{'s_' + k: v for k, v in soll.items()})
+        print(f"{args.faelle} Referenzfälle ({len(e['serien_jahr'])} Serien) in {time.perf_counter() - t0:.1f} s "
+              f"erzeugt: {args.pfad}")
+        return
+
+    e, soll = lade_referenz(args.pfad)
+    t0 = time.perf_counter()
+    ist = rechne_parallel(e, args.prozesse)
+    dauer = time.perf_counter() - t0
+
+    zeilen = vergleiche(soll, ist)
+    breite = max(len(z[0]) for z in zeilen)
+    for name, anzahl, verletzt, max_diff in zeilen:
+        print(f"{'FEHLER' if verletzt else 'ok':6} {name:{breite}} {anzahl:8d} Werte  max. Abweichung {max_diff:.3g}"
+              + (f"  ({verletzt} außerhalb der Toleranz)" if verletzt else ""))
+    fehler = sum(z[2] for z in zeilen)
+    print(f"{len(e['n'])} Fälle in {dauer:.1f} s geprüft: "
+          + ("alle Ergebnisse innerhalb der Toleranzen." if not fehler else f"{fehler} Abweichungen."))
+    sys.exit(1 if fehler else 0)
+
+
+if __name__ == "__main__":
+    main()
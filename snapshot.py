@@ -0,0 +1,157 @@
+import base64
+import json
+import math
+import struct
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from berechnung import PROGRAMM_SPALTEN
+from finanzierung import AFA_METHODEN, FINANZIERUNGSARTEN
+
+# =========================
+# SNAPSHOT: EINGABEN ALS LINK ODER DATEI TEILEN
+# =========================
+# Format: "<Version>." + base64url(zlib(Längen | Kopf-JSON | Seriennamen | Zahlenblock))
+# - Kopf: Widget-Werte der Sidebar, Programmspalten, Typ je Spalte (i = int64, f = float64), Zeilenzahl
+# - Zahlenblock spaltenweise mit 8 Byte je Wert, Bytes nach Stelle sortiert (Byte-Shuffle):
+#   Programmwerte ähneln sich, gleiche Bytestellen liegen dann nebeneinander und komprimieren gut
+SNAPSHOT_VERSION = 1
+URL_PARAMETER = "s"
+URL_MAX_ZEICHEN = 8000
+MAX_ROHDATEN = 64 * 1024 * 1024
+NAMEN_TRENNER = "\x1f"
+GANZZAHL_MAX = 2 ** 53 - 1  # größte exakt darstellbare Ganzzahl im Browser (number_input)
+
+# Sidebar-Widgets (key = Variablenname in app.py) -> (Typ, Minimum, Maximum) wie im Widget, None = offen;
+# Auswahlfelder -> Liste der Optionen. Muss zur Sidebar passen: Streamlit lehnt Werte außerhalb ab.
+SNAPSHOT_SCHEMA = {
+    'ak_a': (int, None, None), 'ak_b': (int, None, None), 'n': (int, 1, None),
+    'zins_satz': (float, 0.0, 10.0), 'lohn_satz': (float, None, None), 'strom_preis': (float, None, None),
+    'raum_preis': (float, None, None), 'kosten_steigerung': (float, 0.0, 8.0), 'prod_wachstum': (float, -5.0, 10.0),
+    'restwert_a': (int, 0, None), 'restwert_b': (int, 0, None),
+    'afa_methode': AFA_METHODEN, 'afa_satz': (float, 0.0, 30.0),
+    'fin_a': FINANZIERUNGSARTEN, 'fin_b': FINANZIERUNGSARTEN, 'fk_quote': (int, 0, 100),
+    'kredit_zins': (float, 0.0, 10.0), 'fin_laufzeit': (int, 1, None), 'leasing_satz': (float, 0.0, 30.0),
+    'foerder_a': (int, 0, 50), 'foerder_b': (int, 0, 50),
+    'name_a': (str, None, None), 'h_jahr_a': (int, None, None), 'nutzgrad_a': (int, 0, 100),
+    'wartung_a': (float, 0.0, 10.0), 'raum_a': (int, None, None), 'energie_a': (float, None, None),
+    'vers_a': (int, None, None), 'werkzeug_a': (int, None, None),
+    'name_b': (str, None, None), 'h_jahr_b': (int, None, None), 'nutzgrad_b': (int, 0, 100),
+    'bedien_b': (float, 0.1, 1.0), 'wartung_b': (float, 0.0, 10.0), 'raum_b': (int, None, None),
+    'energie_b': (float, None, None), 'vers_b': (int, None, None), 'werkzeug_b': (int, None, None),
+    'ruest_kw_a': (float, 0.0, None), 'leer_kw_a': (float, 0.0, None),
+    'ruest_kw_b': (float, 0.0, None), 'leer_kw_b': (float, 0.0, None),
+}
+
+
+def kodiere_snapshot(parameter, programm):
+    """
+    Eingaben kompakt kodieren (URL-tauglich, nur ASCII)
+    - parameter: dict Widget-Schlüssel -> Wert (JSON-fähig)
+    - programm: Produktionsprogramm (Spalte Serie + Zahlenspalten)
+    """
+    spalten = [c for c in programm.columns if c != "Serie"]
+    typen = "".join(
+        "i" if pd.api.types.is_integer_dtype(programm[c]) and not programm[c].isna().any() else "f"
+        for c in spalten
+    )
+    werte = [programm[c].to_numpy(dtype=np.int64 if t == "i" else np.float64) for c, t in zip(spalten, typen)]
+    block = np.stack([w.view(np.uint8).reshape(-1, 8).T for w in werte]) if werte else np.zeros(0, np.uint8)
+
+    kopf = json.dumps({'p': parameter, 's': spalten, 't': typen, 'n': len(programm)},
+                      separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    namen = NAMEN_TRENNER.join(programm["Serie"].fillna("").astype(str)).encode("utf-8")
+    roh = struct.pack("<II", len(kopf), len(namen)) + kopf + namen + block.tobytes()
+    return f"{SNAPSHOT_VERSION}." + base64.urlsafe_b64encode(zlib.compress(roh, 9)).rstrip(b"=").decode("ascii")
+
+
+def dekodiere_snapshot(code):
+    """
+    Gegenstück zu kodiere_snapshot: (parameter, programm), vollständig geprüft
+    - Parameter gegen SNAPSHOT_SCHEMA, Programm auf Spalten, Typen und Werte (siehe _pruefe_*)
+    - ValueError bei fremder Version, beschädigten oder ungültigen Daten (Entpacken auf MAX_ROHDATEN begrenzt);
+      wer erst nach dem Aufruf übernimmt, übernimmt also nie einen Teil eines ungültigen Snapshots
+    """
+    version, _, nutzdaten = code.strip().partition(".")
+    if version != str(SNAPSHOT_VERSION):
+        raise ValueError(f"Snapshot-Version {version!r} wird nicht unterstützt (erwartet {SNAPSHOT_VERSION}).")
+    entpacker = zlib.decompressobj()
+    try:
+        roh = entpacker.decompress(base64.urlsafe_b64decode(nutzdaten + "=" * (-len(nutzdaten) % 4)), MAX_ROHDATEN)
+    except (zlib.error, ValueError) as e:
+        raise ValueError("Snapshot ist beschädigt.") from e
+    if entpacker.unconsumed_tail:
+        raise ValueError("Snapshot ist zu groß.")
+    if not entpacker.eof:
+        raise ValueError("Snapshot ist unvollständig (Link abgeschnitten?).")
+    try:
+        laenge_kopf, laenge_namen = struct.unpack_from("<II", roh)
+        kopf = json.loads(roh[8:8 + laenge_kopf])
+        namen = roh[8 + laenge_kopf:8 + laenge_kopf + laenge_namen].decode("utf-8")
+        parameter, zeilen, spalten, typen = kopf['p'], kopf['n'], kopf['s'], kopf['t']
+        block = np.frombuffer(roh, dtype=np.uint8, offset=8 + laenge_kopf + laenge_namen)
+    except (struct.error, KeyError, TypeError, ValueError) as e:
+        raise ValueError("Snapshot ist beschädigt.") from e
+
+    return _pruefe_parameter(parameter), _pruefe_programm(zeilen, spalten, typen, namen, block)
+
+
+def _pruefe_parameter(parameter):
+    """Widget-Werte gegen SNAPSHOT_SCHEMA: Typ, Grenzen, Optionen; Zahlen für float-Widgets als float"""
+    if not isinstance(parameter, dict):
+        raise ValueError("Snapshot ist beschädigt (Parameter).")
+    geprueft = {}
+    for schluessel, wert in parameter.items():
+        regel = SNAPSHOT_SCHEMA.get(schluessel)
+        if regel is None:
+            raise ValueError(f"Unbekannter Parameter im Snapshot: {schluessel!r}")
+        if isinstance(regel, list):
+            if not isinstance(wert, str) or wert not in regel:
+                raise ValueError(f"Ungültiger Wert für {schluessel}: {wert!r}")
+            geprueft[schluessel] = wert
+            continue
+
+        typ, minimum, maximum = regel
+        zahl = isinstance(wert, (int, float)) and not isinstance(wert, bool)
+        if typ is str:
+            gueltig = isinstance(wert, str)
+        elif typ is int:
+            gueltig = zahl and isinstance(wert, int) and abs(wert) <= GANZZAHL_MAX
+        else:
+            gueltig = zahl and math.isfinite(wert)
+        if not gueltig:
+            raise ValueError(f"Ungültiger Wert für {schluessel}: {wert!r} (erwartet {typ.__name__})")
+        if (minimum is not None and wert < minimum) or (maximum is not None and wert > maximum):
+            raise ValueError(f"{schluessel} = {wert!r} liegt außerhalb des zulässigen Bereichs "
+                             f"({'-∞' if minimum is None else minimum} bis {'∞' if maximum is None else maximum}).")
+        geprueft[schluessel] = float(wert) if typ is float else wert
+    return geprueft
+
+
+def _pruefe_programm(zeilen, spalten, typen, namen, block):
+    """
+    Programm aus Kopf, Namen und Zahlenblock
+    - genau die Zahlenspalten des Programm-Editors (PROGRAMM_SPALTEN), je Spalte Typ i oder f
+    - Serienzahl passt zu Namen und Block; Werte nicht negativ und endlich (leere Zellen = NaN erlaubt)
+    """
+    if (not isinstance(zeilen, int) or isinstance(zeilen, bool) or zeilen < 0
+            or not isinstance(spalten, list) or not isinstance(typen, str)):
+        raise ValueError("Snapshot ist beschädigt (Programm).")
+    if sorted(map(str, spalten)) != sorted(PROGRAMM_SPALTEN[1:]) or len(set(spalten)) != len(spalten):
+        raise ValueError(f"Snapshot enthält unerwartete Programmspalten: {', '.join(map(str, spalten))}")
+    if len(typen) != len(spalten) or set(typen) - set("if"):
+        raise ValueError("Snapshot ist beschädigt (Spaltentypen).")
+    serien = namen.split(NAMEN_TRENNER) if zeilen else []
+    if len(serien) != zeilen or block.size != len(spalten) * 8 * zeilen:
+        raise ValueError("Snapshot ist beschädigt (Programmlänge).")
+
+    block = block.reshape(len(spalten), 8, zeilen)
+    programm = {"Serie": serien}
+    for i, (spalte, typ) in enumerate(zip(spalten, typen)):
+        werte = np.ascontiguousarray(block[i].T).view(np.int64 if typ == "i" else np.float64).ravel()
+        if (werte < 0).any() or np.isinf(werte).any():
+            raise ValueError(f"Snapshot enthält ungültige Werte in Spalte {spalte} (negativ oder unendlich).")
+        programm[spalte] = werte
+    return pd.DataFrame(programm)[PROGRAMM_SPALTEN]
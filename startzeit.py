@@ -0,0 +1,80 @@
+"""
+Startzeit: misst die Zeit bis zum ersten Ergebnis einer frischen App-Instanz.
+
+    python startzeit.py --laeufe 3 --kalt   # ohne Plattencache (erster Start überhaupt)
+    python startzeit.py --laeufe 3          # mit Plattencache (vorgewärmtes Image)
+    python startzeit.py --laeufe 1          # im Image-Build: wärmt den Plattencache vor
+
+Je Lauf wird ein neuer Streamlit-Server gestartet (kalter Prozess wie bei einem neu
+hochfahrenden Replikat). Gemessen werden für die erste Session die Zeit ab Verbindungs-
+aufbau bis zum ersten Kennzahl-Element (Kernergebnisse) und bis "script_finished".
+Die Diagramme der Standardeingaben landen dabei im Plattencache (st.cache_data mit
+persist="disk"), den neue Replikate aus dem Image übernehmen.
+
+Benötigt websockets: pip install -r requirements-dev.txt
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import numpy as np
+from websockets.asyncio.client import connect
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from lasttest import _freier_port, starte_server
+
+
+async def erste_session(url, timeout):
+    ws_url = url.replace("http", "ws", 1).rstrip("/") + "/_stcore/stream"
+    t0 = time.perf_counter()
+    erstes_ergebnis = None
+    async with connect(ws_url, subprotocols=["streamlit"], max_size=None) as ws:
+        await ws.send(BackMsg(rerun_script={}).SerializeToString())
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await asyncio.wait_for(ws.recv(), timeout))
+            typ = fwd.WhichOneof("type")
+            if (erstes_ergebnis is None and typ == "delta"
+                    and fwd.delta.WhichOneof("type") == "new_element"
+                    and fwd.delta.new_element.WhichOneof("type") == "metric"):
+                erstes_ergebnis = time.perf_counter() - t0
+            elif typ == "script_finished":
+                return erstes_ergebnis, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--laeufe", type=int, default=3, help="Anzahl kalter Starts")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Timeout je Lauf [s]")
+    parser.add_argument("--kalt", action="store_true", help="Plattencache vor jedem Lauf leeren")
+    args = parser.parse_args()
+
+    erstes, gesamt, server = [], [], []
+    for _ in range(args.laeufe):
+        if args.kalt:
+            subprocess.run([sys.executable, "-m", "streamlit", "cache", "clear"],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        port = _freier_port()
+        t0 = time.perf_counter()
+        proc = starte_server(port)
+        server.append(time.perf_counter() - t0)
+        try:
+            e, g = asyncio.run(erste_session(f"http://127.0.0.1:{port}", args.timeout))
+        finally:
+            proc.terminate()
+            proc.wait()
+        erstes.append(e)
+        gesamt.append(g)
+
+    print(f"Kalte Starts: {args.laeufe} ({'ohne' if args.kalt else 'mit'} Plattencache)")
+    print(f"Serverstart (Health OK):      Median {np.median(server) * 1000:.0f} ms")
+    print(f"Erstes Ergebnis (Kennzahlen): Median {np.median(erstes) * 1000:.0f} ms")
+    print(f"Seite vollständig:            Median {np.median(gesamt) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
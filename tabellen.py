@@ -0,0 +1,113 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from diagramme import farbverlauf
+
+# =========================
+# TABELLEN FÜR GROSSE PROGRAMME
+# =========================
+# Styler erzeugt HTML/CSS für jede Zelle: gestylt wird deshalb immer nur die sichtbare Seite,
+# Kennzahlen und Verteilungen kommen aus Aggregaten. Der Aufwand je Rerun ist durch
+# ZEILEN_JE_SEITE begrenzt, unabhängig von der Programmgröße.
+ZEILEN_JE_SEITE = 100
+GROSSE_TABELLE = 500
+BERICHT_ZEILEN = 200
+
+
+def vorteil_text(differenz):
+    """
+    Text 'B spart …' / 'A spart …' je Serie (vektorisiert statt apply mit Lambda)
+    - Betrag auf Cent gerundet, Euro/Cent als Ganzzahlen in Arrow-Strings (pyarrow.compute)
+    - Werte nahe einem halben Cent sowie NaN/inf mit Python-Format wie zuvor ({:.2f}), damit
+      die Rundung exakt gleich bleibt (betrifft nur wenige Zeilen)
+    - Ergebnis als Arrow-Stringarray: keine Python-Objekte je Zeile
+    """
+    differenz = np.asarray(differenz, dtype=float)
+    betrag = np.abs(differenz)
+    skaliert = betrag * 100
+    with np.errstate(invalid='ignore'):
+        sonder = ~(skaliert < 2.0 ** 53) | (np.abs(skaliert - np.floor(skaliert) - 0.5) <= skaliert * 1e-12 + 1e-9)
+    cent = np.rint(np.where(sonder, 0.0, skaliert)).astype(np.int64)
+    euro = pc.cast(pa.array(cent // 100), pa.string())
+    rest = pc.utf8_lpad(pc.cast(pa.array(cent % 100), pa.string()), 2, "0")
+    betrag_text = pc.binary_join_element_wise(euro, rest, '.')
+    if sonder.any():
+        betrag_text = pc.replace_with_mask(betrag_text, pa.array(sonder),
+                                           pa.array([f"{x:.2f}" for x in betrag[sonder]], pa.string()))
+    text = pc.if_else(pa.array(differenz > 0), '✅ B spart ', '⚠️ A spart ')
+    return pd.arrays.ArrowStringArray(pc.binary_join_element_wise(text, betrag_text, ' €', ''))
+
+
+def gewinner_verlierer(df, n=10):
+    """
+    Top-n Serien nach Jahresvorteil (Differenz je Stück x Stück/Jahr)
+    - 'b': Serien, bei denen B am meisten spart; 'a': bei denen A am meisten spart
+    """
+    jahresvorteil = df['Differenz (€)'].to_numpy() * df['Stück/Jahr'].to_numpy()
+    spalten = ['Serie', 'Stück/Jahr', 'Differenz (€)']
+    top = df[spalten].assign(**{'Vorteil/Jahr (€)': jahresvorteil})
+    return {
+        'b': top.nlargest(n, 'Vorteil/Jahr (€)').query("`Vorteil/Jahr (€)` > 0"),
+        'a': top.nsmallest(n, 'Vorteil/Jahr (€)').query("`Vorteil/Jahr (€)` < 0")
+                .assign(**{'Vorteil/Jahr (€)': lambda d: -d['Vorteil/Jahr (€)']})
+    }
+
+
+def histogramm(werte, klassen=30):
+    """Häufigkeitsverteilung als DataFrame (Klassenmitte als Index) für st.bar_chart"""
+    werte = np.asarray(werte, dtype=float)
+    werte = werte[~np.isnan(werte)]
+    if len(werte) == 0:
+        return pd.DataFrame({'Serien': []})
+    anzahl, kanten = np.histogram(werte, bins=klassen)
+    mitte = (kanten[:-1] + kanten[1:]) / 2
+    return pd.DataFrame({'Serien': anzahl}, index=pd.Index(np.round(mitte, 2), name='Differenz je Stück (€)'))
+
+
+def bericht_tabelle(df, zeilen=BERICHT_ZEILEN):
+    """Für den HTML-Bericht: höchstens zeilen Zeilen und Anzahl der ausgelassenen"""
+    return df.head(zeilen), max(len(df) - zeilen, 0)
+
+
+@st.fragment
+def seitenweise_tabelle(df, key, formate, farbspalte=None, na_rep=None, zeilen=ZEILEN_JE_SEITE):
+    """
+    Tabelle mit serverseitiger Blätterung und Sortierung (Fragment: Blättern rechnet nichts neu)
+    - gestylt wird nur die aktuelle Seite; der Farbverlauf bezieht sich auf die ganze Spalte
+    - bis zu zeilen Zeilen: wie bisher eine gestylte Tabelle ohne Bedienelemente
+    """
+    grenzen = None
+    if farbspalte is not None:
+        spalte = df[farbspalte].to_numpy(dtype=float)
+        if np.isfinite(spalte).any():
+            grenzen = (np.nanmin(spalte), np.nanmax(spalte))
+
+    ansicht = df
+    if len(df) > zeilen:
+        col_sort, col_richtung, col_seite = st.columns([2, 1, 1])
+        with col_sort:
+            sortierung = st.selectbox("Sortieren nach", ["(Programmreihenfolge)"] + list(df.columns),
+                                      key=f"{key}_sortierung")
+        with col_richtung:
+            absteigend = st.toggle("absteigend", value=True, key=f"{key}_absteigend")
+        seiten = -(-len(df) // zeilen)
+        with col_seite:
+            seite = st.number_input(f"Seite (von {seiten})", min_value=1, max_value=seiten, value=1,
+                                    key=f"{key}_seite")
+
+        if sortierung != "(Programmreihenfolge)":
+            # sort_values statt argsort: Textspalten (auch dtype str) und NaN sortieren sauber, NaN immer ans Ende
+            sortiert = df.sort_values(sortierung, ascending=not absteigend, kind='stable', na_position='last')
+        else:
+            sortiert = df
+        ansicht = sortiert.iloc[(seite - 1) * zeilen:seite * zeilen]
+        st.caption(f"Zeilen {(seite - 1) * zeilen + 1:,}–{min(seite * zeilen, len(df)):,} "
+                   f"von {len(df):,}".replace(",", "."))
+
+    styler = ansicht.style.format(formate, na_rep=na_rep)
+    if grenzen is not None:
+        styler = styler.apply(farbverlauf, subset=[farbspalte], grenzen=grenzen)
+    st.dataframe(styler, use_container_width=True)
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Module der App liegen im Wurzelverzeichnis (ohne Paket)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def programm():
+    """Kleines Produktionsprogramm mit unterschiedlichen Serien (Spalten wie im Programm-Editor)"""
+    return pd.DataFrame({
+        "Serie": ["Welle", "Flansch", "Bolzen"],
+        "Serien/Jahr": [12, 40, 4],
+        "Stück/Serie": [50, 5, 400],
+        "Bearbzeit (min/Stk) A": [10.0, 4.0, 2.5],
+        "Bearbzeit (min/Stk) B": [12.0, 3.0, 2.0],
+        "Rüstzeit (min) A": [45, 30, 90],
+        "Rüstzeit (min) B": [60, 20, 120]
+    })
@@ -0,0 +1,105 @@
+import os
+import warnings
+
+import numpy as np
+import pytest
+from streamlit.runtime.caching import cache_data_api
+from streamlit.runtime.caching.storage.local_disk_cache_storage import LocalDiskCacheStorageManager
+
+import diagramme
+from diagramme import farbverlauf
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+ROT, GELB, GRUEN = "#a50026", "#ffffbf", "#006837"
+
+
+def _farbe(stil):
+    return stil.split(";")[0].removeprefix("background-color: ")
+
+
+def test_farbverlauf_rot_gelb_gruen():
+    stile = farbverlauf([10.0, 20.0, 30.0])
+    assert [_farbe(s) for s in stile] == [ROT, GELB, GRUEN]
+    # weiße Schrift auf dunklem Rot/Grün, schwarze auf Gelb
+    assert [s.endswith("#f1f1f1") for s in stile] == [True, False, True]
+
+
+def test_farbverlauf_grenzen_und_nan():
+    stile = farbverlauf([np.nan, 0.0, 50.0, 200.0], grenzen=(0.0, 100.0))
+    assert stile[0] == ''
+    assert [_farbe(s) for s in stile[1:]] == [ROT, GELB, GRUEN]  # außerhalb der Grenzen begrenzt
+    assert farbverlauf([np.nan, np.nan]) == ['', '']
+
+
+@pytest.mark.parametrize("werte, grenzen", [([7.0, 7.0, 7.0], None), ([3.0], None), ([1.0, 2.0], (5.0, 5.0))])
+def test_farbverlauf_konstant_ohne_division_durch_null(werte, grenzen):
+    with warnings.catch_warnings(), np.errstate(all="raise"):
+        warnings.simplefilter("error")
+        stile = farbverlauf(werte, grenzen)
+    assert [_farbe(s) for s in stile] == [GELB] * len(werte)
+
+
+@pytest.fixture
+def plattencache(tmp_path, monkeypatch):
+    """
+    st.cache_data wie auf dem Server (Plattencache unter ~/.streamlit/cache, hier im tmp_path)
+    - neu_starten(): leert den Speicher wie ein neuer Prozess, die Platte bleibt
+    - gerendert: Aufrufe der Render-Funktionen
+    """
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setattr(cache_data_api.DataCaches, "get_storage_manager",
+                        lambda self: LocalDiskCacheStorageManager())
+    gerendert = []
+    for name, attr in [("kosten", "_kostenstruktur_png"), ("break_even", "_break_even_png")]:
+        render = getattr(diagramme, attr)
+        monkeypatch.setattr(diagramme, attr, lambda *a, name=name, render=render: gerendert.append(name) or render(*a))
+
+    def neu_starten():
+        monkeypatch.setattr(cache_data_api, "_data_caches", cache_data_api.DataCaches())
+
+    neu_starten()
+    return {'neu_starten': neu_starten, 'gerendert': gerendert,
+            'dateien': lambda: os.listdir(tmp_path / ".streamlit" / "cache")}
+
+
+def test_standard_diagramm_aus_plattencache(plattencache):
+    args = (["AfA", "Zinsen"], [1000.0, 200.0], [1500.0, 100.0], "Maschine A", "Maschine B")
+    png = diagramme.kostenstruktur_diagramm(*args, standard=True)
+    assert png.startswith(b"\x89PNG")
+    assert len(plattencache['dateien']()) == 1
+
+    plattencache['neu_starten']()
+    assert diagramme.kostenstruktur_diagramm(*args, standard=True) == png
+    assert plattencache['gerendert'] == ["kosten"]
+
+    # andere Eingaben bleiben im Speicher
+    diagramme.kostenstruktur_diagramm(*args[:-1], "Neu", standard=False)
+    assert plattencache['gerendert'] == ["kosten", "kosten"]
+    assert len(plattencache['dateien']()) == 1
+
+
+def _app():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.run()
+    assert not at.exception
+    return at
+
+
+def test_app_standardeingaben_beim_zweiten_start_aus_cache(plattencache):
+    _app()
+    assert sorted(plattencache['gerendert']) == ["break_even", "kosten"]
+    assert len(plattencache['dateien']()) == 2
+
+    # neues Replikat, neue Session mit Standardeingaben: nichts wird neu gerendert
+    plattencache['neu_starten']()
+    at = _app()
+    assert sorted(plattencache['gerendert']) == ["break_even", "kosten"]
+
+    # geänderte Eingabe: neu gerendert, aber nicht auf Platte
+    at.number_input(key="ak_b").set_value(900000).run()
+    assert not at.exception
+    assert len(plattencache['gerendert']) == 4
+    assert len(plattencache['dateien']()) == 2
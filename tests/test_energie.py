@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from energie import lade_preisreihe
+
+PREISE = np.round(np.random.default_rng(0).uniform(0.05, 0.4, 8760), 4)
+ZEIT = pd.date_range("2025-01-01", periods=8760, freq="h")  # Mittwoch
+
+
+def _zeilen(werte, dezimalkomma=False):
+    return [str(w).replace(".", ",") if dezimalkomma else str(w) for w in werte]
+
+
+@pytest.mark.parametrize("kopf", [None, "Preis", "price", "Preis [EUR/kWh]"])
+@pytest.mark.parametrize("dezimalkomma", [False, True])
+def test_einspaltig(kopf, dezimalkomma):
+    zeilen = ([kopf] if kopf else []) + _zeilen(PREISE, dezimalkomma)
+    reihe = lade_preisreihe("\n".join(zeilen).encode("utf-8"))
+    np.testing.assert_allclose(reihe['preis'], PREISE)
+    assert reihe['wochentag'][0] == 0 and reihe['stunde'][25] == 1
+
+
+@pytest.mark.parametrize("trenner, dezimalkomma", [(";", True), (";", False), (",", False), ("\t", False)])
+@pytest.mark.parametrize("mit_kopf", [True, False])
+def test_zeitstempel_und_preis(trenner, dezimalkomma, mit_kopf):
+    zeilen = [f"Zeit{trenner}Preis"] if mit_kopf else []
+    zeilen += [f"{t}{trenner}{p}" for t, p in zip(ZEIT, _zeilen(PREISE, dezimalkomma))]
+    reihe = lade_preisreihe("\n".join(zeilen).encode("utf-8"))
+    np.testing.assert_allclose(reihe['preis'], PREISE)
+    assert reihe['wochentag'][0] == 2
+
+
+@pytest.mark.parametrize("format", ["%d.%m.%Y %H:%M", "%d.%m.%Y %H:%M:%S", "%Y-%m-%dT%H:%M:%S+01:00"])
+def test_zeitstempel_formate(format):
+    # Jahr ab Samstag 1.3.: TT.MM.JJJJ darf nicht als 3. Januar (Freitag) gelesen werden
+    zeit = pd.date_range("2025-03-01", periods=8760, freq="h")
+    zeilen = [f"{t.strftime(format)};{p}" for t, p in zip(zeit, _zeilen(PREISE, True))]
+    reihe = lade_preisreihe("\n".join(zeilen).encode("utf-8"))
+    np.testing.assert_array_equal(reihe['wochentag'], zeit.dayofweek)
+    np.testing.assert_array_equal(reihe['stunde'], zeit.hour)
+
+
+def test_laufende_nummer_ist_kein_zeitstempel():
+    zeilen = [f"{i + 1};{p}" for i, p in enumerate(_zeilen(PREISE, True))]
+    reihe = lade_preisreihe("\n".join(zeilen).encode("utf-8"))
+    assert reihe['wochentag'][0] == 0 and reihe['stunde'][25] == 1
+
+
+def test_mwh_werden_umgerechnet():
+    reihe = lade_preisreihe("\n".join(_zeilen(PREISE * 1000)).encode("utf-8"))
+    np.testing.assert_allclose(reihe['preis'], PREISE)
+
+
+@pytest.mark.parametrize("inhalt, meldung", [
+    ("Preis\n0.1\n0.2", "2 Werte"),
+    ("\n".join(["0.1"] * 8759 + ["x"]), "ungültige Werte"),
+    ("\n".join([f"{t:%d.%m.%Y %H:%M};0,1" for t in ZEIT[:-1]] + ["31.12.2025 25:00;0,1"]), "31.12.2025 25:00"),
+])
+def test_fehler(inhalt, meldung):
+    with pytest.raises(ValueError, match=meldung):
+        lade_preisreihe(inhalt.encode("utf-8"))
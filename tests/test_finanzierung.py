@@ -0,0 +1,230 @@
+import os
+
+import numpy as np
+import pytest
+
+from berechnung import discounted_payback
+from finanzierung import (abschreibungsplan, annuitaetenplan, finanzierungsplan, npv_zahlungsreihe,
+                          payback_zahlungsreihe)
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def _abzins(zins, jahre):
+    return (1 + zins) ** -np.arange(jahre + 1)
+
+
+def _degressiv_schleife(ak, n, restwert, satz):
+    """Referenz: Jahr für Jahr degressiv, Wechsel zur linearen AfA auf den Restbuchwert"""
+    afa, buchwert = [], ak
+    for t in range(n):
+        rest = buchwert - restwert
+        afa.append(min(max(buchwert * satz, rest / (n - t)), max(rest, 0.0)))
+        buchwert -= afa[-1]
+    return afa
+
+
+def test_linear():
+    afa = abschreibungsplan(100_000.0, 8, 20_000.0, "linear")
+    np.testing.assert_allclose(afa, 10_000.0)
+    assert not afa.flags.writeable
+
+
+@pytest.mark.parametrize("ak, n, restwert, satz", [
+    (100_000.0, 10, 0.0, 0.2),
+    (100_000.0, 10, 10_000.0, 0.25),
+    (100_000.0, 3, 50_000.0, 0.4),   # Restwert begrenzt die AfA
+    (50_000.0, 6, 80_000.0, 0.2),    # Restwert über AK: keine AfA
+    (80_000.0, 1, 0.0, 0.3),
+])
+def test_degressiv_mit_wechsel(ak, n, restwert, satz):
+    afa = abschreibungsplan(ak, n, restwert, "degressiv", satz)
+    np.testing.assert_allclose(afa, _degressiv_schleife(ak, n, restwert, satz), atol=1e-9)
+    assert afa.sum() == pytest.approx(max(0.0, ak - restwert))
+    assert (np.diff(afa) <= 1e-9).all()
+
+
+def test_degressiv_wechseljahr():
+    # 20 % von 100.000 über 10 Jahre: ab Jahr 6 (Restbuchwert 32.768 / 5) linear
+    afa = abschreibungsplan(100_000.0, 10, 0.0, "degressiv", 0.2)
+    np.testing.assert_allclose(afa[:5], 100_000.0 * 0.2 * 0.8 ** np.arange(5))
+    np.testing.assert_allclose(afa[5:], 100_000.0 * 0.8 ** 5 / 5)
+
+
+def test_unbekannte_methode():
+    with pytest.raises(ValueError):
+        abschreibungsplan(1.0, 2, 0.0, "progressiv", 0.1)
+
+
+def test_eigenkapital():
+    plan = finanzierungsplan(100_000.0, 5, 10_000.0, 0.06, foerderquote=0.1)
+    np.testing.assert_allclose(plan['zahlungen'], [90_000.0, 0, 0, 0, 0, 0])
+    np.testing.assert_allclose(plan['afa'], 16_000.0)
+    np.testing.assert_allclose(plan['zinsen'], 50_000.0 * 0.06)
+    assert plan['restwert'] == 10_000.0
+
+
+@pytest.mark.parametrize("laufzeit", [3, 5, 8])
+def test_annuitaetendarlehen(laufzeit):
+    ak, n, quote, zins = 100_000.0, 5, 0.6, 0.04
+    plan = finanzierungsplan(ak, n, 0.0, 0.06, finanzierung="Annuitätendarlehen", fk_quote=quote,
+                             kredit_zins=zins, laufzeit=laufzeit)
+    zahlungen = plan['zahlungen']
+    annuitaet = 60_000.0 * zins / (1 - (1 + zins) ** -laufzeit)
+
+    assert zahlungen[0] == pytest.approx(40_000.0)
+    np.testing.assert_allclose(zahlungen[1:min(laufzeit, n)], annuitaet)
+    # Barwert der Kreditzahlungen zum Kreditzins = Kreditbetrag (Restschuld am Ende abgelöst)
+    assert (zahlungen[1:] * _abzins(zins, n)[1:]).sum() == pytest.approx(60_000.0)
+    # Kostensicht unabhängig von der Finanzierung
+    np.testing.assert_allclose(plan['kapitalkosten'], finanzierungsplan(ak, n, 0.0, 0.06)['kapitalkosten'])
+
+
+def test_annuitaetenplan_tilgt_vollstaendig():
+    zinsanteil, tilgung = annuitaetenplan(60_000.0, 0.05, 7)
+    assert tilgung.sum() == pytest.approx(60_000.0)
+    np.testing.assert_allclose(zinsanteil + tilgung, (zinsanteil + tilgung)[0])
+    np.testing.assert_allclose(annuitaetenplan(60_000.0, 0.0, 6)[1], 10_000.0)
+
+
+def test_leasing_mit_anschlussleasing():
+    plan = finanzierungsplan(100_000.0, 6, 20_000.0, 0.06, finanzierung="Leasing", laufzeit=4,
+                             leasing_satz=0.2, foerderquote=0.3)
+    np.testing.assert_allclose(plan['zahlungen'], [0.0] + [20_000.0] * 6)
+    np.testing.assert_allclose(plan['kapitalkosten'], 20_000.0)
+    assert plan['restwert'] == 0.0 and not plan['afa'].any()
+
+
+def test_plan_je_aufruf_eigenes_dict():
+    plan = finanzierungsplan(100_000.0, 5, 0.0, 0.06)
+    plan['zahlungen'] = None
+    assert finanzierungsplan(100_000.0, 5, 0.0, 0.06)['zahlungen'] is not None
+
+
+def test_npv_zahlungsreihe_vektorisiert():
+    zins, n = 0.05, 4
+    zahlungen_a = np.array([[50_000.0, 0, 0, 0, 0], [0, 15_000.0, 15_000.0, 15_000.0, 15_000.0]])
+    zahlungen_b = np.array([80_000.0, 0, 0, 0, 0])
+    betrieb_a = np.full(n, 20_000.0)
+    betrieb_b = np.full(n, 12_000.0)
+    npv = npv_zahlungsreihe(zahlungen_a, zahlungen_b, betrieb_a, betrieb_b, 5_000.0, 10_000.0, zins)
+
+    abzins = _abzins(zins, n)
+    einzeln = [((za - zahlungen_b) * abzins).sum() + 8_000.0 * abzins[1:].sum() + 5_000.0 * abzins[-1]
+               for za in zahlungen_a]
+    np.testing.assert_allclose(npv, einzeln)
+
+
+def test_npv_leasing_gegen_gefoerderten_kauf():
+    # A: Kauf mit 20 % Zuschuss, B: Leasing (Rate ohne Restwert, kein Zuschuss)
+    ak, n, zins = 100_000.0, 5, 0.05
+    plan_a = finanzierungsplan(ak, n, 10_000.0, zins, foerderquote=0.2)
+    plan_b = finanzierungsplan(ak, n, 10_000.0, zins, finanzierung="Leasing", leasing_satz=0.25,
+                               foerderquote=0.2)
+    betrieb_a = np.full(n, 30_000.0)
+    betrieb_b = np.full(n, 25_000.0)
+
+    abzins = _abzins(zins, n)
+    erwartet = (80_000.0 - 10_000.0 * abzins[-1]
+                + ((30_000.0 - 25_000.0 - 25_000.0) * abzins[1:]).sum())
+    npv = npv_zahlungsreihe(plan_a['zahlungen'], plan_b['zahlungen'], betrieb_a, betrieb_b,
+                            plan_a['restwert'], plan_b['restwert'], zins)
+    assert npv == pytest.approx(erwartet)
+
+
+def test_payback_zahlungsreihe_wie_mehrinvestition():
+    # Kauf ohne Finanzierung: gleiche Amortisation wie aus Mehrinvestition und Einsparung
+    zins, n = 0.05, 10
+    plan_a = finanzierungsplan(50_000.0, n, 0.0, zins)
+    plan_b = finanzierungsplan(120_000.0, n, 0.0, zins)
+    betrieb_a = np.full(n, 40_000.0)
+    betrieb_b = np.full(n, 25_000.0)
+    assert payback_zahlungsreihe(plan_a['zahlungen'], plan_b['zahlungen'], betrieb_a, betrieb_b, zins) == \
+        discounted_payback(70_000.0, list(betrieb_a - betrieb_b), zins) == 6.0
+
+
+def test_payback_zahlungsreihe_leasing():
+    # B geleast: t=0 ohne Mehrauszahlung, die Raten übersteigen die Einsparung -> nie amortisiert
+    zins, n = 0.05, 10
+    plan_a = finanzierungsplan(50_000.0, n, 0.0, zins)
+    plan_b = finanzierungsplan(120_000.0, n, 0.0, zins, finanzierung="Leasing", leasing_satz=0.2)
+    betrieb_a = np.full(n, 40_000.0)
+    betrieb_b = np.full(n, 25_000.0)
+    assert plan_b['zahlungen'][0] - plan_a['zahlungen'][0] < 0
+    assert payback_zahlungsreihe(plan_a['zahlungen'], plan_b['zahlungen'], betrieb_a, betrieb_b, zins) is None
+
+    # Raten unter der Einsparung: von Beginn an vorteilhaft
+    plan_b = finanzierungsplan(120_000.0, n, 0.0, zins, finanzierung="Leasing", leasing_satz=0.1)
+    assert payback_zahlungsreihe(plan_a['zahlungen'], plan_b['zahlungen'], betrieb_a, betrieb_b, zins) == 0.0
+
+    # erst negativ, dann wieder positiv: Jahr, ab dem die Summe positiv bleibt
+    zahlungen_a = np.array([20_000.0, 0, 0, 0, 0])
+    zahlungen_b = np.array([0.0, 30_000.0, 0, 0, 0])
+    betrieb = np.zeros(4)
+    # kumuliert: 20.000, -2.000, 6.000, 14.000, 22.000
+    assert payback_zahlungsreihe(zahlungen_a, zahlungen_b, betrieb + 8_000.0, betrieb, 0.0) == 2.0
+
+
+def _euro(text):
+    """Betrag am Ende eines Textes ('…: -123 €')"""
+    return float(text.rsplit(":", 1)[1].replace("€", "").strip())
+
+
+def _app(**widgets):
+    """App nach Setzen der Widgets (Auswahlfelder über den key, sonst Slider)"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.run()
+    for key, wert in widgets.items():
+        (at.selectbox if key in ("afa_methode", "fin_a", "fin_b") else at.slider)(key=key).set_value(wert)
+    at.run()
+    assert not at.exception
+    return at
+
+
+def _npv_texte(at):
+    """NPV dynamisch (genau einmal) und NPV Zahlungsreihe (None, wenn sie bereits NPV dynamisch ist)"""
+    texte = [c.value for c in at.caption]
+    dynamisch = [t for t in texte if t.startswith("NPV dynamisch")]
+    zahlungsreihe = [t for t in texte if t.startswith("NPV Zahlungsreihe")]
+    assert len(dynamisch) == 1 and len(zahlungsreihe) <= 1
+    return dynamisch[0], (zahlungsreihe or [None])[0], texte
+
+
+def test_app_npv_mit_leasing_und_foerderung_aus_zahlungsreihe():
+    at = _app(fin_b="Leasing", foerder_a=20)
+    dynamisch, zahlungsreihe, _ = _npv_texte(at)
+    # eine dynamische Sicht aus der Zahlungsreihe, keine zweite aus Kostenreihe und Brutto-AK
+    assert "Zahlungsreihe" in dynamisch and "A Eigenkapital, B Leasing" in dynamisch
+    assert zahlungsreihe is None
+
+
+def test_app_npv_dynamisch_unabhaengig_von_afa_methode():
+    # Die AfA-Methode allein ändert keine Zahlungen: gleiche Definition, nur die AfA-Verteilung verschiebt den Wert
+    linear, zahlungsreihe_linear, _ = _npv_texte(_app())
+    degressiv, zahlungsreihe_degressiv, _ = _npv_texte(_app(afa_methode="degressiv"))
+    assert "Zahlungsreihe" not in linear and "Zahlungsreihe" not in degressiv
+    assert _euro(degressiv) == pytest.approx(_euro(linear), rel=0.01)
+    assert _euro(zahlungsreihe_degressiv) == _euro(zahlungsreihe_linear)
+
+
+def test_app_payback_mit_leasing():
+    # B geleast: keine Mehrinvestition in t=0, aber negativer NPV -> keine Amortisation nach 0 Jahren
+    at = _app(fin_b="Leasing")
+    dynamisch, _, texte = _npv_texte(at)
+    assert _euro(dynamisch) < 0
+    assert "Dynamische Amortisation (diskontiert): nicht erreicht" in texte
+    assert any("A ist aus Barwertsicht vorteilhafter" in w.value for w in at.warning)
+    assert any("Empfehlung: Maschine A" in w.value for w in at.warning)
+
+
+def test_app_leasing_ohne_rate_eine_antwort():
+    # B kostenlos geleast: Kopfzeile, NPV dynamisch, Amortisation und Empfehlung sprechen alle für B
+    at = _app(fin_b="Leasing", leasing_satz=0.0)
+    dynamisch, _, texte = _npv_texte(at)
+    kopf = next(m.value for m in at.success if "NPV (B statt A)" in m.value)
+    assert _euro(kopf.split("→")[0]) == _euro(dynamisch) > 0
+    assert "Dynamische Amortisation (diskontiert): 0 Jahre" in texte
+    assert any("Empfehlung: Maschine B" in m.value for m in at.success)
+    assert not at.warning
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from berechnung import berechne_mss
+from katalog import KATALOG_SPALTEN, bewerte_katalog, filtere_katalog, lade_katalog
+
+
+def _katalog_csv(sep=";"):
+    """Katalog unsortiert, zwei Maschinen mit gleichen AK; optionale Spalten teils weggelassen"""
+    return pd.DataFrame({
+        "Bezeichnung": ["M300", "M100", "M200a", "M200b", "M150"],
+        "Anschaffungskosten [€]": [300_000, 100_000, 200_000, 200_000, 150_000],
+        "Leistungsaufnahme [kW]": [20.0, 8.0, 12.0, 14.0, 10.0],
+        "Platzbedarf [m²]": [40, 15, 25, 30, 20],
+        "Wartungssatz [%]": [4.0, 2.0, 3.0, 3.0, 2.5],
+        "Versicherung [€/Jahr]": [1500, 500, 900, 1000, 700],
+        "Werkzeugkosten [€/Jahr]": [9000, 3000, 6000, 6000, 4000],
+        "Betriebsstunden/Jahr": [5000, 2400, 4000, 4000, 3000],
+        "Restwert [€]": [30_000, 0, 20_000, 10_000, 0],
+        "Zeitfaktor Bearb": [0.7, 1.0, 0.8, 0.85, 0.9],
+    }).to_csv(index=False, sep=sep).encode("utf-8")
+
+
+@pytest.mark.parametrize("sep", [";", ","])
+def test_lade_katalog_sortiert_mit_standardwerten(sep):
+    katalog = lade_katalog(_katalog_csv(sep))
+    assert list(katalog.columns) == list(KATALOG_SPALTEN)[1:]
+    assert list(katalog.index) == ["M100", "M150", "M200a", "M200b", "M300"]
+    assert (katalog["Nutzungsgrad [%]"] == 80.0).all()
+    assert (katalog["Zeitfaktor Rüst"] == 1.0).all()
+
+
+@pytest.mark.parametrize("budget, erwartet", [
+    (99_999, []),
+    (100_000, ["M100"]),
+    (199_999, ["M100", "M150"]),
+    (200_000, ["M100", "M150", "M200a", "M200b"]),  # Budget genau gleich AK: beide Maschinen enthalten
+    (1e9, ["M100", "M150", "M200a", "M200b", "M300"]),
+])
+def test_budget_grenze(budget, erwartet):
+    katalog = lade_katalog(_katalog_csv())
+    assert list(filtere_katalog(katalog, max_budget=budget).index) == erwartet
+    # gleiche Auswahl wie eine einfache Maske
+    assert erwartet == list(katalog.index[katalog["Anschaffungskosten [€]"] <= budget])
+
+
+def test_budget_und_platz():
+    katalog = lade_katalog(_katalog_csv())
+    assert list(filtere_katalog(katalog, max_budget=200_000, max_platz=25).index) == ["M100", "M150", "M200a"]
+
+
+@pytest.mark.parametrize("zins", [0.0, 0.05])
+def test_npv_wie_abgezinste_summe(zins):
+    katalog = lade_katalog(_katalog_csv())
+    n, lohn, r_preis, s_preis = 12, 60.0, 12.0, 0.25
+    referenz = {'ak': 120_000.0, 'restwert': 5_000.0, 'ges_kosten': 400_000.0}
+    ranking = bewerte_katalog(katalog, (2_000.0, 300.0), referenz, n, zins, lohn, r_preis, s_preis)
+
+    for name, zeile in katalog.iterrows():
+        # Jahreskosten wie die Einzelrechnung
+        res = berechne_mss(zeile["Anschaffungskosten [€]"], n, zins, zeile["Wartungssatz [%]"] / 100,
+                           zeile["Platzbedarf [m²]"], r_preis, zeile["Versicherung [€/Jahr]"],
+                           zeile["Werkzeugkosten [€/Jahr]"], zeile["Betriebsstunden/Jahr"],
+                           zeile["Nutzungsgrad [%]"] / 100, zeile["Leistungsaufnahme [kW]"], s_preis,
+                           restwert=zeile["Restwert [€]"])
+        mss = res['mss_fix'] + res['mss_var']
+        kosten = (2_000.0 * zeile["Zeitfaktor Bearb"] * (mss + lohn * zeile["Bedienfaktor"])
+                  + 300.0 * zeile["Zeitfaktor Rüst"] * (mss + lohn))
+        assert ranking.at[name, 'Jahreskosten (€)'] == pytest.approx(kosten)
+
+        ersparnis = referenz['ges_kosten'] - kosten
+        npv = -(zeile["Anschaffungskosten [€]"] - referenz['ak'])
+        npv += sum(ersparnis / (1 + zins) ** t for t in range(1, n + 1))
+        npv += (zeile["Restwert [€]"] - referenz['restwert']) / (1 + zins) ** n
+        assert ranking.at[name, 'NPV ggü. Referenz (€)'] == pytest.approx(npv)
+
+    assert ranking['NPV ggü. Referenz (€)'].is_monotonic_decreasing
+
+
+@pytest.mark.parametrize("inhalt, meldung", [
+    (b"", "nicht lesbar"),
+    (b"Bezeichnung;Anschaffungskosten [\xe2\x82\xac]\nM1;100000\n", "Fehlende Spalten im Katalog"),
+    (b"\xff\xfe\x00Katalog", "utf-8"),
+    (b'Bezeichnung;Anschaffungskosten\n"M1;100000\n', None),
+])
+def test_fehlerhafte_csv(inhalt, meldung):
+    with pytest.raises(ValueError, match=meldung):
+        lade_katalog(inhalt)
+
+
+def test_ungueltige_zeilen_verworfen():
+    csv = _katalog_csv().decode("utf-8").replace("\nM150;150000", "\nM150;abc")
+    katalog = lade_katalog(csv.encode("utf-8"))
+    assert "M150" not in katalog.index
+    assert np.all(np.diff(katalog["Anschaffungskosten [€]"].to_numpy()) >= 0)
+
+
+def test_dezimalkomma():
+    # deutsches Excel: Semikolon als Trenner, Komma als Dezimalzeichen
+    katalog = lade_katalog(_katalog_csv().decode("utf-8").replace(".", ",")
+                           .replace("M150;150000", "M150;125000,50").encode("utf-8"))
+    assert list(katalog.index) == ["M100", "M150", "M200a", "M200b", "M300"]
+    assert katalog.at["M150", "Anschaffungskosten [€]"] == 125_000.5
+    assert katalog.at["M300", "Zeitfaktor Bearb"] == pytest.approx(0.7)
+    assert katalog.at["M150", "Wartungssatz [%]"] == pytest.approx(2.5)
+    pd.testing.assert_frame_equal(katalog.drop(index="M150"), lade_katalog(_katalog_csv()).drop(index="M150"),
+                                  check_dtype=False)
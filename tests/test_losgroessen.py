@@ -0,0 +1,72 @@
+import numpy as np
+
+from berechnung import programmdaten
+from losgroessen import optimiere_losgroessen
+
+MSS_FIX, MSS_VAR, LOHN, BEDIEN = (40.0, 60.0), (5.0, 8.0), 65.0, (1.0, 0.3)
+LAGER = 0.2
+OHNE_GRENZE = (1e9, 1e9)
+
+
+def _kosten_stunden(daten, m, i, q):
+    """Jahreskosten und Stunden der Serie i auf Maschine m bei Losgröße(n) q, unabhängig nachgerechnet"""
+    basis = MSS_FIX[m] + MSS_VAR[m]
+    t_bearb, t_ruest = daten['zeiten_bearb'][i, m] / 60.0, daten['zeiten_ruest'][i, m] / 60.0
+    bearb_stk = t_bearb * (basis + LOHN * BEDIEN[m])
+    menge = daten['stueck_jahr'][i]
+    kosten = menge * bearb_stk + menge / q * t_ruest * (basis + LOHN) + LAGER * bearb_stk * q / 2.0
+    return kosten, menge * t_bearb + menge / q * t_ruest
+
+
+def _bearbeitungsstunden(daten):
+    return (daten['stueck_jahr'][:, None] * daten['zeiten_bearb'] / 60.0).sum(axis=0)
+
+
+def test_ohne_kapazitaetsgrenze_wie_brute_force(programm):
+    daten = programmdaten(programm)
+    ergebnis = optimiere_losgroessen(daten, MSS_FIX, MSS_VAR, LOHN, BEDIEN, OHNE_GRENZE, LAGER)
+
+    for m in (0, 1):
+        # ohne Restriktion ist jede Serie für sich zu optimieren
+        minimum = sum(_kosten_stunden(daten, m, i, np.linspace(1.0, menge, 200001))[0].min()
+                      for i, menge in enumerate(daten['stueck_jahr']))
+        assert minimum * (1 - 1e-9) <= ergebnis['kosten_opt'][m] <= minimum * (1 + 1e-9)
+        assert ergebnis['schattenpreis'][m] == 0.0
+        assert ergebnis['kapazitaet_ok'][m]
+
+
+def test_knappe_kapazitaet_wie_brute_force(programm):
+    daten = programmdaten(programm)
+    frei = optimiere_losgroessen(daten, MSS_FIX, MSS_VAR, LOHN, BEDIEN, OHNE_GRENZE, LAGER)
+    # Kapazität zwischen kleinstmöglichen Stunden (eine Serie pro Jahr) und der freien Lösung: Restriktion bindet
+    kleinste = _bearbeitungsstunden(daten) + daten['zeiten_ruest'].sum(axis=0) / 60.0
+    kapazitaet = tuple(kleinste + 0.5 * (frei['stunden_opt'] - kleinste))
+    assert (frei['stunden_opt'] > kapazitaet).all()
+    ergebnis = optimiere_losgroessen(daten, MSS_FIX, MSS_VAR, LOHN, BEDIEN, kapazitaet, LAGER)
+
+    for m in (0, 1):
+        # alle Kombinationen eines Losgrößenrasters je Serie (Serien x Raster per Broadcasting)
+        kosten, stunden = 0.0, 0.0
+        for i, menge in enumerate(daten['stueck_jahr']):
+            form = [1] * len(daten['stueck_jahr'])
+            form[i] = -1
+            k, h = _kosten_stunden(daten, m, i, np.geomspace(1.0, menge, 200).reshape(form))
+            kosten, stunden = kosten + k, stunden + h
+        minimum = kosten[stunden <= kapazitaet[m]].min()
+
+        assert ergebnis['kapazitaet_ok'][m]
+        assert ergebnis['stunden_opt'][m] <= kapazitaet[m] + 1e-6
+        assert ergebnis['schattenpreis'][m] > 0
+        # kontinuierliche Lösung mindestens so gut wie das Raster, höchstens um dessen Feinheit besser
+        assert minimum * (1 - 1e-3) <= ergebnis['kosten_opt'][m] <= minimum * (1 + 1e-9)
+
+
+def test_unerfuellbare_kapazitaet(programm):
+    daten = programmdaten(programm)
+    kapazitaet = tuple(_bearbeitungsstunden(daten) * 0.9)
+    ergebnis = optimiere_losgroessen(daten, MSS_FIX, MSS_VAR, LOHN, BEDIEN, kapazitaet, LAGER)
+
+    # nicht einmal ohne Rüsten machbar: gemeldet, Losgröße = Jahresbedarf (eine Serie pro Jahr)
+    assert not ergebnis['kapazitaet_ok'].any()
+    np.testing.assert_array_equal(ergebnis['details']['Losgröße opt. A'], daten['stueck_jahr'].astype(int))
+    np.testing.assert_array_equal(ergebnis['details']['Losgröße opt. B'], daten['stueck_jahr'].astype(int))
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from berechnung import kalkuliere_programm_detail, programmdaten, programmstunden
+from mengenplan import jahresstunden, mengenmatrix, programm_im_jahr
+
+
+@pytest.fixture
+def plan():
+    # Flansch ohne Planzeile, Bolzen ab Jahr 2 ohne Wert (Vorjahresmenge gilt weiter)
+    return pd.DataFrame({"Jahr 1": [900.0, 2000.0], "Jahr 2": [1200.0, np.nan]}, index=["Welle", "Bolzen"])
+
+
+def test_mengenmatrix(programm, plan):
+    mengen = mengenmatrix(programmdaten(programm), plan, 3)
+    np.testing.assert_array_equal(mengen, [[900, 1200, 1200], [200, 200, 200], [2000, 2000, 2000]])
+
+
+def test_programm_im_jahr_passt_zu_jahresstunden(programm, plan):
+    daten = programmdaten(programm)
+    mengen = mengenmatrix(daten, plan, 3)
+    jahre = jahresstunden(daten, mengen)
+
+    for jahr in range(3):
+        daten_jahr = programm_im_jahr(daten, mengen, jahr)
+        for m, maschine in enumerate("AB"):
+            assert programmstunden(daten_jahr, maschine) == pytest.approx(
+                (jahre['bearb'][m][jahr], jahre['ruest'][m][jahr]))
+
+    daten_1 = programm_im_jahr(daten, mengen)
+    np.testing.assert_array_equal(daten_1['serien_jahr'], [18, 40, 5])
+    result = kalkuliere_programm_detail(daten_1, 50.0, 2.0, 40.0, 0.5, machine="B")
+    assert result['ges_stueck'] == 3100
+    assert result['ges_stunden'] == pytest.approx(jahre['gesamt'][1][0])
+    # eigener Cache-Schlüssel je Planjahr
+    assert len({daten['kennung'], daten_1['kennung'], programm_im_jahr(daten, mengen, 1)['kennung']}) == 3
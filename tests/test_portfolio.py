@@ -0,0 +1,133 @@
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from berechnung import PROGRAMM_SPALTEN
+from portfolio import (BUDGETBEDARF, PORTFOLIO_SPALTEN, RASTER_MIN, VORHABEN_SPALTEN, eindeutiger_name,
+                       knapsack_tabelle, portfolio_vorlagen, tabellen_hash, waehle_portfolio)
+
+BEDARF = BUDGETBEDARF["Mehrinvestition (B − A)"]
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def _beste_teilmenge(gewichte, werte, budget):
+    """Maximaler Wert einer Teilmenge mit Gewicht <= budget (vollständige Aufzählung)"""
+    bester = 0.0
+    for maske in itertools.product((False, True), repeat=len(gewichte)):
+        maske = np.array(maske)
+        if gewichte[maske].sum() <= budget:
+            bester = max(bester, werte[maske].sum())
+    return bester
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_knapsack_wie_vollstaendige_suche(seed):
+    rng = np.random.default_rng(seed)
+    gewichte = rng.integers(1, 15, 9)
+    werte = rng.uniform(1.0, 100.0, 9).round(2)
+    tabelle = knapsack_tabelle(tuple(gewichte.tolist()), tuple(werte.tolist()))
+
+    for budget in range(int(gewichte.sum()) + 1):
+        assert tabelle['bester'][budget] == pytest.approx(_beste_teilmenge(gewichte, werte, budget))
+
+        # Rückverfolgung über 'nimm' liefert eine zulässige Auswahl mit genau diesem Wert
+        c, wert = budget, 0.0
+        for i in range(len(gewichte) - 1, -1, -1):
+            if tabelle['nimm'][i, c]:
+                c -= gewichte[i]
+                wert += werte[i]
+        assert c >= 0
+        assert wert == pytest.approx(tabelle['bester'][budget])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_portfolio_wie_vollstaendige_suche(seed):
+    rng = np.random.default_rng(seed)
+    anzahl = 10
+    bewertung = pd.DataFrame({
+        'NPV B statt A (€)': rng.normal(50_000.0, 60_000.0, anzahl),
+        BEDARF: rng.integers(-2, 40, anzahl) * 5_000.0,
+        'Kapazität OK': rng.random(anzahl) > 0.15
+    })
+    npv, bedarf = bewertung['NPV B statt A (€)'].to_numpy(), bewertung[BEDARF].to_numpy()
+    kandidat = bewertung['Kapazität OK'].to_numpy() & (npv > 0)
+    frei = kandidat & (bedarf <= 0)
+    dp = kandidat & (bedarf > 0)
+
+    for budget in (0.0, 42_000.0, 100_000.0, 250_000.0, 1e7):
+        wahl = waehle_portfolio(bewertung, budget, BEDARF)['auswahl']
+        soll = npv[frei].sum() + _beste_teilmenge(bedarf[dp], npv[dp], budget)
+
+        assert npv[wahl].sum() == pytest.approx(soll)
+        assert bedarf[wahl & (bedarf > 0)].sum() <= budget
+        assert not (wahl & ~kandidat).any()
+        assert (wahl[frei]).all()
+
+
+def test_portfolio_budget_auf_raster_abgerundet():
+    # Bedarf knapp über dem Budget: auch nach Rundung auf das Raster nicht ausgewählt
+    bewertung = pd.DataFrame({'NPV B statt A (€)': [10_000.0], BEDARF: [1_000.0 + RASTER_MIN / 2],
+                              'Kapazität OK': [True]})
+    assert not waehle_portfolio(bewertung, 1_000.0, BEDARF)['auswahl'].any()
+    assert waehle_portfolio(bewertung, 1_000.0 + RASTER_MIN, BEDARF)['auswahl'].all()
+
+
+def test_programm_vorlage_spalten():
+    assert PORTFOLIO_SPALTEN == ["Vorhaben"] + PROGRAMM_SPALTEN
+    kopf = portfolio_vorlagen()['programme'].decode("utf-8").strip().split(";")
+    assert kopf == PORTFOLIO_SPALTEN
+
+
+def test_tabellen_hash_ueber_alle_zeilen():
+    # 200.000 Zeilen: Streamlits Standard-Hash tastet hier nur Stichproben ab
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"Vorhaben": [f"V{i}" for i in range(200_000)], "Wert": rng.uniform(0, 1, 200_000)})
+    kennung = tabellen_hash(df)
+    assert tabellen_hash(df.copy()) == kennung
+
+    anders = df.copy()
+    anders.loc[123_457, "Wert"] += 1e-9
+    umbenannt = df.copy()
+    umbenannt.loc[98_765, "Vorhaben"] = "V98765 neu"
+    assert tabellen_hash(anders) != kennung
+    assert tabellen_hash(umbenannt) != kennung
+    assert tabellen_hash(df.rename(columns={"Wert": "Betrag"})) != kennung
+
+
+def test_eindeutiger_name():
+    assert eindeutiger_name("A → B", set()) == "A → B"
+    assert eindeutiger_name("A → B", {"A → B"}) == "A → B (2)"
+    assert eindeutiger_name("A → B", {"A → B", "A → B (2)", "A → B (3)"}) == "A → B (4)"
+
+
+def test_app_eigener_vergleich_nicht_unter_hochgeladenem_namen(programm):
+    from streamlit.testing.v1 import AppTest
+
+    # hochgeladenes Vorhaben mit demselben Namen wie der aufgenommene Vergleich der Standardeingaben
+    name = "Okuma LT3000-2T1MY → DMG CTX 550 mir Robo2Go"
+    zeile = {spalte: 1.0 for spalte in VORHABEN_SPALTEN}
+    zeile.update({"Vorhaben": name, "Standort": "Werk 2", "Anschaffungskosten A [€]": 400_000.0,
+                  "Anschaffungskosten B [€]": 700_000.0, "Betriebsstunden/Jahr A": 4000.0,
+                  "Betriebsstunden/Jahr B": 4000.0, "Nutzungsgrad A [%]": 80.0, "Nutzungsgrad B [%]": 80.0})
+    vorhaben_csv = pd.DataFrame([zeile]).to_csv(sep=";", index=False).encode("utf-8")
+    programme_csv = programm.assign(Vorhaben=name)[PORTFOLIO_SPALTEN].to_csv(sep=";", index=False).encode("utf-8")
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.run()
+    next(b for b in at.button if b.label.startswith("➕ Aktuellen Vergleich")).click()
+    at.run()
+    hochladen = {u.label.split(" ")[0]: u for u in at.get("file_uploader")}
+    hochladen["Vorhaben"].set_value(("vorhaben.csv", vorhaben_csv, "text/csv"))
+    hochladen["Programme"].set_value(("programme.csv", programme_csv, "text/csv"))
+    at.run()
+
+    assert not at.exception
+    bewertung = next(d.value for d in at.dataframe if d.value.index.name == "Vorhaben")
+    assert list(bewertung.index) == [name, f"{name} (2)"]
+    # getrennte Programme: hochgeladenes Vorhaben mit den 3 Serien des Fixtures, eigener Vergleich mit dem Editor
+    assert bewertung.loc[name, "Standort"] == "Werk 2"
+    assert bewertung.loc[name, "Mehrinvestition (€)"] == 300_000.0
+    assert bewertung.loc[f"{name} (2)", "Mehrinvestition (€)"] == 350_000.0
@@ -0,0 +1,103 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from berechnung import PROGRAMM_SPALTEN, break_even_serien, break_even_verlauf, programmdaten, programmstunden
+
+# Stundensätze: A Bearbeitung/Rüsten 115 €/h; B Bearbeitung 110 €/h, Rüsten 150 €/h
+BE_SAETZE = dict(mss_a=(60.0, 5.0), mss_b=(90.0, 10.0), lohn=50.0, bedien_a=1.0, bedien_b=0.2)
+
+
+def test_mengen_und_stunden(programm):
+    daten = programmdaten(programm)
+
+    np.testing.assert_array_equal(daten['stueck_jahr'], [600.0, 200.0, 1600.0])
+    np.testing.assert_array_equal(daten['serie'], programm["Serie"].to_numpy())
+    # Programmsummen (Matrixprodukt) = Summe der Stunden je Serie
+    np.testing.assert_allclose(daten['summe_bearb'], daten['stunden_bearb'].sum(axis=0))
+    np.testing.assert_allclose(daten['summe_ruest'], daten['stunden_ruest'].sum(axis=0))
+    assert programmstunden(daten, "A") == pytest.approx(((600 * 10 + 200 * 4 + 1600 * 2.5) / 60,
+                                                         (12 * 45 + 40 * 30 + 4 * 90) / 60))
+    assert daten['unvollstaendig'] == 0
+
+
+def test_leere_und_ungueltige_felder_zaehlen_als_null(programm):
+    programm = programm.astype({"Stück/Serie": float, "Bearbzeit (min/Stk) B": object})
+    programm.loc[0, "Stück/Serie"] = np.nan
+    programm.loc[2, "Bearbzeit (min/Stk) B"] = "abc"
+    daten = programmdaten(programm)
+
+    assert daten['unvollstaendig'] == 2
+    assert daten['stueck_jahr'][0] == 0.0
+    assert daten['zeiten_bearb'][2, 1] == 0.0
+    assert np.isfinite(daten['summe_bearb']).all()
+    # übrige Werte unverändert
+    assert daten['stueck_jahr'][1] == 200.0
+    assert daten['zeiten_bearb'][2, 0] == 2.5
+
+
+def test_leeres_programm(programm):
+    daten = programmdaten(programm.iloc[:0])
+    assert len(daten['stueck_jahr']) == 0
+    np.testing.assert_array_equal(daten['summe_bearb'], [0.0, 0.0])
+
+
+@pytest.mark.parametrize("spalte", PROGRAMM_SPALTEN)
+def test_fehlende_spalte(programm, spalte):
+    with pytest.raises(ValueError, match=re.escape(spalte)):
+        programmdaten(programm.drop(columns=spalte))
+
+
+def test_kennung_folgt_dem_inhalt(programm):
+    kennung = programmdaten(programm)['kennung']
+    assert programmdaten(programm.copy())['kennung'] == kennung
+
+    anders = programm.copy()
+    anders.loc[1, "Rüstzeit (min) B"] += 1
+    umbenannt = programm.copy()
+    umbenannt.loc[1, "Serie"] = "Flansch neu"
+    assert programmdaten(anders)['kennung'] != kennung
+    assert programmdaten(umbenannt)['kennung'] != kennung
+
+
+def _b_guenstiger(serie, stueck_serie):
+    """Brute Force: B günstiger bei dieser Losgröße? (break_even_verlauf mit einer Serie, Faktor 1)"""
+    daten = programmdaten(pd.DataFrame([{**serie, "Serie": "S", "Stück/Serie": stueck_serie}]))
+    _, kosten_a, kosten_b = break_even_verlauf.__wrapped__(daten, faktoren=(1.0,), **BE_SAETZE)
+    return kosten_b[0] < kosten_a[0] * (1 - 1e-9)
+
+
+@pytest.mark.parametrize("zeiten, richtung", [
+    ((10, 6, 30, 60), "ab"),      # B rüstet teurer, bearbeitet günstiger
+    ((6, 10, 60, 20), "bis"),     # B rüstet günstiger, bearbeitet teurer
+    ((10, 5, 60, 20), "immer"),
+    ((5, 10, 20, 60), "nie"),
+    # gleiche Bearbeitungskosten je Stück (22 x 115 = 23 x 110): Rüsten entscheidet
+    ((22, 23, 60, 20), "immer"),
+    ((22, 23, 20, 60), "nie"),
+    ((22, 23, 30, 23), "nie"),    # auch Rüstkosten gleich (30 x 115 = 23 x 150): B nie günstiger
+    ((10, 6, 30, 23), "immer"),   # gleiche Rüstkosten, B bearbeitet günstiger
+])
+def test_break_even_serien_wie_brute_force(zeiten, richtung):
+    bearb_a, bearb_b, ruest_a, ruest_b = zeiten
+    serie = {"Serien/Jahr": 10, "Bearbzeit (min/Stk) A": bearb_a, "Bearbzeit (min/Stk) B": bearb_b,
+             "Rüstzeit (min) A": ruest_a, "Rüstzeit (min) B": ruest_b}
+    menge, ergebnis = break_even_serien(programmdaten(pd.DataFrame([{**serie, "Serie": "S", "Stück/Serie": 1}])),
+                                        **BE_SAETZE)
+    assert ergebnis[0] == richtung
+
+    losgroessen = np.unique(np.geomspace(1, 500, 40).round().astype(int))
+    if richtung in ("ab", "bis"):
+        # Break-Even im Suchbereich, direkt daneben wechselt der Vorteil
+        los_be = menge[0] / serie["Serien/Jahr"]
+        assert 1 < los_be < 500
+        losgroessen = np.union1d(losgroessen, [int(np.floor(los_be)), int(np.ceil(los_be))])
+    else:
+        assert np.isnan(menge[0])
+
+    for los in losgroessen:
+        soll = {"ab": los * 10 > np.nan_to_num(menge[0]), "bis": los * 10 < np.nan_to_num(menge[0]),
+                "immer": True, "nie": False}[richtung]
+        assert _b_guenstiger(serie, los) == soll, f"Losgröße {los}"
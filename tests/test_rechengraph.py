@@ -0,0 +1,103 @@
+import pytest
+
+import rechengraph
+from rechengraph import ABHAENGIGKEITEN, knoten, programm_geaendert
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """Session State als einfaches dict (knoten nutzt nur setdefault/get)"""
+    zustand = {}
+    monkeypatch.setattr(rechengraph.st, "session_state", zustand)
+    return zustand
+
+
+def _eingaben():
+    blaetter = {d for deps in ABHAENGIGKEITEN.values() for d in deps if d not in ABHAENGIGKEITEN}
+    return {**{d: 1 for d in blaetter}, 'name_a': "Maschine A", 'name_b': "Maschine B"}
+
+
+def _rechne_alle(eingaben, aufrufe):
+    """Alle Knoten in Reihenfolge des Graphen (vorgelagerte zuerst); zählt neu berechnete Knoten"""
+    for name in ABHAENGIGKEITEN:
+        knoten(name, eingaben, lambda name=name: aufrufe.append(name) or name)
+
+
+def _versionen(session):
+    return {name: eintrag['version'] for name, eintrag in session['_rechengraph'].items()}
+
+
+def _abhaengige(start):
+    """Alle Knoten, die direkt oder indirekt von der Eingabe start abhängen"""
+    betroffen = set()
+    for name, deps in ABHAENGIGKEITEN.items():
+        if start in deps or betroffen.intersection(deps):
+            betroffen.add(name)
+    return betroffen
+
+
+def test_reihenfolge_topologisch():
+    # knoten erwartet vorgelagerte Knoten bereits berechnet: Definitionsreihenfolge muss das sicherstellen
+    gesehen = set()
+    for name, deps in ABHAENGIGKEITEN.items():
+        assert all(d in gesehen for d in deps if d in ABHAENGIGKEITEN), name
+        gesehen.add(name)
+
+
+def test_erster_lauf_und_unveraendert(session):
+    eingaben, aufrufe = _eingaben(), []
+    _rechne_alle(eingaben, aufrufe)
+    assert aufrufe == list(ABHAENGIGKEITEN)
+    assert set(_versionen(session).values()) == {0}
+
+    aufrufe.clear()
+    _rechne_alle(eingaben, aufrufe)
+    assert aufrufe == []
+
+
+def test_bezeichnung_aendert_keine_version(session):
+    eingaben, aufrufe = _eingaben(), []
+    _rechne_alle(eingaben, aufrufe)
+    vorher = _versionen(session)
+
+    aufrufe.clear()
+    _rechne_alle({**eingaben, 'name_a': "Neuer Name", 'name_b': "Anderer Name"}, aufrufe)
+    assert aufrufe == []
+    assert _versionen(session) == vorher
+
+
+@pytest.mark.parametrize("eingabe", ['programm_version', 'ak_b', 'preise_id', 'lohn_satz', 'afa_methode'])
+def test_aenderung_erhoeht_nur_abhaengige(session, eingabe):
+    eingaben, aufrufe = _eingaben(), []
+    _rechne_alle(eingaben, aufrufe)
+    vorher = _versionen(session)
+
+    aufrufe.clear()
+    _rechne_alle({**eingaben, eingabe: 2}, aufrufe)
+    betroffen = _abhaengige(eingabe)
+    assert betroffen and betroffen != set(ABHAENGIGKEITEN)
+    assert set(aufrufe) == betroffen
+    nachher = _versionen(session)
+    assert {n for n in ABHAENGIGKEITEN if nachher[n] != vorher[n]} == betroffen
+    assert all(nachher[n] == vorher[n] + 1 for n in betroffen)
+
+
+def test_programmaenderung_erreicht_break_even(session):
+    eingaben, aufrufe = _eingaben(), []
+    _rechne_alle(eingaben, aufrufe)
+
+    aufrufe.clear()
+    _rechne_alle({**eingaben, 'programm_version': 2}, aufrufe)
+    assert {'programmdaten', 'programm_kern', 'programm_a', 'break_even', 'break_even_serien'} <= set(aufrufe)
+    assert not {'mss_a', 'mss_b', 'finanzierung_a', 'finanzierung_b'} & set(aufrufe)
+
+
+def test_unbekannter_knoten(session):
+    with pytest.raises(KeyError, match="gibt_es_nicht"):
+        knoten('gibt_es_nicht', _eingaben(), lambda: None)
+
+
+def test_programm_geaendert_zaehlt_version_hoch(session):
+    programm_geaendert()
+    programm_geaendert()
+    assert session['programm_version'] == 2
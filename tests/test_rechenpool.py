@@ -0,0 +1,108 @@
+import os
+import threading
+
+import pytest
+
+import rechenpool
+from rechenpool import MAX_WORKER, _einreichen, _rechenpool, im_pool, im_pool_alle
+
+WURZEL = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _zaehler(fehler=0):
+    """Rechenfunktion, die Aufrufe zählt und wartet, bis 'frei' gesetzt ist (Berechnung läuft noch)"""
+    def rechne(wert):
+        rechne.aufrufe += 1
+        assert rechne.frei.wait(10)
+        if rechne.aufrufe <= fehler:
+            raise RuntimeError("Berechnung fehlgeschlagen")
+        return wert * 2
+
+    rechne.aufrufe, rechne.frei = 0, threading.Event()
+    return rechne
+
+
+def _bis(bedingung):
+    """Wartet, bis bedingung() gilt (Rückrufe laufen im Worker-Thread)"""
+    for _ in range(1000):
+        if bedingung():
+            return True
+        threading.Event().wait(0.01)
+    return False
+
+
+def test_gleiche_aufrufe_teilen_ein_future():
+    fn = _zaehler()
+    erstes, zweites = _einreichen(fn, wert=3), _einreichen(fn, wert=3)
+    anderes = _einreichen(fn, wert=4)
+    assert erstes is zweites and anderes is not erstes
+
+    fn.frei.set()
+    assert [erstes.result(), zweites.result(), anderes.result()] == [6, 6, 8]
+    assert fn.aufrufe == 2
+    assert _bis(lambda: not _rechenpool()['laufend'])
+
+
+def test_gleicher_schluessel_zweimal_eine_berechnung(monkeypatch):
+    fn, eingereicht = _zaehler(), []
+
+    def einreichen(*args, **kwargs):
+        eingereicht.append(_einreichen(*args, **kwargs))
+        return eingereicht[-1]
+
+    monkeypatch.setattr(rechenpool, "_einreichen", einreichen)
+    ergebnisse = []
+    aufrufer = threading.Thread(target=lambda: ergebnisse.append(im_pool_alle(fn, [{'wert': 5}, {'wert': 5}])))
+    aufrufer.start()
+    # beide Aufrufe eingereicht, während die erste Berechnung noch wartet
+    assert _bis(lambda: len(eingereicht) == 2)
+    assert eingereicht[0] is eingereicht[1]
+    fn.frei.set()
+    aufrufer.join(10)
+    assert ergebnisse == [[10, 10]]
+    assert fn.aufrufe == 1
+
+
+def test_fehler_wird_ausgetragen_und_neu_gerechnet():
+    fn = _zaehler(fehler=1)
+    fehlgeschlagen = _einreichen(fn, wert=7)
+    fn.frei.set()
+    with pytest.raises(RuntimeError, match="fehlgeschlagen"):
+        fehlgeschlagen.result()
+    assert _bis(lambda: not _rechenpool()['laufend'])
+
+    # derselbe Schlüssel rechnet neu statt den Fehler zu teilen
+    assert im_pool(fn, wert=7) == 14
+    assert fn.aufrufe == 2
+
+
+def _ohne_kontext(sperre, nr):
+    sperre.wait(10)
+    return rechenpool.get_script_run_ctx(suppress_warning=True) is None
+
+
+KONTEXT_APP = f"""
+import sys
+sys.path.insert(0, {WURZEL!r})
+import streamlit as st
+from rechenpool import get_script_run_ctx, im_pool
+
+def kontext_im_worker():
+    return get_script_run_ctx(suppress_warning=True) is st.session_state['kontext']
+
+st.session_state['kontext'] = get_script_run_ctx()
+st.write(f"Kontext im Worker: {{im_pool(kontext_im_worker)}}")
+"""
+
+
+def test_worker_rechnet_mit_kontext_der_session():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_string(KONTEXT_APP, default_timeout=30)
+    at.run()
+    assert not at.exception
+    assert at.markdown[0].value == "Kontext im Worker: True"
+
+    # danach hängt an keinem Worker mehr ein Session-Kontext
+    sperre = threading.Barrier(MAX_WORKER, timeout=10)
+    assert all(im_pool_alle(_ohne_kontext, [{'sperre': sperre, 'nr': i} for i in range(MAX_WORKER)]))
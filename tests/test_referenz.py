@@ -0,0 +1,10 @@
+from referenz import lade_referenz, rechne, vergleiche
+
+
+def test_golden_master():
+    # wie `python referenz.py`, aber seriell im Testprozess
+    e, soll = lade_referenz()
+    abweichungen = [z for z in vergleiche(soll, rechne(e)) if z[2]]
+    assert not abweichungen, "\n".join(f"{name}: {verletzt} von {anzahl} Werten außerhalb der Toleranz "
+                                       f"(max. Abweichung {max_diff:.3g})"
+                                       for name, anzahl, verletzt, max_diff in abweichungen)
@@ -0,0 +1,134 @@
+import base64
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from berechnung import PROGRAMM_SPALTEN
+from snapshot import SNAPSHOT_SCHEMA, URL_PARAMETER, kodiere_snapshot, dekodiere_snapshot
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def _werte():
+    """Ein gültiger Wert je Schema-Eintrag (Untergrenze, Option oder Text)"""
+    werte = {}
+    for schluessel, regel in SNAPSHOT_SCHEMA.items():
+        if isinstance(regel, list):
+            werte[schluessel] = regel[-1]
+        else:
+            typ, minimum, _ = regel
+            werte[schluessel] = "Maschine ä/ß" if typ is str else typ(minimum if minimum is not None else 7)
+    return werte
+
+
+def _code(kopf, namen=b"", block=b""):
+    """Snapshot-Code aus beliebigem Kopf (auch ungültigem) im Format von kodiere_snapshot"""
+    kopf = json.dumps(kopf).encode("utf-8")
+    roh = struct.pack("<II", len(kopf), len(namen)) + kopf + namen + block
+    return "1." + base64.urlsafe_b64encode(zlib.compress(roh)).rstrip(b"=").decode("ascii")
+
+
+def test_round_trip(programm):
+    programm = programm.astype({"Bearbzeit (min/Stk) B": float})
+    programm.loc[1, "Bearbzeit (min/Stk) B"] = np.nan
+    parameter, zurueck = dekodiere_snapshot(kodiere_snapshot(_werte(), programm))
+
+    assert parameter == _werte()
+    assert all(type(parameter[k]) is type(v) for k, v in _werte().items())
+    pd.testing.assert_frame_equal(zurueck, programm[PROGRAMM_SPALTEN])
+
+
+def test_round_trip_spaltenreihenfolge_und_leeres_programm(programm):
+    umgestellt = programm[["Serie"] + PROGRAMM_SPALTEN[:0:-1]]
+    pd.testing.assert_frame_equal(dekodiere_snapshot(kodiere_snapshot({}, umgestellt))[1], programm)
+    assert len(dekodiere_snapshot(kodiere_snapshot({}, programm.iloc[:0]))[1]) == 0
+
+
+@pytest.mark.parametrize("parameter", [
+    {'ak_a': "abc"},
+    {'zins_satz': 55.0},
+    {'n': 0},
+    {'n': 2.5},
+    {'nutzgrad_a': True},
+    {'lohn_satz': float("nan")},
+    {'ak_b': 2 ** 60},
+    {'fin_a': "Kredit"},
+    {'afa_methode': ["linear"]},
+    {'name_a': 3},
+    {'unbekannt': 1},
+])
+def test_ungueltige_parameter(programm, parameter):
+    with pytest.raises(ValueError):
+        dekodiere_snapshot(kodiere_snapshot(parameter, programm))
+
+
+def test_parameter_kein_dict(programm):
+    with pytest.raises(ValueError, match="Parameter"):
+        dekodiere_snapshot(kodiere_snapshot(["ak_a", 1], programm))
+
+
+def test_ganzzahl_fuer_float_widget(programm):
+    assert dekodiere_snapshot(kodiere_snapshot({'zins_satz': 5}, programm))[0] == {'zins_satz': 5.0}
+
+
+@pytest.mark.parametrize("aendern", [
+    lambda df: df.drop(columns="Rüstzeit (min) B"),
+    lambda df: df.assign(Extra=1),
+    lambda df: df.assign(**{"Stück/Serie": -1}),
+    lambda df: df.assign(**{"Rüstzeit (min) A": np.inf}),
+])
+def test_ungueltiges_programm(programm, aendern):
+    with pytest.raises(ValueError):
+        dekodiere_snapshot(kodiere_snapshot({}, aendern(programm)))
+
+
+def test_programm_typen_und_laenge():
+    spalten = PROGRAMM_SPALTEN[1:]
+    block = np.zeros(len(spalten) * 8, dtype=np.uint8).tobytes()
+    gueltig = {'p': {}, 's': spalten, 't': "f" * len(spalten), 'n': 1}
+    assert len(dekodiere_snapshot(_code(gueltig, b"S", block))[1]) == 1
+
+    for kopf in ({**gueltig, 't': "x" * len(spalten)}, {**gueltig, 't': "f"}, {**gueltig, 'n': 2},
+                 {**gueltig, 'n': "1"}, {**gueltig, 's': "Serien/Jahr"}, {'p': {}}):
+        with pytest.raises(ValueError):
+            dekodiere_snapshot(_code(kopf, b"S", block))
+
+
+def test_beschaedigt_und_abgeschnitten(programm):
+    code = kodiere_snapshot(_werte(), programm)
+    for kaputt in ("2." + code[2:], code[:len(code) // 2], code[:-4] + "!!!!", "1.AAAA"):
+        with pytest.raises(ValueError):
+            dekodiere_snapshot(kaputt)
+
+
+def test_app_uebernimmt_ungueltigen_snapshot_nicht(programm):
+    from streamlit.testing.v1 import AppTest
+
+    # erster Parameter gültig, zweiter nicht: auch der gültige darf nicht übernommen werden
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.query_params[URL_PARAMETER] = kodiere_snapshot({'ak_a': 123000, 'zins_satz': 55.0}, programm)
+    at.run()
+
+    assert not at.exception
+    assert any("Snapshot im Link" in e.value for e in at.error)
+    assert at.number_input(key="ak_a").value == 600000
+    assert at.slider(key="zins_satz").value == 5.0
+    assert 'programm_basis' not in at.session_state
+
+
+def test_app_uebernimmt_gueltigen_snapshot(programm):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.query_params[URL_PARAMETER] = kodiere_snapshot({'ak_a': 123000, 'zins_satz': 3.5}, programm)
+    at.run()
+
+    assert not at.exception
+    assert at.number_input(key="ak_a").value == 123000
+    assert at.slider(key="zins_satz").value == 3.5
+    assert len(at.session_state['programm_basis']) == len(programm)
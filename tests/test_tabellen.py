@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tabellen import vorteil_text
+
+WURZEL = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _alt(x):
+    """Bisherige Ausgabe (apply mit Lambda)"""
+    return f"✅ B spart {abs(x):.2f} €" if x > 0 else f"⚠️ A spart {abs(x):.2f} €"
+
+
+@pytest.mark.parametrize("werte", [
+    [12.34, 0.01, 1234567.891, 0.004],       # positiv
+    [-12.34, -0.01, -1234567.891, -0.006],   # negativ
+    [0.0, -0.0],                             # null
+    [np.nan, 5.0, np.nan],                   # NaN
+    [1.115, 2.675, -6.605, 0.005, -0.005],   # halbe Cent (binär knapp darunter/darüber)
+])
+def test_vorteil_text_wie_bisher(werte):
+    assert list(vorteil_text(pd.Series(werte))) == [_alt(x) for x in werte]
+
+
+def test_vorteil_text_zufall_wie_bisher():
+    rng = np.random.default_rng(0)
+    werte = np.concatenate([rng.normal(0, 50, 20_000).round(3), rng.normal(0, 1e8, 2_000).round(3)])
+    assert list(vorteil_text(werte)) == [_alt(x) for x in werte]
+
+
+TABELLE_APP = f"""
+import sys
+sys.path.insert(0, {WURZEL!r})
+import numpy as np
+import pandas as pd
+from tabellen import seitenweise_tabelle
+
+df = pd.DataFrame({{
+    'Serie': [f"S{{i:03d}}" for i in range(250)],
+    'Wert': np.where(np.arange(250) % 10 == 3, np.nan, (np.arange(250) * 37) % 101).astype(float),
+}})
+seitenweise_tabelle(df, 'test', {{'Wert': '{{:.0f}}'}}, farbspalte='Wert', zeilen=100)
+"""
+
+
+def _tabelle():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_string(TABELLE_APP, default_timeout=60)
+    at.run()
+    assert not at.exception
+    return at
+
+
+def _seite(at):
+    return at.dataframe[0].value
+
+
+def _daten():
+    werte = np.where(np.arange(250) % 10 == 3, np.nan, (np.arange(250) * 37) % 101).astype(float)
+    return pd.DataFrame({'Serie': [f"S{i:03d}" for i in range(250)], 'Wert': werte})
+
+
+def test_seitenweise_tabelle_blaettern():
+    at = _tabelle()
+    df = _daten()
+    assert list(_seite(at)['Serie']) == list(df['Serie'][:100])
+    assert at.number_input(key="test_seite").max == 3
+
+    at.number_input(key="test_seite").set_value(3).run()
+    assert list(_seite(at)['Serie']) == list(df['Serie'][200:])
+    assert at.caption[0].value == "Zeilen 201–250 von 250"
+
+
+@pytest.mark.parametrize("absteigend", [True, False])
+def test_seitenweise_tabelle_sortierung(absteigend):
+    at = _tabelle()
+    at.selectbox(key="test_sortierung").set_value("Wert")
+    at.toggle(key="test_absteigend").set_value(absteigend)
+    at.run()
+
+    soll = _daten().sort_values('Wert', ascending=not absteigend, kind='stable', na_position='last')
+    seite = _seite(at)
+    assert list(seite['Serie']) == list(soll['Serie'][:100])
+    assert not seite['Wert'].isna().any()
+
+    # letzte Seite: NaN stehen in beiden Richtungen am Ende
+    at.number_input(key="test_seite").set_value(3).run()
+    seite = _seite(at)
+    assert list(seite['Serie']) == list(soll['Serie'][200:])
+    assert seite['Wert'].tail(25).isna().all()